@@ -0,0 +1,144 @@
+"""
+Write-behind activity log pipeline for StockCeramique
+Audit entries are queued in memory and bulk-inserted by a background
+thread with executemany, instead of one commit per entry
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from flask_models import db, ActivityLog, generate_uuid
+from count_cache import count_cache
+
+logger = logging.getLogger(__name__)
+
+
+class ActivityLogWriter:
+    """Bounded queue of ActivityLog rows flushed in batches
+
+    When the queue is full new entries are dropped and counted rather than
+    blocking the request that produced them.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=200, flush_interval=2.0):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = threading.Event()
+        self._stop = threading.Event()
+        self._worker = None
+        self._app = None
+        self._metrics = {
+            'enqueued': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed': 0,
+            'lastDelaySeconds': 0.0,
+            'maxDelaySeconds': 0.0
+        }
+
+    def init_app(self, app):
+        self.batch_size = app.config.get('ACTIVITY_LOG_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', self.flush_interval)
+        max_queue = app.config.get('ACTIVITY_LOG_QUEUE_SIZE', self.max_queue)
+        if max_queue != self.max_queue:
+            self.max_queue = max_queue
+            self._queue = queue.Queue(maxsize=max_queue)
+        self._app = app
+        atexit.register(self.shutdown)
+
+    def enqueue(self, **values):
+        """Queue one ActivityLog row; returns False if it had to be dropped"""
+        row = {column.name: None for column in ActivityLog.__table__.columns}
+        row.update(values)
+        row['id'] = row['id'] or generate_uuid()
+        row['user_id'] = row['user_id'] or 'system'
+        row['created_at'] = row['created_at'] or datetime.utcnow()
+
+        try:
+            self._queue.put_nowait((time.monotonic(), row))
+        except queue.Full:
+            with self._lock:
+                self._metrics['dropped'] += 1
+            logger.warning(f"Activity log queue full, dropped {row['action']} {row['entity_type']}")
+            return False
+        self._pending.set()
+
+        with self._lock:
+            self._metrics['enqueued'] += 1
+            if self._worker is None and self._app is not None:
+                self._worker = threading.Thread(target=self._run, name='activity-log-writer', daemon=True)
+                self._worker.start()
+        return True
+
+    def _drain(self):
+        """Take up to batch_size queued rows"""
+        batch = []
+        try:
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return 0
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(ActivityLog.__table__.insert(), [row for _, row in batch])
+            count_cache.invalidate(ActivityLog.__tablename__)
+        except Exception as e:
+            with self._lock:
+                self._metrics['failed'] += len(batch)
+            logger.error(f"Failed to write {len(batch)} activity log entries: {str(e)}")
+            return 0
+
+        delay = time.monotonic() - min(queued_at for queued_at, _ in batch)
+        with self._lock:
+            self._metrics['written'] += len(batch)
+            self._metrics['lastDelaySeconds'] = round(delay, 3)
+            self._metrics['maxDelaySeconds'] = round(max(self._metrics['maxDelaySeconds'], delay), 3)
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Wait outside the flush lock; rows are only taken off the queue under it,
+            # so a concurrent flush() also waits for the batch being written
+            if not self._pending.wait(self.flush_interval):
+                continue
+            self._pending.clear()
+            with self._app.app_context():
+                self.flush()
+
+    def flush(self):
+        """Synchronously write everything queued so far, including a batch the worker is writing"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                batch = self._drain()
+                if not batch:
+                    return written
+                written += self._write(batch)
+
+    def shutdown(self):
+        """Stop the background thread and flush what is left"""
+        self._stop.set()
+        if self._app is None:
+            return
+        with self._app.app_context():
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {**self._metrics, 'pending': self._queue.qsize(), 'capacity': self.max_queue}
+
+
+activity_log_writer = ActivityLogWriter()
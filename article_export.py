@@ -0,0 +1,113 @@
+"""
+Article export rows for StockCeramique
+Column layouts of the article exports and a row source that reads the
+catalog in batches, so exports run in constant memory
+"""
+
+import csv
+import io
+
+from flask_models import Article
+
+# Articles fetched per round trip (server-side cursor on PostgreSQL)
+YIELD_PER = 1000
+
+# Rows encoded per chunk of a streamed CSV body
+CSV_CHUNK_ROWS = 500
+
+
+def _price(article):
+    return float(article.prix_unitaire) if article.prix_unitaire else 0
+
+
+def _price_text(article):
+    return f"{float(article.prix_unitaire):.2f} MAD" if article.prix_unitaire else "0.00 MAD"
+
+
+def _created_at(date_format):
+    return lambda article: article.created_at.strftime(date_format) if article.created_at else ''
+
+
+# GET /api/articles/export layout, same columns as the import file
+FULL_EXPORT_COLUMNS = [
+    ('Code Article', lambda article: article.code_article),
+    ('Désignation', lambda article: article.designation),
+    ('Catégorie', lambda article: article.categorie),
+    ('Marque', lambda article: article.marque or ''),
+    ('Référence', lambda article: article.reference or ''),
+    ('Stock Initial', lambda article: article.stock_initial),
+    ('Stock Actuel', lambda article: article.stock_actuel),
+    ('Unité', lambda article: article.unite),
+    ('Prix Unitaire', _price),
+    ('Seuil Minimum', lambda article: article.seuil_minimum),
+    ('Fournisseur ID', lambda article: article.fournisseur_id or ''),
+    ('Date Création', _created_at('%Y-%m-%d %H:%M:%S'))
+]
+
+
+def export_columns(options, price_as_text=False, date_format='%Y-%m-%d %H:%M:%S'):
+    """(header, getter) pairs of the exports driven by the include* options"""
+    columns = [
+        ('Code Article', lambda article: article.code_article),
+        ('Désignation', lambda article: article.designation),
+        ('Catégorie', lambda article: article.categorie),
+        ('Marque', lambda article: article.marque or ''),
+        ('Référence', lambda article: article.reference or ''),
+        ('Unité', lambda article: article.unite)
+    ]
+    if options.get('includeStock', True):
+        columns += [
+            ('Stock Initial', lambda article: article.stock_initial),
+            ('Stock Actuel', lambda article: article.stock_actuel),
+            ('Seuil Minimum', lambda article: article.seuil_minimum)
+        ]
+    if options.get('includePrices', True):
+        columns.append(('Prix Unitaire', _price_text if price_as_text else _price))
+    if options.get('includeSuppliers', True):
+        columns.append(('Fournisseur ID', lambda article: article.fournisseur_id or ''))
+    columns.append(('Date Création', _created_at(date_format)))
+    return columns
+
+
+def iter_articles(batch_size=YIELD_PER):
+    """All articles ordered by code, loaded batch by batch"""
+    return Article.query.order_by(Article.code_article).yield_per(batch_size)
+
+
+def iter_rows(columns, articles=None):
+    """Value lists for each article, in column order"""
+    getters = [getter for _, getter in columns]
+    for article in articles if articles is not None else iter_articles():
+        yield [getter(article) for getter in getters]
+
+
+def iter_csv(columns, rows, chunk_rows=CSV_CHUNK_ROWS):
+    """Encode rows as CSV text chunks, the header first on its own"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+
+    def drain():
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    writer.writerow([header for header, _ in columns])
+    yield drain()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= chunk_rows:
+            yield drain()
+            pending = 0
+    if pending:
+        yield drain()
+
+
+def write_csv(columns, path):
+    """Write an article CSV file to disk chunk by chunk"""
+    with open(path, 'w', encoding='utf-8', newline='') as output:
+        for chunk in iter_csv(columns, iter_rows(columns)):
+            output.write(chunk)
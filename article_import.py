@@ -0,0 +1,282 @@
+"""
+Vectorised article import engine for StockCeramique
+Coerces whole columns with pandas, resolves existing articles with one
+query and applies inserts and updates with bulk mappings. Large files
+can be streamed in chunks, each committed as its own batch
+"""
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from flask_models import db, Article, generate_uuid
+import stock_summary
+from autocomplete_index import invalidate_on_commit, patch_stock_on_commit
+from count_cache import invalidate_on_commit as invalidate_counts_on_commit
+from normalized_columns import normalized_values
+from stock_movements import record_movements, SOURCE_INITIAL, SOURCE_IMPORT
+
+# Display column names (import/export files) to database fields
+COLUMN_MAPPING = {
+    'Code Article': 'code_article',
+    'Désignation': 'designation',
+    'Catégorie': 'categorie',
+    'Marque': 'marque',
+    'Référence': 'reference',
+    'Stock Initial': 'stock_initial',
+    'Stock Actuel': 'stock_actuel',
+    'Unité': 'unite',
+    'Prix Unitaire': 'prix_unitaire',
+    'Seuil Minimum': 'seuil_minimum',
+    'Fournisseur ID': 'fournisseur_id'
+}
+
+REQUIRED_COLUMNS = ['Code Article', 'Désignation', 'Catégorie']
+
+# Above this many codes the whole code -> id map is loaded instead of an IN list
+MAX_IN_CLAUSE = 900
+
+# Rows per committed batch in streaming mode
+DEFAULT_CHUNK_SIZE = 2000
+
+INTEGER_FIELDS = ['stock_initial', 'stock_actuel', 'seuil_minimum']
+FLOAT_FIELDS = ['prix_unitaire']
+
+# Defaults applied to new articles for missing or empty cells
+NEW_ARTICLE_DEFAULTS = {
+    'stock_initial': 0,
+    'stock_actuel': 0,
+    'seuil_minimum': 10,
+    'prix_unitaire': None,
+    'marque': None,
+    'reference': None,
+    'fournisseur_id': None,
+    'designation': '',
+    'categorie': '',
+    'unite': 'pcs'
+}
+
+
+def missing_columns(columns):
+    """Required display columns absent from an uploaded file"""
+    return [column for column in REQUIRED_COLUMNS if column not in columns]
+
+
+def _as_text(series):
+    """str() every non-null cell, keeping nulls as NaN
+
+    The result is always of object dtype, so .str works even on a column
+    pandas read as all-NaN floats.
+    """
+    return series.astype(object).where(series.isna(), series.astype(str))
+
+
+def coerce_frame(df, row_offset=0):
+    """Convert an uploaded frame to database fields column by column
+
+    Returns the coerced frame (nulls mean "cell left empty") and a list of
+    error messages; rows with errors are dropped from the frame. Line
+    numbers in messages are spreadsheet lines (header is line 1).
+    """
+    present = {display: field for display, field in COLUMN_MAPPING.items() if display in df.columns}
+    frame = pd.DataFrame(index=df.index)
+    invalid = pd.Series('', index=df.index)
+
+    for display, field in present.items():
+        column = df[display]
+        if field in INTEGER_FIELDS or field in FLOAT_FIELDS:
+            numeric = pd.to_numeric(column, errors='coerce')
+            bad = column.notna() & numeric.isna()
+            invalid = invalid.mask(bad & (invalid == ''), f"valeur numérique invalide pour '{display}'")
+            if field in INTEGER_FIELDS:
+                numeric = np.trunc(numeric).astype('Int64')
+            frame[field] = numeric
+        else:
+            frame[field] = _as_text(column)
+
+    code = frame['code_article']
+    missing_code = code.isna() | (code.str.strip() == '')
+    invalid = invalid.mask(missing_code & (invalid == ''), 'Code Article requis')
+
+    line_numbers = df.index.to_series() + 2 + row_offset
+    errors = [f'Ligne {line}: {message}' for line, message in zip(line_numbers[invalid != ''], invalid[invalid != ''])]
+    return frame[invalid == ''], errors
+
+
+def _clean(value):
+    """Convert pandas scalars to plain Python values for the DB driver"""
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)):
+        return None
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def import_dataframe(df, row_offset=0, refresh_summary=True):
+    """Insert or update articles from an uploaded frame
+
+    Rows sharing a code are merged, later non-empty cells winning, which is
+    what applying them one by one used to produce. The caller commits.
+    """
+    frame, errors = coerce_frame(df, row_offset)
+    if frame.empty:
+        return {'created': 0, 'updated': 0, 'errors': errors}
+
+    fields = [field for field in frame.columns if field != 'code_article']
+    codes = frame['code_article'].unique().tolist()
+
+    # Resolve existing articles in one query
+    query = db.session.query(Article.code_article, Article.id)
+    if len(codes) <= MAX_IN_CLAUSE:
+        query = query.filter(Article.code_article.in_(codes))
+    existing = dict(query.all())
+
+    row_counts = frame.groupby('code_article', sort=False).size()
+    merged = frame.groupby('code_article', sort=False)[fields].last().reset_index()
+    is_existing = merged['code_article'].isin(list(existing))
+
+    # New articles: one insert per code, defaults for empty cells
+    inserts = []
+    for record in merged[~is_existing].to_dict('records'):
+        mapping = {'id': generate_uuid(), 'code_article': record['code_article']}
+        for field, default in NEW_ARTICLE_DEFAULTS.items():
+            value = _clean(record.get(field))
+            mapping[field] = value if value is not None else default
+        if 'stock_actuel' not in fields:
+            mapping['stock_actuel'] = mapping['stock_initial']
+        if not mapping['unite']:
+            mapping['unite'] = 'pcs'
+        # Bulk mappings skip the ORM events that maintain the search columns
+        mapping.update(normalized_values(Article, mapping))
+        inserts.append(mapping)
+
+    # Existing articles: only overwrite cells that were filled in
+    updates = []
+    for record in merged[is_existing].to_dict('records'):
+        mapping = {'id': existing[record['code_article']]}
+        for field in fields:
+            value = _clean(record[field])
+            if value is not None:
+                mapping[field] = value
+        if len(mapping) > 1:
+            mapping.update(normalized_values(Article, mapping))
+            updates.append(mapping)
+
+    # Ledger rows for the stock levels the import sets
+    movements = [(mapping['id'], mapping['stock_actuel'], SOURCE_INITIAL, None) for mapping in inserts]
+    stock_updates = {mapping['id']: mapping['stock_actuel'] for mapping in updates if 'stock_actuel' in mapping}
+    ids = list(stock_updates)
+    for start in range(0, len(ids), MAX_IN_CLAUSE):
+        previous = db.session.query(Article.id, Article.stock_actuel) \
+            .filter(Article.id.in_(ids[start:start + MAX_IN_CLAUSE])).all()
+        movements += [(article_id, stock_updates[article_id] - (stock or 0), SOURCE_IMPORT, None)
+                      for article_id, stock in previous]
+
+    if inserts:
+        db.session.bulk_insert_mappings(Article, inserts)
+    if updates:
+        db.session.bulk_update_mappings(Article, updates)
+    if movements:
+        record_movements(db.session.connection(), movements)
+    if inserts or updates:
+        # Rebuilt in the background; stock levels are shown right away
+        invalidate_on_commit(db.session)
+        patch_stock_on_commit(db.session, stock_updates)
+        invalidate_counts_on_commit(db.session, Article.__tablename__)
+
+    # Bulk mappings bypass flush events, refresh the stock summary in the same transaction
+    if refresh_summary and (inserts or updates):
+        stock_summary.rebuild(db.session.connection())
+
+    created = len(inserts)
+    return {
+        'created': created,
+        'updated': int(row_counts.sum()) - created,
+        'errors': errors
+    }
+
+
+def iter_csv_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield (frame, row_offset) chunks of a CSV file"""
+    offset = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        chunk.index = range(len(chunk))
+        yield chunk, offset
+        offset += len(chunk)
+
+
+def iter_xlsx_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Yield (frame, row_offset) chunks of the first sheet of an .xlsx file"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name).strip() if name is not None else f'Unnamed: {index}' for index, name in enumerate(header)]
+
+        offset = 0
+        batch = []
+        for row in rows:
+            if all(value is None for value in row):
+                continue
+            batch.append(row)
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=columns), offset
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=columns), offset
+    finally:
+        workbook.close()
+
+
+def iter_xls_chunks(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Legacy .xls files cannot be streamed; read once and slice"""
+    df = pd.read_excel(path)
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        chunk.index = range(len(chunk))
+        yield chunk, start
+
+
+def iter_file_chunks(path, file_ext, chunksize=DEFAULT_CHUNK_SIZE):
+    if file_ext == 'csv':
+        return iter_csv_chunks(path, chunksize)
+    if file_ext == 'xlsx':
+        return iter_xlsx_chunks(path, chunksize)
+    return iter_xls_chunks(path, chunksize)
+
+
+def import_file_streaming(path, file_ext, progress=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """Import an article file chunk by chunk, committing after each chunk
+
+    `progress(rows_done, totals)` is called after every committed chunk and
+    may raise to stop the import. Memory use depends on the chunk size, not on the file size.
+    """
+    totals = {'created': 0, 'updated': 0, 'errors': [], 'rows': 0}
+    try:
+        for chunk, offset in iter_file_chunks(path, file_ext, chunksize):
+            if offset == 0:
+                missing = missing_columns(chunk.columns)
+                if missing:
+                    raise ValueError(f'Colonnes manquantes: {", ".join(missing)}')
+
+            result = import_dataframe(chunk, row_offset=offset, refresh_summary=False)
+            db.session.commit()
+
+            totals['created'] += result['created']
+            totals['updated'] += result['updated']
+            totals['errors'].extend(result['errors'])
+            totals['rows'] += len(chunk)
+            if progress:
+                progress(totals['rows'], totals)
+    finally:
+        # One summary refresh for the whole file; committed chunks are kept
+        # when the import stops early, so refresh in that case too
+        db.session.rollback()
+        stock_summary.rebuild(db.session.connection())
+        db.session.commit()
+    return totals
@@ -0,0 +1,370 @@
+"""
+In-memory autocomplete index for StockCeramique
+Keeps an n-gram inverted index over the normalised names and codes of
+articles, suppliers and requestors, so the global search bar is answered
+without a database round trip. The index is built in the background at
+startup (once upgrade_schema has run), patched from committed ORM changes
+and stock movements, and rebuilt after bulk writes or once it is older
+than AUTOCOMPLETE_MAX_AGE (changes made by other worker processes are
+picked up that way)
+"""
+
+import logging
+import sys
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from flask_models import db, Article, Supplier, Requestor
+from text_normalize import normalize
+
+logger = logging.getLogger(__name__)
+
+# Query tokens of 3+ characters are looked up by trigram, 2-character ones by bigram
+GRAM_SIZES = (2, 3)
+
+SESSION_CHANGES_KEY = 'autocomplete_changes'
+SESSION_INVALIDATE_KEY = 'autocomplete_invalidate'
+SESSION_STOCK_KEY = 'autocomplete_stock'
+
+
+def article_result(article):
+    return {
+        'type': 'article',
+        'id': article.id,
+        'title': article.designation,
+        'subtitle': f'{article.code_article} - {article.categorie}',
+        'extra': f'Stock: {article.stock_actuel}',
+        'path': '/articles',
+        'data': article.to_dict()
+    }
+
+
+def supplier_result(supplier):
+    return {
+        'type': 'supplier',
+        'id': supplier.id,
+        'title': supplier.nom,
+        'subtitle': supplier.contact or 'Pas de contact',
+        'extra': supplier.adresse or '',
+        'path': '/suppliers',
+        'data': supplier.to_dict()
+    }
+
+
+def requestor_result(requestor):
+    return {
+        'type': 'requestor',
+        'id': requestor.id,
+        'title': f'{requestor.prenom} {requestor.nom}',
+        'subtitle': requestor.departement,
+        'extra': requestor.poste or '',
+        'path': '/requestors',
+        'data': requestor.to_dict()
+    }
+
+
+# Model -> (result type, result builder, searchable text)
+INDEXED_MODELS = {
+    Article: ('article', article_result, lambda article: [article.designation, article.code_article, article.reference,
+                                                          article.marque, article.categorie]),
+    Supplier: ('supplier', supplier_result, lambda supplier: [supplier.nom, supplier.contact]),
+    Requestor: ('requestor', requestor_result, lambda requestor: [requestor.prenom, requestor.nom,
+                                                                  requestor.departement, requestor.poste])
+}
+
+RESULT_TYPES = tuple(result_type for result_type, _, _ in INDEXED_MODELS.values())
+
+
+def search_result(instance):
+    """Global-search result entry for an article, supplier or requestor"""
+    return INDEXED_MODELS[type(instance)][1](instance)
+
+
+def _entry(instance):
+    _, build_result, searchable = INDEXED_MODELS[type(instance)]
+    text = ' '.join(normalize(value) for value in searchable(instance) if value)
+    return text, build_result(instance)
+
+
+def _with_stock(entry, stock):
+    """Article entry showing a new stock level (stock is displayed, not searched)"""
+    text, result = entry
+    return text, {**result, 'extra': f'Stock: {stock}', 'data': {**result['data'], 'stockActuel': stock}}
+
+
+def _grams(text):
+    grams = set()
+    for token in text.split():
+        for size in GRAM_SIZES:
+            grams.update(token[start:start + size] for start in range(len(token) - size + 1))
+    return grams
+
+
+def _query_grams(token):
+    if len(token) >= 3:
+        return {token[start:start + 3] for start in range(len(token) - 2)}
+    if len(token) == 2:
+        return {token}
+    return set()
+
+
+def _approx_size(entries, postings):
+    """Rough deep size in bytes of the index structures"""
+    size = sys.getsizeof(entries) + sys.getsizeof(postings)
+    for gram, keys in postings.items():
+        size += sys.getsizeof(gram) + sys.getsizeof(keys)
+    for key, (text, result) in entries.items():
+        size += sys.getsizeof(key) + sys.getsizeof(text) + sys.getsizeof(result) + sys.getsizeof(result['data'])
+        size += sum(sys.getsizeof(value) for value in result['data'].values())
+    return size
+
+
+class AutocompleteIndex:
+    """N-gram inverted index of search entries keyed by (type, id)
+
+    Searches are answered only once a build has completed; until then,
+    or when the index exceeds its memory budget, search() returns None
+    and callers fall back to the database.
+    """
+
+    def __init__(self, max_age=300, memory_budget_mb=64):
+        self.max_age = max_age
+        self.memory_budget_mb = memory_budget_mb
+        self._entries = {}
+        self._postings = {}
+        self._lock = threading.RLock()
+        self._app = None
+        self._ready = False
+        self._stale = True
+        self._building = False
+        self._replay = None
+        self._stock_replay = None
+        self._built_at = None
+        self._over_budget = False
+        self._stats = {'entries': 0, 'grams': 0, 'approxBytes': 0, 'buildSeconds': None, 'builds': 0}
+
+    def init_app(self, app):
+        self.max_age = app.config.get('AUTOCOMPLETE_MAX_AGE', self.max_age)
+        self.memory_budget_mb = app.config.get('AUTOCOMPLETE_MEMORY_BUDGET_MB', self.memory_budget_mb)
+        self._app = app
+
+    def _index(self, entries, postings, key, entry):
+        self._unindex(entries, postings, key)
+        entries[key] = entry
+        for gram in _grams(entry[0]):
+            postings.setdefault(gram, set()).add(key)
+
+    def _unindex(self, entries, postings, key):
+        previous = entries.pop(key, None)
+        if previous is None:
+            return
+        for gram in _grams(previous[0]):
+            keys = postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del postings[gram]
+
+    def build(self):
+        """Load every indexed row and swap in a fresh index (run in its own app context)"""
+        started = time.monotonic()
+        with self._lock:
+            self._building = True
+            self._replay = []
+            self._stock_replay = {}
+        entries = {}
+        postings = {}
+        try:
+            for model, (result_type, _, _) in INDEXED_MODELS.items():
+                for instance in model.query.yield_per(1000):
+                    self._index(entries, postings, (result_type, instance.id), _entry(instance))
+        except Exception:
+            with self._lock:
+                self._replay = None
+                self._stock_replay = None
+                self._building = False
+            raise
+
+        approx_bytes = _approx_size(entries, postings)
+        over_budget = approx_bytes > self.memory_budget_mb * 1024 * 1024
+        if over_budget:
+            logger.warning(f"Autocomplete index needs ~{approx_bytes // (1024 * 1024)} MB, over its "
+                           f"{self.memory_budget_mb} MB budget; global search stays on the database")
+            entries, postings = {}, {}
+
+        with self._lock:
+            # Apply changes committed while the rows were being read
+            for key, entry in self._replay:
+                if entry is None:
+                    self._unindex(entries, postings, key)
+                elif not over_budget:
+                    self._index(entries, postings, key, entry)
+            for article_id, stock in self._stock_replay.items():
+                key = ('article', article_id)
+                if key in entries:
+                    entries[key] = _with_stock(entries[key], stock)
+            self._replay = None
+            self._stock_replay = None
+            self._entries = entries
+            self._postings = postings
+            self._over_budget = over_budget
+            self._ready = not over_budget
+            self._stale = False
+            self._building = False
+            self._built_at = time.monotonic()
+            self._stats.update(
+                entries=len(entries),
+                grams=len(postings),
+                approxBytes=approx_bytes,
+                buildSeconds=round(time.monotonic() - started, 3),
+                builds=self._stats['builds'] + 1
+            )
+
+    def _run_build(self):
+        try:
+            with self._app.app_context():
+                self.build()
+        except Exception as e:
+            logger.error(f"Autocomplete index build failed: {str(e)}")
+
+    def _refresh_in_background(self):
+        with self._lock:
+            expired = self._built_at is not None and time.monotonic() - self._built_at > self.max_age
+            if self._building or self._app is None or not (self._stale or expired):
+                return
+            self._building = True
+        threading.Thread(target=self._run_build, name='autocomplete-index', daemon=True).start()
+
+    def start(self):
+        """Build the index in the background now, so early searches need not wait for a first lookup"""
+        self._refresh_in_background()
+
+    def apply(self, changes):
+        """Patch the index with committed changes ({(type, id): entry or None})"""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.extend(changes.items())
+            if not self._ready:
+                return
+            for key, entry in changes.items():
+                if entry is None:
+                    self._unindex(self._entries, self._postings, key)
+                else:
+                    self._index(self._entries, self._postings, key, entry)
+            self._stats.update(entries=len(self._entries), grams=len(self._postings))
+
+    def patch_stock(self, levels):
+        """Show committed stock levels ({article_id: stock_actuel}) in the article entries"""
+        with self._lock:
+            if self._stock_replay is not None:
+                self._stock_replay.update(levels)
+            for article_id, stock in levels.items():
+                key = ('article', article_id)
+                if key in self._entries:
+                    self._entries[key] = _with_stock(self._entries[key], stock)
+
+    def invalidate(self):
+        """Schedule a rebuild, e.g. after bulk writes that bypass ORM events"""
+        with self._lock:
+            self._stale = True
+
+    def search(self, term, per_type=5):
+        """Matching results, at most per_type of each type, or None if the index is not usable"""
+        self._refresh_in_background()
+        tokens = normalize(term).split()
+        if not tokens:
+            return []
+
+        with self._lock:
+            if not self._ready:
+                return None
+
+            candidates = None
+            for token in tokens:
+                grams = _query_grams(token)
+                if not grams:
+                    continue
+                for gram in sorted(grams, key=lambda gram: len(self._postings.get(gram, ()))):
+                    keys = self._postings.get(gram, set())
+                    candidates = set(keys) if candidates is None else candidates & keys
+                    if not candidates:
+                        return []
+            if candidates is None:
+                candidates = self._entries.keys()
+
+            matches = []
+            for key in candidates:
+                text, result = self._entries[key]
+                if all(token in text for token in tokens):
+                    words = text.split()
+                    prefix_hits = sum(1 for token in tokens if any(word.startswith(token) for word in words))
+                    matches.append((RESULT_TYPES.index(result['type']), -prefix_hits,
+                                    len(result['title'] or ''), result['title'] or '', result))
+
+        # Grouped by type like the database search, best matches first within a type
+        matches.sort(key=lambda match: match[:4])
+        results = []
+        counts = dict.fromkeys(RESULT_TYPES, 0)
+        for *_, result in matches:
+            if counts[result['type']] < per_type:
+                counts[result['type']] += 1
+                results.append(result)
+        return results
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'ready': self._ready,
+                'stale': self._stale,
+                'overBudget': self._over_budget,
+                'budgetBytes': self.memory_budget_mb * 1024 * 1024,
+                'ageSeconds': round(time.monotonic() - self._built_at, 1) if self._built_at else None
+            }
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def invalidate_on_commit(session):
+    """Rebuild the index once the session commits (bulk writes bypass flush events)"""
+    session.info[SESSION_INVALIDATE_KEY] = True
+
+
+def patch_stock_on_commit(session, levels):
+    """Update the articles' displayed stock once the session commits (stock UPDATEs bypass flush events)"""
+    session.info.setdefault(SESSION_STOCK_KEY, {}).update(levels)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault(SESSION_CHANGES_KEY, {})
+    for instance in list(session.new) + list(session.dirty):
+        if type(instance) in INDEXED_MODELS:
+            text, result = _entry(instance)
+            changes[(result['type'], result['id'])] = (text, result)
+    for instance in session.deleted:
+        if type(instance) in INDEXED_MODELS:
+            changes[(INDEXED_MODELS[type(instance)][0], instance.id)] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop(SESSION_CHANGES_KEY, None)
+    if changes:
+        autocomplete_index.apply(changes)
+    levels = session.info.pop(SESSION_STOCK_KEY, None)
+    if levels:
+        autocomplete_index.patch_stock(levels)
+    if session.info.pop(SESSION_INVALIDATE_KEY, False):
+        autocomplete_index.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop(SESSION_CHANGES_KEY, None)
+    session.info.pop(SESSION_INVALIDATE_KEY, None)
+    session.info.pop(SESSION_STOCK_KEY, None)
@@ -0,0 +1,332 @@
+"""
+Consumption rollups for StockCeramique analytics
+Keeps received and issued quantities, values and movement counts per day,
+week and month, for every article, every category and overall, in the
+consumption_rollups table. Each new reception or outbound adds itself to
+its nine rollup rows when it is flushed, so chart series are read from a
+few rows per period whatever the length of the history
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import click
+from sqlalchemy import event, select, insert, delete, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from flask_models import db, Article, Reception, Outbound, ConsumptionRollup
+
+GRANULARITIES = ('day', 'week', 'month')
+
+GLOBAL_SCOPE = 'global'
+CATEGORY_SCOPE = 'categorie'
+ARTICLE_SCOPE = 'article'
+
+RECEIVED = 'received'
+ISSUED = 'issued'
+
+MEASURES = ('received_qty', 'received_value', 'received_count', 'issued_qty', 'issued_value', 'issued_count')
+
+# Rollup column -> key of the series in API responses
+SERIES_NAMES = {
+    'received_qty': 'receivedQty',
+    'received_value': 'receivedValue',
+    'received_count': 'receivedCount',
+    'issued_qty': 'issuedQty',
+    'issued_value': 'issuedValue',
+    'issued_count': 'issuedCount'
+}
+
+# Periods a single series request may span
+MAX_PERIODS = 400
+
+# Periods shown when no start date is given
+DEFAULT_SPAN = {'day': 30, 'week': 12, 'month': 12}
+
+
+class InvalidRange(ValueError):
+    pass
+
+
+def period_start(day, granularity):
+    """First day of the day, ISO week (Monday) or month containing `day`"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start + timedelta(days=1)
+
+
+def periods_between(start, end, granularity):
+    """Start dates of the periods overlapping [start, end]"""
+    periods = []
+    current = period_start(start, granularity)
+    while current <= end:
+        periods.append(current)
+        if len(periods) > MAX_PERIODS:
+            raise InvalidRange(f'Intervalle trop long: {MAX_PERIODS} périodes maximum')
+        current = next_period(current, granularity)
+    return periods
+
+
+def default_start(end, granularity):
+    """Start date showing the DEFAULT_SPAN periods that end with `end`"""
+    start = period_start(end, granularity)
+    for _ in range(DEFAULT_SPAN[granularity] - 1):
+        start = period_start(start - timedelta(days=1), granularity)
+    return start
+
+
+def _as_date(value):
+    if value is None:
+        return datetime.utcnow().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _money(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+
+def compute_deltas(movements):
+    """Sum (article_id, categorie, day, kind, quantity, value, count) movements per rollup row"""
+    deltas = {}
+    for article_id, categorie, day, kind, quantity, value, count in movements:
+        targets = [(GLOBAL_SCOPE, ''), (CATEGORY_SCOPE, categorie or ''), (ARTICLE_SCOPE, article_id)]
+        for granularity in GRANULARITIES:
+            start = period_start(day, granularity)
+            for scope, key in targets:
+                row = deltas.setdefault((granularity, start, scope, key), {
+                    'categorie': categorie if scope == ARTICLE_SCOPE else None,
+                    **{measure: 0 for measure in MEASURES}
+                })
+                row[f'{kind}_qty'] += int(quantity or 0)
+                row[f'{kind}_value'] += _money(value)
+                row[f'{kind}_count'] += int(count)
+    return deltas
+
+
+def apply_movements(connection, movements):
+    """Add movements to their rollup rows, creating the rows that do not exist yet
+
+    One INSERT ... ON CONFLICT DO UPDATE adds to existing rows, so two
+    transactions opening the same new period cannot collide on its key.
+    Rows are written in key order to keep PostgreSQL row locks deadlock-free.
+    """
+    deltas = compute_deltas(movements)
+    if not deltas:
+        return
+    table = ConsumptionRollup.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(table)
+    statement = statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={measure: table.c[measure] + statement.excluded[measure] for measure in MEASURES}
+    )
+    connection.execute(statement, [
+        {'granularity': granularity, 'period_start': start, 'scope': scope, 'key': key, **row}
+        for (granularity, start, scope, key), row in sorted(deltas.items())
+    ])
+
+
+def _daily_movements(connection):
+    """Receptions and outbounds grouped per article and day, valued like the flush listener does"""
+    reception_day = func.date(Reception.date_reception)
+    outbound_day = func.date(Outbound.date_sortie)
+    receptions = select(
+        Reception.article_id, Article.categorie, reception_day,
+        func.sum(Reception.quantite_recue),
+        func.sum(Reception.quantite_recue * func.coalesce(Reception.prix_unitaire, Article.prix_unitaire, 0)),
+        func.count()
+    ).outerjoin(Article, Article.id == Reception.article_id) \
+        .group_by(Reception.article_id, Article.categorie, reception_day)
+    outbounds = select(
+        Outbound.article_id, Article.categorie, outbound_day,
+        func.sum(Outbound.quantite_sortie),
+        func.sum(Outbound.quantite_sortie * func.coalesce(Article.prix_unitaire, 0)),
+        func.count()
+    ).outerjoin(Article, Article.id == Outbound.article_id) \
+        .group_by(Outbound.article_id, Article.categorie, outbound_day)
+
+    for kind, query in ((RECEIVED, receptions), (ISSUED, outbounds)):
+        for article_id, categorie, day, quantity, value, count in connection.execute(query):
+            yield article_id, categorie, _as_date(day), kind, quantity, value, count
+
+
+def rebuild(connection):
+    """Replace the rollups with totals recomputed from the full reception and outbound history
+
+    Rows are attributed to the articles' current category and outbounds are
+    valued at the current article price, as incremental updates do at the
+    time of each movement.
+    """
+    deltas = compute_deltas(_daily_movements(connection))
+    table = ConsumptionRollup.__table__
+    connection.execute(delete(table))
+    if deltas:
+        connection.execute(insert(table), [
+            {'granularity': granularity, 'period_start': start, 'scope': scope, 'key': key, **row}
+            for (granularity, start, scope, key), row in deltas.items()
+        ])
+    return len(deltas)
+
+
+def needs_rebuild():
+    """True when movements exist but the rollups were never built"""
+    has_rollups = db.session.execute(select(ConsumptionRollup.granularity).limit(1)).first() is not None
+    if has_rollups:
+        return False
+    return any(
+        db.session.execute(select(model.id).limit(1)).first() is not None
+        for model in (Reception, Outbound)
+    )
+
+
+@event.listens_for(Session, 'after_flush')
+def _roll_up_new_movements(session, flush_context):
+    new = [obj for obj in session.new if isinstance(obj, (Reception, Outbound))]
+    if not new:
+        return
+    connection = session.connection()
+    article_ids = {obj.article_id for obj in new}
+    articles = {
+        row.id: row for row in connection.execute(
+            select(Article.id, Article.categorie, Article.prix_unitaire).where(Article.id.in_(article_ids))
+        )
+    }
+
+    movements = []
+    for obj in new:
+        article = articles.get(obj.article_id)
+        categorie = article.categorie if article else None
+        article_price = article.prix_unitaire if article else None
+        if isinstance(obj, Reception):
+            price = obj.prix_unitaire if obj.prix_unitaire is not None else article_price
+            movements.append((obj.article_id, categorie, _as_date(obj.date_reception), RECEIVED,
+                              obj.quantite_recue, _money(price) * (obj.quantite_recue or 0), 1))
+        else:
+            movements.append((obj.article_id, categorie, _as_date(obj.date_sortie), ISSUED,
+                              obj.quantite_sortie, _money(article_price) * (obj.quantite_sortie or 0), 1))
+    apply_movements(connection, movements)
+
+
+def _series(periods, rows):
+    """Measure arrays aligned on `periods`, zero where a period has no rollup row"""
+    by_period = {row.period_start: row for row in rows}
+    series = {name: [] for name in SERIES_NAMES.values()}
+    for start in periods:
+        row = by_period.get(start)
+        for measure, name in SERIES_NAMES.items():
+            value = row._mapping[measure] if row is not None else 0
+            series[name].append(float(value) if measure.endswith('_value') else int(value))
+    return series
+
+
+def _summed(series):
+    return {name: round(sum(values), 2) if name.endswith('Value') else sum(values)
+            for name, values in series.items()}
+
+
+def consumption_series(granularity, start, end, category=None, article_id=None, group_by=None, limit=10):
+    """Chart-ready received / issued series between two dates
+
+    Without `start`, the DEFAULT_SPAN periods ending with `end` are returned.
+    Returns the period start dates, the total series (of the article, the
+    category or everything) and, with group_by 'category' or 'article', the
+    series of the `limit` busiest categories or articles in the range.
+    """
+    if granularity not in GRANULARITIES:
+        raise InvalidRange(f'Granularité inconnue: {granularity}')
+    start = start or default_start(end, granularity)
+    if start > end:
+        raise InvalidRange('La date de début doit précéder la date de fin')
+    periods = periods_between(start, end, granularity)
+    table = ConsumptionRollup.__table__
+    in_range = (table.c.granularity == granularity,
+                table.c.period_start >= periods[0], table.c.period_start <= periods[-1])
+
+    if article_id:
+        scope, key = ARTICLE_SCOPE, article_id
+    elif category:
+        scope, key = CATEGORY_SCOPE, category
+    else:
+        scope, key = GLOBAL_SCOPE, ''
+    totals = _series(periods, db.session.execute(
+        select(table).where(*in_range, table.c.scope == scope, table.c.key == key)
+    ))
+
+    result = {
+        'granularity': granularity,
+        'from': periods[0].isoformat(),
+        'to': end.isoformat(),
+        'periods': [start.isoformat() for start in periods],
+        'totals': totals,
+        'summary': _summed(totals)
+    }
+    if group_by not in ('category', 'article'):
+        return result
+
+    group_scope = CATEGORY_SCOPE if group_by == 'category' else ARTICLE_SCOPE
+    conditions = [*in_range, table.c.scope == group_scope]
+    if article_id:
+        conditions.append(table.c.key == (article_id if group_scope == ARTICLE_SCOPE else ''))
+    elif category:
+        conditions.append(table.c.categorie == category if group_scope == ARTICLE_SCOPE else table.c.key == category)
+
+    # Busiest keys first, then only their rows
+    activity = func.sum(table.c.received_qty + table.c.issued_qty)
+    keys = db.session.execute(
+        select(table.c.key).where(*conditions).group_by(table.c.key)
+        .order_by(activity.desc(), table.c.key).limit(limit)
+    ).scalars().all()
+    rows = {}
+    if keys:
+        for row in db.session.execute(select(table).where(*conditions, table.c.key.in_(keys))):
+            rows.setdefault(row.key, []).append(row)
+
+    labels = {}
+    if group_scope == ARTICLE_SCOPE and keys:
+        labels = {
+            row.id: row for row in db.session.execute(
+                select(Article.id, Article.code_article, Article.designation).where(Article.id.in_(keys))
+            )
+        }
+
+    series = []
+    for key in keys:
+        values = _series(periods, rows.get(key, []))
+        entry = {'key': key, 'label': key or 'Non catégorisé', 'summary': _summed(values), **values}
+        if group_scope == ARTICLE_SCOPE:
+            article = labels.get(key)
+            entry['codeArticle'] = article.code_article if article else None
+            entry['label'] = article.designation if article else key
+        series.append(entry)
+    result['series'] = series
+    return result
+
+
+def init_app(app):
+    """Register the consumption-rollup CLI commands"""
+
+    @app.cli.group('consumption-rollup')
+    def consumption_rollup_cli():
+        """Consumption rollup maintenance"""
+
+    @consumption_rollup_cli.command('rebuild')
+    def rebuild_command():
+        """Recompute every rollup from the reception and outbound history"""
+        written = rebuild(db.session.connection())
+        db.session.commit()
+        click.echo(f'Consumption rollups rebuilt: {written} row(s)')
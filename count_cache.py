@@ -0,0 +1,168 @@
+"""
+Total-count provider for StockCeramique paginated listings
+Whole-table totals come from a trigger-maintained row_counts table on
+SQLite and from the planner estimate (pg_class.reltuples) on PostgreSQL;
+filtered totals are counted once and cached until a commit touches the
+table or COUNT_CACHE_TTL expires, keeping at most COUNT_CACHE_SIZE of
+them (least recently used dropped first). Callers can still ask for an
+exact COUNT(*)
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from flask_models import db
+
+logger = logging.getLogger(__name__)
+
+# Below this many estimated rows PostgreSQL tables are counted exactly
+ESTIMATE_THRESHOLD = 10000
+
+SESSION_TABLES_KEY = 'count_cache_tables'
+
+
+def _sqlite_counter_statements(table):
+    return [
+        f"CREATE TRIGGER {table}_row_count_ai AFTER INSERT ON {table} BEGIN "
+        f"UPDATE row_counts SET row_count = row_count + 1 WHERE table_name = '{table}'; END",
+        f"CREATE TRIGGER {table}_row_count_ad AFTER DELETE ON {table} BEGIN "
+        f"UPDATE row_counts SET row_count = row_count - 1 WHERE table_name = '{table}'; END",
+        f"INSERT INTO row_counts (table_name, row_count) SELECT '{table}', COUNT(*) FROM {table}"
+    ]
+
+
+def _whole_table(query, table):
+    """True when the query selects every row of `table`"""
+    statement = query.statement
+    froms = statement.get_final_froms()
+    return statement.whereclause is None and len(froms) == 1 and getattr(froms[0], 'name', None) == table
+
+
+class CountCache:
+    """Cached and estimated totals, keyed by table and query"""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('COUNT_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('COUNT_CACHE_TTL', self.ttl)
+
+    def _ensure_counter(self, table):
+        """Create the SQLite row counter of a table once per process"""
+        engine = db.engine
+        key = (engine.url.render_as_string(hide_password=True), table)
+        if key in self._counters:
+            return self._counters[key]
+        with self._lock:
+            if key not in self._counters:
+                try:
+                    with engine.begin() as connection:
+                        connection.execute(text(
+                            'CREATE TABLE IF NOT EXISTS row_counts (table_name TEXT PRIMARY KEY, row_count INTEGER NOT NULL)'
+                        ))
+                        exists = connection.execute(
+                            text('SELECT 1 FROM row_counts WHERE table_name = :table'), {'table': table}
+                        ).first()
+                        if not exists:
+                            for statement in _sqlite_counter_statements(table):
+                                connection.execute(text(statement))
+                    self._counters[key] = True
+                except Exception as e:
+                    logger.warning(f"Row counter unavailable for {table}: {str(e)}")
+                    self._counters[key] = False
+        return self._counters[key]
+
+    def _table_total(self, table):
+        """(total, exact) of a whole table without scanning it, or None"""
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite' and self._ensure_counter(table):
+            total = db.session.execute(
+                text('SELECT row_count FROM row_counts WHERE table_name = :table'), {'table': table}
+            ).scalar()
+            return total, True
+        if dialect == 'postgresql':
+            estimate = db.session.execute(
+                text('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table)'), {'table': table}
+            ).scalar()
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return int(estimate), False
+        return None
+
+    def count(self, query, table, exact=False):
+        """Total rows of `query` over `table` as (total, exact)"""
+        query = query.order_by(None)
+        if exact:
+            return query.count(), True
+
+        if _whole_table(query, table):
+            total = self._table_total(table)
+            if total is not None:
+                return total
+
+        compiled = query.statement.compile(dialect=db.engine.dialect)
+        key = (table, str(compiled), repr(sorted(compiled.params.items())))
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached and cached[1] > now:
+                self._entries.move_to_end(key)
+                return cached[0], False
+
+        total = query.count()
+        with self._lock:
+            # Search terms make most keys one-off: drop expired entries, then the least recently used
+            for expired in [entry for entry, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[expired]
+            self._entries[key] = (total, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return total, True
+
+    def invalidate(self, *tables):
+        """Drop cached totals of the given tables (all tables without arguments)"""
+        with self._lock:
+            if not tables:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] in tables]:
+                del self._entries[key]
+
+
+count_cache = CountCache()
+
+
+def invalidate_on_commit(session, *tables):
+    """Drop the tables' cached totals once the session commits (bulk writes bypass flush events)"""
+    session.info.setdefault(SESSION_TABLES_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tables(session, flush_context):
+    tables = session.info.setdefault(SESSION_TABLES_KEY, set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(instance, '__tablename__', None)
+        if table:
+            tables.add(table)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_tables(session):
+    tables = session.info.pop(SESSION_TABLES_KEY, None)
+    if tables:
+        count_cache.invalidate(*tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_tables(session):
+    session.info.pop(SESSION_TABLES_KEY, None)
@@ -0,0 +1,65 @@
+"""
+Dashboard statistics for StockCeramique
+Computes every dashboard figure with a couple of grouped SQL aggregates
+and the materialized stock summary, instead of per-figure count() queries
+and Python-side loops over articles
+"""
+
+from sqlalchemy import select, func
+
+from flask_models import db, Supplier, Requestor, PurchaseRequest, Reception, Outbound
+from stock_summary import get_global_summary
+
+# Purchase request statuses shown on the dashboard chart
+PURCHASE_REQUEST_STATUSES = ['en_attente', 'approuve', 'refuse', 'commande', 'recu']
+
+
+def _count_of(model):
+    """Scalar subquery counting all rows of a model"""
+    return select(func.count()).select_from(model).scalar_subquery()
+
+
+def compute_entity_stats():
+    """Entity counts in a single SELECT, article figures from the stock summary"""
+    row = db.session.execute(
+        select(
+            _count_of(Supplier).label('total_suppliers'),
+            _count_of(Requestor).label('total_requestors'),
+            _count_of(PurchaseRequest).label('total_requests'),
+            _count_of(Reception).label('total_receptions'),
+            _count_of(Outbound).label('total_outbounds')
+        )
+    ).one()
+    summary = get_global_summary()
+
+    return {
+        'totalArticles': summary.article_count if summary else 0,
+        'totalSuppliers': row.total_suppliers or 0,
+        'totalRequestors': row.total_requestors or 0,
+        'totalRequests': row.total_requests or 0,
+        'totalReceptions': row.total_receptions or 0,
+        'totalOutbounds': row.total_outbounds or 0,
+        'lowStock': summary.low_stock_count if summary else 0,
+        'stockValue': float(summary.stock_value) if summary else 0
+    }
+
+
+def compute_status_counts():
+    """Purchase request status distribution from one GROUP BY"""
+    status_counts = {status: 0 for status in PURCHASE_REQUEST_STATUSES}
+    rows = db.session.execute(
+        select(PurchaseRequest.statut, func.count()).group_by(PurchaseRequest.statut)
+    ).all()
+    for statut, count in rows:
+        if statut in status_counts:
+            status_counts[statut] = count
+    return status_counts
+
+
+def compute_dashboard_stats():
+    """All aggregate figures needed by /api/dashboard/stats"""
+    stats = compute_entity_stats()
+    status_counts = compute_status_counts()
+    stats['pendingRequests'] = status_counts['en_attente']
+    stats['statusCounts'] = status_counts
+    return stats
@@ -10,6 +10,7 @@ import webview
 import webbrowser
 from flask_app import create_app
 from flask_models import db
+from schema_upgrade import upgrade_schema
 import sys
 import os
 import socket
@@ -161,6 +162,7 @@ def run_flask(port):
         # Ensure database exists and tables are created
         with app.app_context():
             db.create_all()
+            upgrade_schema()
             logger.info("✅ Database tables created successfully")
             
             # Database tables are now ready for use
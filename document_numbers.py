@@ -0,0 +1,143 @@
+"""
+Document numbering for StockCeramique
+Issues purchase request (DA-YYYY-NNNN) and outbound (OUT-YYYYMMDD-NNNNNN)
+numbers from per-prefix, per-year counters in the document_counters table.
+A number costs one relative UPDATE ... RETURNING on a single row, and the
+row lock makes concurrent workers take distinct values. Optionally each
+worker reserves a block of numbers at a time
+"""
+
+import threading
+from datetime import datetime
+
+import click
+from sqlalchemy import select, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from flask_models import db, DocumentCounter, PurchaseRequest, Outbound
+
+PURCHASE_REQUEST_PREFIX = 'DA'
+OUTBOUND_PREFIX = 'OUT'
+
+DOCUMENT_FORMATS = {
+    PURCHASE_REQUEST_PREFIX: lambda at, value: f'DA-{at:%Y}-{value:04d}',
+    OUTBOUND_PREFIX: lambda at, value: f'OUT-{at:%Y%m%d}-{value:06d}',
+}
+
+# Columns whose existing numbers a new counter must start after. Outbound
+# numbers used to end with digits of the Unix time; as every number carries
+# the date it is issued on, only those of the counter's first day can clash
+SEEDED_COLUMNS = {
+    PURCHASE_REQUEST_PREFIX: PurchaseRequest.numero_demande,
+    OUTBOUND_PREFIX: Outbound.numero_sortie,
+}
+
+
+def _seed(connection, prefix, at):
+    """Highest number already used with the head (DA-YYYY-, OUT-YYYYMMDD-) of `at`"""
+    column = SEEDED_COLUMNS.get(prefix)
+    if column is None:
+        return 0
+    head = DOCUMENT_FORMATS[prefix](at, 0).rsplit('-', 1)[0] + '-'
+    highest = 0
+    for (number,) in connection.execute(select(column).where(column.like(f'{head}%'))):
+        suffix = number[len(head):]
+        if suffix.isdigit():
+            highest = max(highest, int(suffix))
+    return highest
+
+
+def _create_counter(connection, prefix, at):
+    """Insert the counter row of `at`'s year unless a concurrent worker already did"""
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    connection.execute(
+        dialect.insert(DocumentCounter.__table__)
+        .values(prefix=prefix, year=at.year, last_value=_seed(connection, prefix, at))
+        .on_conflict_do_nothing()
+    )
+
+
+def reserve(connection, prefix, at, count=1):
+    """Atomically take the next `count` values of the counter of `at`'s year; returns them as a range"""
+    year = at.year
+    table = DocumentCounter.__table__
+    statement = update(table) \
+        .where(table.c.prefix == prefix, table.c.year == year) \
+        .values(last_value=table.c.last_value + count)
+    for _ in range(2):
+        if connection.dialect.update_returning:
+            last_value = connection.execute(statement.returning(table.c.last_value)).scalar()
+        else:
+            result = connection.execute(statement)
+            last_value = connection.execute(
+                select(table.c.last_value).where(table.c.prefix == prefix, table.c.year == year)
+            ).scalar() if result.rowcount else None
+        if last_value is not None:
+            return range(last_value - count + 1, last_value + 1)
+        _create_counter(connection, prefix, at)
+    raise RuntimeError(f'Compteur {prefix}/{year} indisponible')
+
+
+class DocumentNumbers:
+    """Formatted document numbers, from the caller's transaction or from preallocated blocks
+
+    With block_size 1 (the default) numbers are taken in the session's
+    transaction: they are gapless and released if it rolls back, and
+    concurrent documents of the same prefix wait for each other's commit.
+    With a larger block_size, each process reserves that many numbers in a
+    short transaction of its own and hands them out locally; numbers stay
+    unique but may leave gaps and are not ordered across processes. SQLite
+    serialises writers anyway, so blocks are only used on PostgreSQL.
+    """
+
+    def __init__(self, block_size=1):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.block_size = app.config.get('DOCUMENT_NUMBER_BLOCK_SIZE', self.block_size)
+
+    def _from_blocks(self, prefix, at, count):
+        values = []
+        with self._lock:
+            block = self._blocks.get((prefix, at.year))
+            while len(values) < count:
+                if block is None or len(block) == 0:
+                    with db.engine.begin() as connection:
+                        block = reserve(connection, prefix, at, max(self.block_size, count - len(values)))
+                taken = block[:count - len(values)]
+                values.extend(taken)
+                block = block[len(taken):]
+            self._blocks[(prefix, at.year)] = block
+        return values
+
+    def next_numbers(self, prefix, count=1, at=None):
+        """`count` new numbers of a document prefix, formatted for the date `at` (default now)"""
+        at = at or datetime.utcnow()
+        if self.block_size > 1 and db.engine.dialect.name != 'sqlite':
+            values = self._from_blocks(prefix, at, count)
+        else:
+            values = reserve(db.session.connection(), prefix, at, count)
+        return [DOCUMENT_FORMATS[prefix](at, value) for value in values]
+
+    def next_number(self, prefix, at=None):
+        return self.next_numbers(prefix, 1, at)[0]
+
+
+document_numbers = DocumentNumbers()
+
+
+def init_app(app):
+    """Configure block preallocation and register the document-numbers CLI commands"""
+    document_numbers.init_app(app)
+
+    @app.cli.group('document-numbers')
+    def document_numbers_cli():
+        """Document numbering counters"""
+
+    @document_numbers_cli.command('show')
+    def show_command():
+        """Last number issued per prefix and year"""
+        for counter in DocumentCounter.query.order_by(DocumentCounter.prefix, DocumentCounter.year):
+            click.echo(f'{counter.prefix} {counter.year}: {counter.last_value}')
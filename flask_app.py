@@ -6,11 +6,24 @@ import os
 from datetime import datetime
 import uuid
 import logging
+from sqlalchemy import event
+from session_cache import session_cache
+from activity_log_writer import activity_log_writer
+from job_runner import job_runner
+from autocomplete_index import autocomplete_index
+from count_cache import count_cache
 # License managers removed for Replit environment
 
 # Initialize extensions
 migrate = Migrate()
 
+def enable_sqlite_wal(dbapi_connection, connection_record):
+    """Write-ahead logging lets background writers (jobs, activity log) commit
+    while requests and jobs still hold read transactions"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.close()
+
 def create_app():
     # Initialize Flask app
     app = Flask(__name__, static_folder='dist', static_url_path='')
@@ -46,7 +59,15 @@ def create_app():
     from flask_models import db
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', enable_sqlite_wal)
     CORS(app)
+    session_cache.init_app(app)
+    activity_log_writer.init_app(app)
+    job_runner.init_app(app)
+    autocomplete_index.init_app(app)
+    count_cache.init_app(app)
 
     # Configure logging
     logging.basicConfig(level=logging.INFO)
@@ -66,21 +87,53 @@ def create_app():
                 return redirect('/login')
             
             token = auth_header.split(' ')[1]
-            session = UserSession.query.filter_by(session_token=token).first()
             
-            if not session or not session.is_valid():
+            # Cached validation; last activity is written in periodic batches
+            if not session_cache.validate(token):
                 return redirect('/login')
             
-            # Update last activity
-            session.user.last_login = datetime.utcnow()
-            db.session.commit()
-            
             return f(*args, **kwargs)
         return decorated_function
 
     # Register all routes
     register_routes(app, db)
 
+    # Materialized stock summary maintenance commands
+    import stock_summary
+    stock_summary.init_app(app)
+
+    # Full-text search index maintenance commands
+    import search_index
+    search_index.init_app(app)
+
+    # Normalised search column maintenance commands
+    import normalized_columns
+    normalized_columns.init_app(app)
+
+    # Stock ledger snapshot and reconciliation commands
+    import stock_ledger
+    stock_ledger.init_app(app)
+
+    # Consumption rollup maintenance commands
+    import consumption_rollup
+    consumption_rollup.init_app(app)
+
+    # Reorder-point computation command
+    import reorder_points
+    reorder_points.init_app(app)
+
+    # Low-stock replenishment planner command
+    import replenishment
+    replenishment.init_app(app)
+
+    # Document numbering counters
+    import document_numbers
+    document_numbers.init_app(app)
+
+    # Query plan report command
+    import index_report
+    index_report.init_app(app)
+
     # Error handlers
     @app.errorhandler(404)
     def not_found(error):
@@ -166,7 +219,9 @@ if __name__ == '__main__':
     # Create tables if they don't exist
     with app.app_context():
         from flask_models import db
+        from schema_upgrade import upgrade_schema
         db.create_all()
+        upgrade_schema()
     
     # Run the application
     port = int(os.environ.get('PORT', 5000))
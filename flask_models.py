@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+import json
 import uuid
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -6,6 +7,13 @@ from werkzeug.security import generate_password_hash, check_password_hash
 # This will be initialized in the app factory
 db = SQLAlchemy()
 
+def normalized_indexes(table, *columns):
+    """B-tree indexes on *_norm search columns; text_pattern_ops lets PostgreSQL use them for LIKE 'prefix%'"""
+    return tuple(
+        db.Index(f'ix_{table}_{column}', column, postgresql_ops={column: 'text_pattern_ops'})
+        for column in columns
+    )
+
 def generate_uuid():
     return str(uuid.uuid4())
 
@@ -51,6 +59,11 @@ class UserSession(db.Model):
     
     user = db.relationship('User', backref='sessions')
     
+    __table_args__ = (
+        db.Index('ix_user_sessions_user_id', 'user_id'),
+        db.Index('ix_user_sessions_expires_at', 'expires_at'),  # expired-session cleanup
+    )
+    
     @staticmethod
     def create_session(user_id):
         # 24-hour session duration
@@ -92,7 +105,23 @@ class Article(db.Model):
     prix_unitaire = db.Column(db.Numeric(10, 2))
     seuil_minimum = db.Column(db.Integer, default=10)
     fournisseur_id = db.Column(db.String(36))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Lower-case, accent-free copies for searching, maintained by normalized_columns.py
+    designation_norm = db.Column(db.Text)
+    code_article_norm = db.Column(db.Text)
+    reference_norm = db.Column(db.Text)
+    marque_norm = db.Column(db.Text)
+    categorie_norm = db.Column(db.Text)
+    
+    __table_args__ = normalized_indexes('articles', 'designation_norm', 'code_article_norm', 'reference_norm',
+                                        'marque_norm', 'categorie_norm') + (
+        db.Index('ix_articles_categorie', 'categorie'),
+        db.Index('ix_articles_fournisseur_id', 'fournisseur_id'),
+        db.Index('ix_articles_created_at_id', 'created_at', 'id'),  # cursor pages
+        # Partial index holding only low-stock rows; the predicate must match the queries' filter
+        db.Index('ix_articles_low_stock', 'code_article',
+                 postgresql_where=stock_actuel <= seuil_minimum, sqlite_where=stock_actuel <= seuil_minimum),
+    )
     
     def to_dict(self):
         return {
@@ -123,7 +152,14 @@ class Supplier(db.Model):
     adresse = db.Column(db.Text)
     conditions_paiement = db.Column(db.Text)
     delai_livraison = db.Column(db.Integer)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Lower-case, accent-free copies for searching, maintained by normalized_columns.py
+    nom_norm = db.Column(db.Text)
+    contact_norm = db.Column(db.Text)
+    
+    __table_args__ = normalized_indexes('suppliers', 'nom_norm', 'contact_norm') + (
+        db.Index('ix_suppliers_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -149,7 +185,15 @@ class Requestor(db.Model):
     poste = db.Column(db.Text)
     email = db.Column(db.Text)
     telephone = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Lower-case, accent-free copies for searching, maintained by normalized_columns.py
+    nom_complet_norm = db.Column(db.Text)  # "prenom nom"
+    departement_norm = db.Column(db.Text)
+    poste_norm = db.Column(db.Text)
+    
+    __table_args__ = normalized_indexes('requestors', 'nom_complet_norm', 'departement_norm', 'poste_norm') + (
+        db.Index('ix_requestors_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -175,7 +219,13 @@ class PurchaseRequest(db.Model):
     statut = db.Column(db.Text, nullable=False, default='en_attente')  # en_attente, approuve, refuse, commande, recu
     total_articles = db.Column(db.Integer, nullable=False, default=0)
     total_estime = db.Column(db.Numeric(10, 2), default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_purchase_requests_statut_created_at', 'statut', 'created_at'),
+        db.Index('ix_purchase_requests_requestor_id', 'requestor_id'),
+        db.Index('ix_purchase_requests_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -209,7 +259,15 @@ class PurchaseRequestItem(db.Model):
     article = db.relationship('Article')
     supplier = db.relationship('Supplier')
     
-    def to_dict(self):
+    __table_args__ = (
+        db.Index('ix_purchase_request_items_purchase_request_id', 'purchase_request_id'),
+        db.Index('ix_purchase_request_items_article_id', 'article_id'),
+    )
+    
+    def to_dict(self, article=None, supplier=None, resolved=False):
+        """Item with its article and supplier; pass them with resolved=True to skip the lazy loads"""
+        if not resolved:
+            article, supplier = self.article, self.supplier
         return {
             'id': self.id,
             'purchaseRequestId': self.purchase_request_id,
@@ -219,10 +277,24 @@ class PurchaseRequestItem(db.Model):
             'prixUnitaireEstime': float(self.prix_unitaire_estime) if self.prix_unitaire_estime else None,
             'sousTotal': float(self.sous_total) if self.sous_total else 0,
             'observations': self.observations,
-            'article': self.article.to_dict() if self.article else None,
-            'supplier': self.supplier.to_dict() if self.supplier else None,
+            'article': article.to_dict() if article else None,
+            'supplier': supplier.to_dict() if supplier else None,
             'createdAt': self.created_at.isoformat() if self.created_at else None
         }
+    
+    @staticmethod
+    def to_dict_many(items):
+        """Serialise items with one IN query per referenced table instead of two SELECTs per item"""
+        article_ids = {item.article_id for item in items if item.article_id}
+        supplier_ids = {item.supplier_id for item in items if item.supplier_id}
+        articles = {article.id: article for article in Article.query.filter(Article.id.in_(article_ids))} \
+            if article_ids else {}
+        suppliers = {supplier.id: supplier for supplier in Supplier.query.filter(Supplier.id.in_(supplier_ids))} \
+            if supplier_ids else {}
+        return [
+            item.to_dict(articles.get(item.article_id), suppliers.get(item.supplier_id), resolved=True)
+            for item in items
+        ]
 
 # Goods Reception
 class Reception(db.Model):
@@ -236,7 +308,14 @@ class Reception(db.Model):
     prix_unitaire = db.Column(db.Numeric(10, 2))
     numero_bon_livraison = db.Column(db.Text)
     observations = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_receptions_article_id_date_reception', 'article_id', 'date_reception'),
+        db.Index('ix_receptions_supplier_id', 'supplier_id'),
+        db.Index('ix_receptions_date_reception', 'date_reception'),
+        db.Index('ix_receptions_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -263,7 +342,15 @@ class Outbound(db.Model):
     quantite_sortie = db.Column(db.Integer, nullable=False)
     motif_sortie = db.Column(db.Text, nullable=False)
     observations = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_outbounds_article_id_date_sortie', 'article_id', 'date_sortie'),
+        db.Index('ix_outbounds_numero_sortie', 'numero_sortie'),
+        db.Index('ix_outbounds_date_sortie', 'date_sortie'),
+        db.Index('ix_outbounds_requestor_id', 'requestor_id'),
+        db.Index('ix_outbounds_created_at_id', 'created_at', 'id'),
+    )
     
     def to_dict(self):
         return {
@@ -292,7 +379,14 @@ class ActivityLog(db.Model):
     new_values = db.Column(db.Text, nullable=True)  # JSON string of new values  
     ip_address = db.Column(db.String(45), nullable=True)
     user_agent = db.Column(db.Text, nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # The log viewer filters by type and/or action and always sorts newest first
+    __table_args__ = (
+        db.Index('ix_activity_logs_created_at', 'created_at'),
+        db.Index('ix_activity_logs_entity_type_created_at', 'entity_type', 'created_at'),
+        db.Index('ix_activity_logs_action_created_at', 'action', 'created_at'),
+    )
     
     def to_dict(self):
         return {
@@ -334,4 +428,172 @@ class ActivityLog(db.Model):
         if self.entity_name:
             return f"{action_desc} {entity_desc}: {self.entity_name}"
         else:
-            return f"{action_desc} {entity_desc}"
\ No newline at end of file
+            return f"{action_desc} {entity_desc}"
+
+# Stock Summary (materialized stock value and stock-level buckets)
+class StockSummary(db.Model):
+    __tablename__ = 'stock_summary'
+    
+    scope = db.Column(db.String(20), primary_key=True)  # global, categorie
+    categorie = db.Column(db.Text, primary_key=True, default='')  # Empty for the global row
+    article_count = db.Column(db.Integer, nullable=False, default=0)
+    stock_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    low_stock_count = db.Column(db.Integer, nullable=False, default=0)  # stock_actuel <= seuil_minimum
+    critical_count = db.Column(db.Integer, nullable=False, default=0)
+    low_count = db.Column(db.Integer, nullable=False, default=0)
+    medium_count = db.Column(db.Integer, nullable=False, default=0)
+    good_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'scope': self.scope,
+            'categorie': self.categorie or None,
+            'articleCount': self.article_count,
+            'stockValue': float(self.stock_value) if self.stock_value else 0,
+            'lowStockCount': self.low_stock_count,
+            'criticalCount': self.critical_count,
+            'lowCount': self.low_count,
+            'mediumCount': self.medium_count,
+            'goodCount': self.good_count,
+            'updatedAt': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+# Background Jobs (imports, exports and PDF generation run off the request thread)
+class BackgroundJob(db.Model):
+    __tablename__ = 'background_jobs'
+    
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    kind = db.Column(db.String(50), nullable=False)  # articles_import, articles_export_pdf, ...
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, succeeded, failed, cancelled
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    message = db.Column(db.Text)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    result_path = db.Column(db.Text)  # File produced by the job, under instance/job_results
+    result_filename = db.Column(db.String(255))
+    result_mimetype = db.Column(db.String(100))
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    owner = db.Column(db.String(100))  # host:pid of the process running the job
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'total': self.total,
+            'message': self.message,
+            'result': json.loads(self.result) if self.result else None,
+            'error': self.error,
+            'hasFile': bool(self.result_path),
+            'filename': self.result_filename,
+            'cancelRequested': self.cancel_requested,
+            'createdAt': self.created_at.isoformat() if self.created_at else None,
+            'startedAt': self.started_at.isoformat() if self.started_at else None,
+            'finishedAt': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+
+# Stock Ledger (append-only: one signed row per stock change)
+class StockMovement(db.Model):
+    __tablename__ = 'stock_movements'
+    
+    id = db.Column(db.String(36), primary_key=True, default=generate_uuid)
+    article_id = db.Column(db.String(36), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)  # Positive for entries, negative for exits
+    source_type = db.Column(db.String(20), nullable=False)  # reception, sortie, initial, ajustement, import
+    source_id = db.Column(db.String(36))  # Reception / outbound id when there is one
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_stock_movements_article_id_created_at', 'article_id', 'created_at'),
+        db.Index('ix_stock_movements_created_at', 'created_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'articleId': self.article_id,
+            'quantity': self.quantity,
+            'sourceType': self.source_type,
+            'sourceId': self.source_id,
+            'createdAt': self.created_at.isoformat() if self.created_at else None
+        }
+
+# Stock Snapshots (checkpoints of the ledger, so point-in-time queries replay only the tail)
+class StockSnapshot(db.Model):
+    __tablename__ = 'stock_snapshots'
+    
+    article_id = db.Column(db.String(36), primary_key=True)
+    taken_at = db.Column(db.DateTime, primary_key=True)
+    stock = db.Column(db.Integer, nullable=False)  # stock_actuel at taken_at
+    
+    __table_args__ = (
+        db.Index('ix_stock_snapshots_taken_at', 'taken_at'),
+    )
+
+# Consumption Rollups (received / issued totals per day, week and month)
+class ConsumptionRollup(db.Model):
+    __tablename__ = 'consumption_rollups'
+    
+    granularity = db.Column(db.String(10), primary_key=True)  # day, week, month
+    period_start = db.Column(db.Date, primary_key=True)  # Day, Monday of the week or 1st of the month
+    scope = db.Column(db.String(20), primary_key=True)  # global, categorie, article
+    key = db.Column(db.String(255), primary_key=True, default='')  # Category or article id; empty for global
+    categorie = db.Column(db.Text)  # Category of the article rows
+    received_qty = db.Column(db.Integer, nullable=False, default=0)
+    received_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    received_count = db.Column(db.Integer, nullable=False, default=0)
+    issued_qty = db.Column(db.Integer, nullable=False, default=0)
+    issued_value = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    issued_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        db.Index('ix_consumption_rollups_granularity_scope_period', 'granularity', 'scope', 'period_start'),
+    )
+
+# Reorder Points (consumption statistics and suggested reorder point per article, recomputed in batch)
+class ReorderPoint(db.Model):
+    __tablename__ = 'reorder_points'
+    
+    article_id = db.Column(db.String(36), primary_key=True)
+    average_daily = db.Column(db.Float, nullable=False, default=0)  # Mean units issued per day
+    std_daily = db.Column(db.Float, nullable=False, default=0)  # Standard deviation of daily issues
+    lead_time_days = db.Column(db.Integer, nullable=False)  # Supplier delai_livraison or the default
+    safety_stock = db.Column(db.Float, nullable=False, default=0)
+    reorder_point = db.Column(db.Integer, nullable=False, default=0)
+    history_days = db.Column(db.Integer, nullable=False)  # Days of history the statistics cover
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'articleId': self.article_id,
+            'averageDaily': self.average_daily,
+            'stdDaily': self.std_daily,
+            'leadTimeDays': self.lead_time_days,
+            'safetyStock': self.safety_stock,
+            'reorderPoint': self.reorder_point,
+            'historyDays': self.history_days,
+            'computedAt': self.computed_at.isoformat() if self.computed_at else None
+        }
+
+# Document Counters (last number issued per document prefix and year)
+class DocumentCounter(db.Model):
+    __tablename__ = 'document_counters'
+    
+    prefix = db.Column(db.String(20), primary_key=True)  # DA, OUT
+    year = db.Column(db.Integer, primary_key=True)
+    last_value = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'prefix': self.prefix,
+            'year': self.year,
+            'lastValue': self.last_value
+        }
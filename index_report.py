@@ -0,0 +1,91 @@
+"""
+Index usage report for StockCeramique
+Prints the query plan of the filters and sorts used by the API endpoints,
+flagging full table scans, so index coverage can be checked on a real
+database with `flask index-report`
+"""
+
+from datetime import datetime, timedelta
+
+import click
+
+from flask_models import (db, Article, Reception, Outbound, PurchaseRequest, PurchaseRequestItem,
+                          ActivityLog, UserSession)
+
+SAMPLE_ID = '00000000-0000-0000-0000-000000000000'
+
+
+def api_queries():
+    """(label, query) pairs mirroring the hot queries of routes.py"""
+    since = datetime.utcnow() - timedelta(days=1)
+    return [
+        ('GET /api/articles?category=',
+         Article.query.filter(Article.categorie == 'Électrique').limit(20)),
+        ('GET /api/articles/low-stock',
+         Article.query.filter(Article.stock_actuel <= Article.seuil_minimum)),
+        ('GET /api/activity-logs',
+         ActivityLog.query.order_by(ActivityLog.created_at.desc()).limit(50)),
+        ('GET /api/activity-logs?entity_type=',
+         ActivityLog.query.filter(ActivityLog.entity_type == 'articles')
+         .order_by(ActivityLog.created_at.desc()).limit(50)),
+        ('GET /api/activity-logs?action=',
+         ActivityLog.query.filter(ActivityLog.action == 'CREATE')
+         .order_by(ActivityLog.created_at.desc()).limit(50)),
+        ('GET /api/notifications',
+         Reception.query.filter(Reception.date_reception >= since)),
+        ('GET /api/dashboard/stats',
+         Reception.query.order_by(Reception.date_reception.desc()).limit(5)),
+        ('Réceptions d\'un article',
+         Reception.query.filter(Reception.article_id == SAMPLE_ID).order_by(Reception.date_reception)),
+        ('Réceptions d\'un fournisseur',
+         Reception.query.filter(Reception.supplier_id == SAMPLE_ID)),
+        ('Sorties d\'un article',
+         Outbound.query.filter(Outbound.article_id == SAMPLE_ID).order_by(Outbound.date_sortie)),
+        ('Sorties d\'un bon (numero_sortie)',
+         Outbound.query.filter(Outbound.numero_sortie == 'OUT-20260101-000001')),
+        ('GET /api/purchase-follow/status',
+         PurchaseRequest.query.filter(PurchaseRequest.statut == 'en_attente')
+         .order_by(PurchaseRequest.created_at.desc())),
+        ('GET /api/purchase-requests/<id>/items',
+         PurchaseRequestItem.query.filter(PurchaseRequestItem.purchase_request_id == SAMPLE_ID)),
+        ('Nettoyage des sessions expirées',
+         UserSession.query.filter(UserSession.expires_at < datetime.utcnow())),
+    ]
+
+
+def explain(connection, query):
+    """Plan lines of a query on the connection's database"""
+    statement = query.statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True})
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}')]
+    return [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {statement}')]
+
+
+def is_full_scan(plan_lines):
+    for line in plan_lines:
+        if line.startswith('SCAN ') and ' INDEX ' not in line:  # SQLite
+            return True
+        if 'Seq Scan' in line:  # PostgreSQL
+            return True
+    return False
+
+
+def init_app(app):
+    """Register the index-report CLI command"""
+
+    @app.cli.command('index-report')
+    @click.option('--scans-only', is_flag=True, help='Only list queries that scan a whole table')
+    def index_report_command(scans_only):
+        """Print the query plan of each API query"""
+        full_scans = 0
+        with db.engine.connect() as connection:
+            for label, query in api_queries():
+                plan = explain(connection, query)
+                scan = is_full_scan(plan)
+                full_scans += scan
+                if scans_only and not scan:
+                    continue
+                click.echo(f"{'[SCAN] ' if scan else ''}{label}")
+                for line in plan:
+                    click.echo(f'    {line}')
+        click.echo(f'{full_scans} requête(s) sans index')
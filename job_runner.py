@@ -0,0 +1,254 @@
+"""
+Background jobs for StockCeramique
+Runs long operations (imports, exports, PDF generation) on a small thread
+pool. Jobs are recorded in the background_jobs table so any worker process
+can report their status, and files they produce are kept on disk under
+instance/job_results until they expire
+"""
+
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import update, delete
+from werkzeug.utils import secure_filename
+
+from flask_models import db, BackgroundJob, generate_uuid
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+ACTIVE_STATUSES = (PENDING, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job once its cancellation has been requested"""
+
+
+def _process_alive(pid):
+    if pid == os.getpid():
+        return True
+    if os.name == 'nt':
+        # The desktop build runs a single process, and os.kill(pid, 0) would terminate it on Windows
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobHandle:
+    """Given to job functions to report progress and produce a result file"""
+
+    def __init__(self, runner, job_id, kind):
+        self.id = job_id
+        self.kind = kind
+        self.output = None
+        self._runner = runner
+
+    def update_progress(self, progress, total=None, message=None):
+        """Record progress; raises JobCancelled if the job was cancelled meanwhile"""
+        values = {'progress': progress}
+        if total is not None:
+            values['total'] = total
+        if message is not None:
+            values['message'] = message
+        self._runner._update(self.id, values)
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        if self._runner.is_cancel_requested(self.id):
+            raise JobCancelled()
+
+    def output_file(self, filename, mimetype):
+        """Path the job should write its downloadable result to"""
+        directory = os.path.join(self._runner.results_dir, self.id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, secure_filename(filename) or 'result')
+        self.output = (path, filename, mimetype)
+        return path
+
+
+class JobRunner:
+    """Thread pool executing jobs inside the application context
+
+    Status changes are written in their own short transactions, separate
+    from the session the job itself uses for its work.
+    """
+
+    def __init__(self, max_workers=2, retention_days=7):
+        self.max_workers = max_workers
+        self.retention_days = retention_days
+        self.results_dir = None
+        self._executor = None
+        self._lock = threading.Lock()
+        self._recovered = False
+        self._app = None
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('JOB_WORKERS', self.max_workers)
+        self.retention_days = app.config.get('JOB_RETENTION_DAYS', self.retention_days)
+        self.results_dir = app.config.get('JOB_RESULTS_DIR', os.path.join(app.instance_path, 'job_results'))
+        self._app = app
+
+    @property
+    def owner(self):
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='job')
+            return self._executor
+
+    def _update(self, job_id, values, *conditions):
+        statement = update(BackgroundJob.__table__).where(BackgroundJob.__table__.c.id == job_id, *conditions).values(**values)
+        with db.engine.begin() as connection:
+            return connection.execute(statement).rowcount
+
+    def _ensure_recovered(self):
+        """Once per process: close jobs orphaned by a dead process and purge expired ones"""
+        if self._recovered:
+            return
+        with self._lock:
+            if self._recovered:
+                return
+            self._recovered = True
+        try:
+            self._fail_orphans()
+            self.purge()
+        except Exception as e:
+            logger.warning(f"Background job recovery skipped: {str(e)}")
+
+    def _fail_orphans(self):
+        hostname = socket.gethostname()
+        active = BackgroundJob.query.filter(BackgroundJob.status.in_(ACTIVE_STATUSES)).all()
+        for job in active:
+            host, _, pid = (job.owner or '').rpartition(':')
+            if host != hostname or not pid.isdigit() or _process_alive(int(pid)):
+                continue
+            self._update(job.id, {
+                'status': FAILED,
+                'error': 'Tâche interrompue par l\'arrêt de l\'application',
+                'finished_at': datetime.utcnow()
+            })
+        db.session.rollback()
+
+    def purge(self, older_than_days=None):
+        """Delete finished jobs (and their files) older than the retention period"""
+        days = self.retention_days if older_than_days is None else older_than_days
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        expired = [job_id for job_id, in db.session.query(BackgroundJob.id).filter(
+            BackgroundJob.status.in_(FINISHED_STATUSES),
+            BackgroundJob.finished_at < cutoff
+        ).all()]
+        db.session.rollback()
+        for job_id in expired:
+            shutil.rmtree(os.path.join(self.results_dir, job_id), ignore_errors=True)
+        if expired:
+            with db.engine.begin() as connection:
+                connection.execute(delete(BackgroundJob.__table__).where(BackgroundJob.__table__.c.id.in_(expired)))
+        return len(expired)
+
+    def submit(self, kind, func, *args, **kwargs):
+        """Run func(job, *args, **kwargs) in the background and return its handle"""
+        self._ensure_recovered()
+        handle = JobHandle(self, generate_uuid(), kind)
+        with db.engine.begin() as connection:
+            connection.execute(BackgroundJob.__table__.insert().values(
+                id=handle.id,
+                kind=kind,
+                status=PENDING,
+                progress=0,
+                cancel_requested=False,
+                owner=self.owner,
+                created_at=datetime.utcnow()
+            ))
+        self._get_executor().submit(self._run, handle, func, args, kwargs)
+        return handle
+
+    def _run(self, handle, func, args, kwargs):
+        table = BackgroundJob.__table__
+        with self._app.app_context():
+            started = self._update(
+                handle.id,
+                {'status': RUNNING, 'started_at': datetime.utcnow()},
+                table.c.status == PENDING,
+                table.c.cancel_requested.is_(False)
+            )
+            if not started:
+                self._update(handle.id, {'status': CANCELLED, 'finished_at': datetime.utcnow()}, table.c.status == PENDING)
+                return
+
+            values = {}
+            try:
+                result = func(handle, *args, **kwargs)
+                values = {'status': SUCCEEDED, 'result': json.dumps(result, default=str) if result is not None else None}
+                if handle.output:
+                    path, filename, mimetype = handle.output
+                    values.update(result_path=path, result_filename=filename, result_mimetype=mimetype)
+            except JobCancelled:
+                db.session.rollback()
+                self._discard_output(handle)
+                values = {'status': CANCELLED, 'message': 'Tâche annulée'}
+            except Exception as e:
+                logger.error(f"Job {handle.kind} {handle.id} failed: {str(e)}\n{traceback.format_exc()}")
+                db.session.rollback()
+                self._discard_output(handle)
+                values = {'status': FAILED, 'error': str(e)}
+            finally:
+                values['finished_at'] = datetime.utcnow()
+                try:
+                    self._update(handle.id, values)
+                except Exception as e:
+                    logger.error(f"Could not record outcome of job {handle.id}: {str(e)}")
+
+    def _discard_output(self, handle):
+        if handle.output:
+            shutil.rmtree(os.path.dirname(handle.output[0]), ignore_errors=True)
+
+    def get(self, job_id):
+        self._ensure_recovered()
+        return db.session.get(BackgroundJob, job_id)
+
+    def list(self, kind=None, limit=50):
+        self._ensure_recovered()
+        query = BackgroundJob.query
+        if kind:
+            query = query.filter(BackgroundJob.kind == kind)
+        return query.order_by(BackgroundJob.created_at.desc()).limit(limit).all()
+
+    def is_cancel_requested(self, job_id):
+        with db.engine.connect() as connection:
+            return bool(connection.execute(
+                db.select(BackgroundJob.__table__.c.cancel_requested).where(BackgroundJob.__table__.c.id == job_id)
+            ).scalar())
+
+    def cancel(self, job_id):
+        """Request cancellation; pending jobs stop at once, running ones at their next progress report
+
+        Returns False if the job does not exist or has already finished.
+        """
+        table = BackgroundJob.__table__
+        requested = self._update(job_id, {'cancel_requested': True}, table.c.status.in_(ACTIVE_STATUSES))
+        if requested:
+            self._update(job_id, {'status': CANCELLED, 'finished_at': datetime.utcnow()}, table.c.status == PENDING)
+        return bool(requested)
+
+
+job_runner = JobRunner()
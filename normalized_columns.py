@@ -0,0 +1,139 @@
+"""
+Normalised search columns for StockCeramique
+Maintains the lower-case, accent-free *_norm shadow columns of articles,
+suppliers and requestors on every ORM write, fills them for rows written
+before they existed, and builds search conditions over them
+"""
+
+import click
+from sqlalchemy import event, or_, and_, false, update, bindparam, select
+
+from flask_models import db, Article, Supplier, Requestor
+from text_normalize import normalize, normalize_tokens
+
+# Model -> {shadow column: source attributes (joined with a space)}
+NORMALIZED_COLUMNS = {
+    Article: {
+        'designation_norm': ('designation',),
+        'code_article_norm': ('code_article',),
+        'reference_norm': ('reference',),
+        'marque_norm': ('marque',),
+        'categorie_norm': ('categorie',)
+    },
+    Supplier: {
+        'nom_norm': ('nom',),
+        'contact_norm': ('contact',)
+    },
+    Requestor: {
+        'nom_complet_norm': ('prenom', 'nom'),
+        'departement_norm': ('departement',),
+        'poste_norm': ('poste',)
+    }
+}
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _normalize_sources(values):
+    return normalize(' '.join(str(value) for value in values if value)) or None
+
+
+def normalized_values(model, values):
+    """Shadow column values for a mapping of source attributes
+
+    Only shadow columns whose sources are all present are returned, so the
+    result can be merged into partial bulk-update mappings.
+    """
+    return {
+        column: _normalize_sources(values[source] for source in sources)
+        for column, sources in NORMALIZED_COLUMNS[model].items()
+        if all(source in values for source in sources)
+    }
+
+
+def _refresh(mapper, connection, target):
+    for column, sources in NORMALIZED_COLUMNS[type(target)].items():
+        setattr(target, column, _normalize_sources(getattr(target, source) for source in sources))
+
+
+for _model in NORMALIZED_COLUMNS:
+    event.listen(_model, 'before_insert', _refresh)
+    event.listen(_model, 'before_update', _refresh)
+
+
+def _prefix(column, prefix):
+    """Index-assisted prefix match on an already normalised column"""
+    if db.engine.dialect.name == 'sqlite':
+        # GLOB is case-sensitive, so SQLite can turn it into a range scan of the index
+        return column.op('GLOB')(f'{prefix}*')
+    return column.like(f'{prefix}%')
+
+
+def prefix_condition(model, term):
+    """Rows where a shadow column starts with the normalised term (uses the B-tree indexes)"""
+    prefix = normalize(term)
+    if not prefix:
+        return false()
+    return or_(*[_prefix(getattr(model, column), prefix) for column in NORMALIZED_COLUMNS[model]])
+
+
+def search_condition(model, term):
+    """Rows where every word of the term appears in some shadow column, ignoring case and accents"""
+    tokens = normalize_tokens(term)
+    if not tokens:
+        return false()
+    columns = [getattr(model, column) for column in NORMALIZED_COLUMNS[model]]
+    return and_(*[or_(*[column.like(f'%{token}%') for column in columns]) for token in tokens])
+
+
+def backfill(model, recompute=False, batch_size=BACKFILL_BATCH_SIZE):
+    """Fill the shadow columns of rows where they are missing (all rows with recompute)
+
+    Returns the number of rows written. Runs in its own transactions.
+    """
+    table = model.__table__
+    shadow = list(NORMALIZED_COLUMNS[model])
+    sources = sorted({source for sources in NORMALIZED_COLUMNS[model].values() for source in sources})
+    query = select(table.c.id, *[table.c[source] for source in sources]).order_by(table.c.id)
+    if not recompute:
+        query = query.where(or_(*[
+            and_(table.c[column].is_(None), or_(*[table.c[source].isnot(None) for source in NORMALIZED_COLUMNS[model][column]]))
+            for column in shadow
+        ]))
+    statement = update(table).where(table.c.id == bindparam('b_id')).values(
+        {column: bindparam(f'b_{column}') for column in shadow}
+    )
+
+    written = 0
+    last_id = None
+    while True:
+        with db.engine.begin() as connection:
+            page = query if last_id is None else query.where(table.c.id > last_id)
+            rows = connection.execute(page.limit(batch_size)).mappings().all()
+            if not rows:
+                return written
+            connection.execute(statement, [
+                {'b_id': row['id'], **{f'b_{column}': value for column, value in normalized_values(model, row).items()}}
+                for row in rows
+            ])
+        written += len(rows)
+        last_id = rows[-1]['id']
+
+
+def backfill_all(recompute=False):
+    return {model.__tablename__: backfill(model, recompute) for model in NORMALIZED_COLUMNS}
+
+
+def init_app(app):
+    """Register the normalized-columns CLI commands"""
+
+    @app.cli.group('normalized-columns')
+    def normalized_columns_cli():
+        """Normalised search column maintenance"""
+
+    @normalized_columns_cli.command('backfill')
+    @click.option('--all', 'recompute', is_flag=True, help='Recompute every row, not only missing values')
+    def backfill_command(recompute):
+        """Fill the *_norm search columns from the source columns"""
+        for table, written in backfill_all(recompute).items():
+            click.echo(f'{table}: {written} ligne(s) mise(s) à jour')
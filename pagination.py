@@ -0,0 +1,128 @@
+"""
+Keyset (cursor) pagination helpers for StockCeramique
+Pages are selected with a WHERE clause on the sort key of the last row
+seen, so deep pages cost the same as the first one. List endpoints switch
+to cursor pages when the request carries a `cursor` parameter (empty for
+the first page) and answer {items, nextCursor, hasMore}
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'t': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'d': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 't' in value:
+            return datetime.fromisoformat(value['t'])
+        if 'd' in value:
+            return Decimal(value['d'])
+    return value
+
+
+def encode_cursor(values):
+    """Opaque cursor string for the sort key values of a row"""
+    payload = json.dumps([_encode_value(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """Sort key values from a cursor produced by encode_cursor()"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(f'Curseur invalide: {cursor}') from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursor(f'Curseur invalide: {cursor}')
+    return [_decode_value(value) for value in values]
+
+
+def _after_condition(sort_keys, values):
+    """WHERE clause selecting rows strictly after `values` in sort order"""
+    clauses = []
+    for index, (expression, descending) in enumerate(sort_keys):
+        equal_prefix = [
+            previous_expression == previous_value
+            for (previous_expression, _), previous_value in zip(sort_keys[:index], values[:index])
+        ]
+        step = expression < values[index] if descending else expression > values[index]
+        clauses.append(and_(*equal_prefix, step))
+    return or_(*clauses)
+
+
+def parse_limit(raw_limit, default=DEFAULT_LIMIT):
+    """Clamp a requested page size to [1, MAX_LIMIT]"""
+    try:
+        limit = int(raw_limit) if raw_limit not in (None, '') else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def keyset_page(query, sort_keys, cursor=None, limit=DEFAULT_LIMIT):
+    """Fetch one page of `query` ordered by `sort_keys`
+
+    `sort_keys` is a list of (expression, descending) pairs whose last entry
+    must be unique (usually the primary key). Returns the rows and the cursor
+    of the next page, or None on the last page.
+    """
+    expressions = [expression.label(f'_sort_{index}') for index, (expression, _) in enumerate(sort_keys)]
+    if cursor:
+        query = query.filter(_after_condition(sort_keys, decode_cursor(cursor, len(sort_keys))))
+    query = query.add_columns(*expressions).order_by(
+        *[expression.desc() if descending else expression.asc() for expression, descending in sort_keys]
+    )
+
+    rows = query.limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more and rows:
+        next_cursor = encode_cursor(list(rows[-1])[-len(sort_keys):])
+    return [row[0] for row in rows], next_cursor
+
+
+def cursor_requested(args):
+    """True when a list request asks for cursor pages instead of the full list"""
+    return 'cursor' in args
+
+
+def creation_sort_keys(model):
+    """Newest-first (created_at, id) order shared by the list endpoints
+
+    created_at must not be NULL: a NULL fails every comparison of the page
+    condition. The models declare it NOT NULL and schema_upgrade backfills
+    rows of older databases.
+    """
+    return [(model.created_at, True), (model.id, True)]
+
+
+def cursor_page_response(query, model, args, serialize=None):
+    """JSON body of one newest-first cursor page of `query`"""
+    items, next_cursor = keyset_page(query, creation_sort_keys(model), args.get('cursor'), parse_limit(args.get('limit')))
+    serialize = serialize or (lambda item: item.to_dict())
+    return {
+        'items': [serialize(item) for item in items],
+        'nextCursor': next_cursor,
+        'hasMore': next_cursor is not None
+    }
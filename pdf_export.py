@@ -0,0 +1,110 @@
+"""
+Batched PDF export for StockCeramique
+Lays the table out in fixed-size row batches, each rendered as its own
+WeasyPrint document and written to a temporary PDF before the next batch
+is laid out, then concatenates the files with pypdf. Only one batch's
+layout is in memory at a time, layout cost grows linearly with the row
+count, and the stylesheet is parsed once per process
+"""
+
+import os
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from html import escape
+from itertools import islice
+
+# Rows laid out per WeasyPrint document (about 25 pages)
+PDF_BATCH_ROWS = 1000
+
+PDF_STYLESHEET = """
+    body { font-family: Arial, sans-serif; margin: 20px; }
+    .header { text-align: center; margin-bottom: 30px; }
+    .company { color: #003d9d; font-size: 24px; font-weight: bold; }
+    .title { color: #666; font-size: 18px; margin-top: 10px; }
+    .date { color: #999; font-size: 12px; margin-top: 5px; }
+    table { width: 100%; border-collapse: collapse; margin-top: 20px; }
+    th, td { border: 1px solid #ddd; padding: 8px; text-align: left; font-size: 10px; }
+    th { background-color: #003d9d; color: white; font-weight: bold; }
+    tr:nth-child(even) { background-color: #f9f9f9; }
+    .footer { margin-top: 30px; text-align: center; font-size: 10px; color: #666; }
+"""
+
+
+@lru_cache(maxsize=1)
+def _stylesheet():
+    from weasyprint import CSS
+    return CSS(string=PDF_STYLESHEET)
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _batch_html(title, headers, rows, first, last, total, footer_label):
+    """HTML of one batch; the first carries the page header, the last the totals"""
+    parts = ['<!DOCTYPE html><html><head><meta charset="UTF-8">', f'<title>{escape(title)} - StockCéramique</title></head><body>']
+    if first:
+        parts.append(
+            '<div class="header">'
+            '<div class="company">StockCéramique</div>'
+            f'<div class="title">{escape(title)}</div>'
+            f'<div class="date">Généré le {datetime.now().strftime("%d/%m/%Y à %H:%M")}</div>'
+            '</div>'
+        )
+    parts.append('<table><thead><tr>')
+    parts.extend(f'<th>{escape(str(header))}</th>' for header in headers)
+    parts.append('</tr></thead><tbody>')
+    for row in rows:
+        parts.append('<tr>' + ''.join(f'<td>{escape(str(value))}</td>' for value in row) + '</tr>')
+    parts.append('</tbody></table>')
+    if last:
+        parts.append(
+            '<div class="footer">'
+            f'<p>Total: {total} {footer_label}</p>'
+            '<p>StockCéramique - Système de Gestion d\'Inventaire</p>'
+            '</div>'
+        )
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def write_pdf(target, title, headers, rows, footer_label='articles', batch_size=PDF_BATCH_ROWS, progress=None):
+    """Render a table to a PDF at a path or binary file object
+
+    `progress(rows_done)` is called after each rendered batch and may raise
+    to abort the export.
+    """
+    from weasyprint import HTML
+    from pypdf import PdfWriter
+
+    stylesheets = [_stylesheet()]
+    done = 0
+
+    with tempfile.TemporaryDirectory(prefix='pdf_export_') as directory:
+        paths = []
+        batches = _batches(rows, batch_size)
+        current = next(batches, [])
+        while True:
+            following = next(batches, None)
+            done += len(current)
+            html = _batch_html(title, headers, current, first=not paths, last=following is None, total=done, footer_label=footer_label)
+            path = os.path.join(directory, f'batch_{len(paths):05d}.pdf')
+            # The rendered Document is dropped as soon as its pages are on disk
+            HTML(string=html).render(stylesheets=stylesheets).write_pdf(path)
+            paths.append(path)
+            if progress:
+                progress(done)
+            if following is None:
+                break
+            current = following
+
+        writer = PdfWriter()
+        for path in paths:
+            writer.append(path)
+        writer.write(target)
@@ -0,0 +1,86 @@
+"""
+Purchase follow-up board for StockCeramique
+Loads every Kanban column in one SELECT: requests are ranked per status
+with ROW_NUMBER(), joined to their requestor and summarised from their
+items in SQL, so the board payload stays bounded as history grows
+"""
+
+from sqlalchemy import select, func
+
+from flask_models import db, Requestor, PurchaseRequest, PurchaseRequestItem
+
+# Board column -> purchase request status
+FOLLOW_COLUMNS = {
+    'pending': 'en_attente',
+    'approved': 'approuve',
+    'ordered': 'commande',
+    'refused': 'refuse'
+}
+
+DEFAULT_COLUMN_LIMIT = 50
+
+
+def _item_aggregate(expression):
+    """Correlated aggregate over the items of the outer request (uses the purchase_request_id index)"""
+    return select(expression).where(
+        PurchaseRequestItem.purchase_request_id == PurchaseRequest.id
+    ).scalar_subquery()
+
+
+def follow_board(limit=DEFAULT_COLUMN_LIMIT):
+    """Newest `limit` requests of each column with requestor names and item totals"""
+    ranked = select(
+        PurchaseRequest.id.label('id'),
+        func.row_number().over(
+            partition_by=PurchaseRequest.statut,
+            order_by=(PurchaseRequest.date_demande.desc(), PurchaseRequest.id)
+        ).label('position'),
+        func.count().over(partition_by=PurchaseRequest.statut).label('column_total')
+    ).where(PurchaseRequest.statut.in_(FOLLOW_COLUMNS.values())).subquery()
+
+    line_total = func.coalesce(
+        PurchaseRequestItem.sous_total,
+        PurchaseRequestItem.quantite_demandee * PurchaseRequestItem.prix_unitaire_estime,
+        0
+    )
+    rows = db.session.execute(
+        select(
+            PurchaseRequest,
+            ranked.c.column_total,
+            Requestor.prenom,
+            Requestor.nom,
+            _item_aggregate(func.count()).label('item_count'),
+            _item_aggregate(func.coalesce(func.sum(PurchaseRequestItem.quantite_demandee), 0)).label('item_quantity'),
+            _item_aggregate(func.coalesce(func.sum(line_total), 0)).label('item_total')
+        )
+        .join(ranked, ranked.c.id == PurchaseRequest.id)
+        .outerjoin(Requestor, Requestor.id == PurchaseRequest.requestor_id)
+        .where(ranked.c.position <= limit)
+        .order_by(ranked.c.position)
+    ).all()
+
+    board = {column: [] for column in FOLLOW_COLUMNS}
+    counts = {column: 0 for column in FOLLOW_COLUMNS}
+    requestors = {}
+    columns_by_status = {status: column for column, status in FOLLOW_COLUMNS.items()}
+    for purchase_request, column_total, prenom, nom, item_count, item_quantity, item_total in rows:
+        column = columns_by_status[purchase_request.statut]
+        requestor_name = f'{prenom} {nom}' if nom is not None else None
+        board[column].append({
+            **purchase_request.to_dict(),
+            'requestorName': requestor_name,
+            'itemCount': item_count,
+            'itemQuantity': int(item_quantity),
+            'itemTotal': float(item_total)
+        })
+        counts[column] = column_total
+        if requestor_name:
+            requestors[purchase_request.requestor_id] = requestor_name
+
+    return {
+        **board,
+        'counts': counts,
+        'requestors': [{'id': requestor_id, 'name': name}
+                       for requestor_id, name in sorted(requestors.items(), key=lambda entry: entry[1])],
+        'limit': limit
+    }
@@ -0,0 +1,179 @@
+"""
+Reorder-point engine for StockCeramique
+Derives per-article consumption statistics from the daily consumption
+rollups and computes, with NumPy across all articles at once, average
+daily consumption, its variability, a safety stock and a suggested
+reorder point using the supplier lead time. Results are cached in the
+reorder_points table; days of cover are derived from the live stock when
+the cache is read
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+
+import click
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, insert, delete, func, case
+
+from flask_models import db, Article, Supplier, ConsumptionRollup, ReorderPoint
+from consumption_rollup import ARTICLE_SCOPE
+
+logger = logging.getLogger(__name__)
+
+# Days of outbound history used when none is given
+DEFAULT_HISTORY_DAYS = 365
+
+# Shortest window new articles are measured over, so a first busy day is not taken as the norm
+MIN_HISTORY_DAYS = 30
+
+# Lead time of articles without a supplier delay
+DEFAULT_LEAD_TIME_DAYS = 7
+
+# Safety factor for a ~95% service level (normal distribution)
+SERVICE_FACTOR = 1.65
+
+# Rows per INSERT batch when writing the cache
+WRITE_CHUNK_SIZE = 5000
+
+# Sort value of articles that do not move (infinite cover)
+NO_CONSUMPTION_COVER = 1e9
+
+
+def _load_articles(connection):
+    rows = connection.execute(
+        select(Article.id, Article.created_at, Supplier.delai_livraison)
+        .outerjoin(Supplier, Supplier.id == Article.fournisseur_id)
+    ).all()
+    return pd.DataFrame(rows, columns=['article_id', 'created_at', 'delai_livraison'])
+
+
+def _load_consumption(connection, start):
+    """Issued total and sum of squared daily issues per article since `start`, in one grouped query"""
+    table = ConsumptionRollup.__table__
+    rows = connection.execute(
+        select(table.c.key,
+               func.sum(table.c.issued_qty),
+               func.sum(table.c.issued_qty * table.c.issued_qty))
+        .where(table.c.granularity == 'day', table.c.scope == ARTICLE_SCOPE,
+               table.c.period_start >= start, table.c.issued_qty > 0)
+        .group_by(table.c.key)
+    ).all()
+    return pd.DataFrame(rows, columns=['article_id', 'issued', 'issued_squares'])
+
+
+def compute_statistics(articles, consumption, history_days, as_of):
+    """Vectorised consumption statistics and reorder points, one row per article
+
+    Days without outbounds count as zero consumption. Articles created
+    during the window are measured from their creation day, over at least
+    MIN_HISTORY_DAYS.
+    """
+    frame = articles.merge(consumption, on='article_id', how='left')
+    issued = frame['issued'].fillna(0).to_numpy(dtype=float)
+    squares = frame['issued_squares'].fillna(0).to_numpy(dtype=float)
+
+    created = pd.to_datetime(frame['created_at']).dt.normalize()
+    age_days = (pd.Timestamp(as_of) - created).dt.days.to_numpy(dtype=float) + 1
+    observed = np.clip(np.nan_to_num(age_days, nan=history_days), min(MIN_HISTORY_DAYS, history_days), history_days)
+
+    average = issued / observed
+    deviation = np.sqrt(np.clip(squares / observed - average ** 2, 0, None))
+    lead_time = np.clip(
+        pd.to_numeric(frame['delai_livraison'], errors='coerce').fillna(DEFAULT_LEAD_TIME_DAYS).to_numpy(dtype=float),
+        1, None
+    )
+    safety = SERVICE_FACTOR * deviation * np.sqrt(lead_time)
+    reorder = np.where(average > 0, np.ceil(average * lead_time + safety), 0)
+
+    return pd.DataFrame({
+        'article_id': frame['article_id'],
+        'average_daily': np.round(average, 4),
+        'std_daily': np.round(deviation, 4),
+        'lead_time_days': lead_time.astype(int),
+        'safety_stock': np.round(safety, 2),
+        'reorder_point': reorder.astype(int),
+        'history_days': observed.astype(int)
+    })
+
+
+def compute_reorder_points(history_days=DEFAULT_HISTORY_DAYS):
+    """Recompute the reorder_points cache for every article; returns the number of articles"""
+    as_of = date.today()
+    start = as_of - timedelta(days=history_days - 1)
+    computed_at = datetime.utcnow()
+    with db.engine.begin() as connection:
+        statistics = compute_statistics(
+            _load_articles(connection), _load_consumption(connection, start), history_days, as_of
+        )
+        columns = list(statistics.columns)
+        # tolist() yields Python scalars, which every DB driver accepts
+        records = [
+            {**dict(zip(columns, values)), 'computed_at': computed_at}
+            for values in zip(*[statistics[column].tolist() for column in columns])
+        ]
+        table = ReorderPoint.__table__
+        connection.execute(delete(table))
+        for offset in range(0, len(records), WRITE_CHUNK_SIZE):
+            connection.execute(insert(table), records[offset:offset + WRITE_CHUNK_SIZE])
+    logger.info(f'Reorder points computed for {len(records)} article(s) over {history_days} days')
+    return len(records)
+
+
+def ensure_computed():
+    """Fill the cache the first time it is read"""
+    if db.session.execute(select(ReorderPoint.article_id).limit(1)).first() is None:
+        compute_reorder_points()
+
+
+def days_of_cover_expression():
+    """Live stock divided by average daily consumption; NO_CONSUMPTION_COVER for articles that do not move"""
+    return case(
+        (ReorderPoint.average_daily > 0, Article.stock_actuel / ReorderPoint.average_daily),
+        else_=NO_CONSUMPTION_COVER
+    )
+
+
+def needs_reorder_condition():
+    return (ReorderPoint.average_daily > 0) & (Article.stock_actuel <= ReorderPoint.reorder_point)
+
+
+def serialize(reorder_point, article):
+    """Cached statistics with the article's live stock and days of cover"""
+    stock = article.stock_actuel if article else 0
+    average = reorder_point.average_daily
+    return {
+        **reorder_point.to_dict(),
+        'codeArticle': article.code_article if article else None,
+        'designation': article.designation if article else None,
+        'categorie': article.categorie if article else None,
+        'unite': article.unite if article else None,
+        'stockActuel': stock,
+        'seuilMinimum': article.seuil_minimum if article else None,
+        'daysOfCover': round(stock / average, 1) if average > 0 else None,
+        'needsReorder': average > 0 and stock <= reorder_point.reorder_point
+    }
+
+
+def job(handle, history_days=DEFAULT_HISTORY_DAYS):
+    """Background body of a reorder-point computation"""
+    # Progress is only reported outside the write transaction (SQLite allows one writer)
+    handle.update_progress(0, message=f'Analyse de {history_days} jours de sorties')
+    count = compute_reorder_points(history_days)
+    return {'message': f'Points de commande calculés pour {count} article(s)', 'articles': count}
+
+
+def init_app(app):
+    """Register the reorder-points CLI commands"""
+
+    @app.cli.group('reorder-points')
+    def reorder_points_cli():
+        """Reorder-point cache maintenance"""
+
+    @reorder_points_cli.command('compute')
+    @click.option('--days', 'history_days', type=int, default=DEFAULT_HISTORY_DAYS, show_default=True,
+                  help='Days of outbound history to analyse')
+    def compute_command(history_days):
+        """Recompute consumption statistics and reorder points (run periodically, e.g. nightly)"""
+        count = compute_reorder_points(history_days)
+        click.echo(f'Points de commande calculés pour {count} article(s)')
@@ -0,0 +1,182 @@
+"""
+Replenishment planner for StockCeramique
+Selects every article at or below its minimum threshold in one query,
+groups them by supplier and drafts one purchase request per supplier; the
+request headers and all their items are written with one bulk INSERT each.
+Articles already on an open purchase request are left out, so the weekly
+run can be repeated safely
+"""
+
+import logging
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+
+import click
+from sqlalchemy import select, insert, exists
+
+from flask_models import db, Article, Supplier, Requestor, PurchaseRequest, PurchaseRequestItem, generate_uuid
+from count_cache import invalidate_on_commit as invalidate_counts_on_commit
+from document_numbers import document_numbers, PURCHASE_REQUEST_PREFIX
+
+logger = logging.getLogger(__name__)
+
+# Purchase request statuses whose items are still to be received
+OPEN_STATUSES = ('en_attente', 'approuve', 'commande')
+
+# Suggested quantities bring the stock back up to this multiple of seuil_minimum
+ORDER_UP_TO_FACTOR = 2
+
+DRAFT_OBSERVATIONS = 'Brouillon généré automatiquement (réapprovisionnement)'
+
+
+def _low_stock_articles(categorie=None):
+    """Articles at or below their threshold and not on an open request, ordered by supplier
+
+    The supplier id comes from the join: articles whose fournisseur_id
+    points at a deleted supplier are drafted without a supplier.
+    """
+    on_open_request = exists().where(
+        PurchaseRequestItem.article_id == Article.id,
+        PurchaseRequestItem.purchase_request_id == PurchaseRequest.id,
+        PurchaseRequest.statut.in_(OPEN_STATUSES)
+    )
+    query = select(
+        Article.id, Article.code_article, Article.designation, Article.stock_actuel, Article.seuil_minimum,
+        Article.prix_unitaire, Supplier.id.label('supplier_id'), Supplier.nom.label('supplier_name')
+    ).outerjoin(Supplier, Supplier.id == Article.fournisseur_id) \
+        .where(Article.stock_actuel <= Article.seuil_minimum, ~on_open_request)
+    if categorie:
+        query = query.where(Article.categorie == categorie)
+    # Articles without a supplier come last, as their own draft
+    return db.session.execute(
+        query.order_by(Supplier.id.is_(None), Supplier.id, Article.code_article)
+    ).all()
+
+
+def suggested_quantity(stock_actuel, seuil_minimum):
+    return max(seuil_minimum * ORDER_UP_TO_FACTOR - stock_actuel, 1)
+
+
+def plan_replenishment(requestor_id, categorie=None, dry_run=False):
+    """Draft one purchase request per supplier for the low-stock articles
+
+    With dry_run nothing is written and the returned drafts have no id.
+    Commits the session otherwise. Returns the drafts with their items.
+    """
+    if db.session.get(Requestor, requestor_id) is None:
+        raise ValueError(f'Demandeur introuvable: {requestor_id}')
+    drafts = []
+    for supplier_id, rows in groupby(_low_stock_articles(categorie), key=lambda row: row.supplier_id):
+        rows = list(rows)
+        items = []
+        for row in rows:
+            quantity = suggested_quantity(row.stock_actuel, row.seuil_minimum)
+            price = row.prix_unitaire
+            items.append({
+                'article_id': row.id,
+                'supplier_id': supplier_id,
+                'quantite_demandee': quantity,
+                'prix_unitaire_estime': price,
+                'sous_total': Decimal(str(price)) * quantity if price is not None else None,
+                'code_article': row.code_article,
+                'designation': row.designation,
+                'stock_actuel': row.stock_actuel
+            })
+        drafts.append({
+            'supplier_id': supplier_id,
+            'supplier_name': rows[0].supplier_name,
+            'items': items,
+            'total_estime': sum((item['sous_total'] for item in items if item['sous_total'] is not None), Decimal('0'))
+        })
+
+    if drafts and not dry_run:
+        now = datetime.utcnow()
+        headers = []
+        lines = []
+        for draft, numero_demande in zip(drafts, document_numbers.next_numbers(PURCHASE_REQUEST_PREFIX, len(drafts))):
+            draft['id'] = generate_uuid()
+            draft['numero_demande'] = numero_demande
+            headers.append({
+                'id': draft['id'],
+                'numero_demande': numero_demande,
+                'date_demande': now,
+                'requestor_id': requestor_id,
+                'observations': DRAFT_OBSERVATIONS,
+                'statut': 'en_attente',
+                'total_articles': len(draft['items']),
+                'total_estime': draft['total_estime'],
+                'created_at': now
+            })
+            lines.extend({
+                'id': generate_uuid(),
+                'purchase_request_id': draft['id'],
+                'article_id': item['article_id'],
+                'supplier_id': item['supplier_id'],
+                'quantite_demandee': item['quantite_demandee'],
+                'prix_unitaire_estime': item['prix_unitaire_estime'],
+                'sous_total': item['sous_total'],
+                'created_at': now
+            } for item in draft['items'])
+
+        connection = db.session.connection()
+        connection.execute(insert(PurchaseRequest.__table__), headers)
+        connection.execute(insert(PurchaseRequestItem.__table__), lines)
+        invalidate_counts_on_commit(db.session, PurchaseRequest.__tablename__, PurchaseRequestItem.__tablename__)
+        db.session.commit()
+        logger.info(f'Replenishment: {len(headers)} purchase request(s), {len(lines)} item(s)')
+
+    return [_serialize(draft) for draft in drafts]
+
+
+def _serialize(draft):
+    return {
+        'id': draft.get('id'),
+        'numeroDemande': draft.get('numero_demande'),
+        'supplierId': draft['supplier_id'],
+        'supplierName': draft['supplier_name'],
+        'totalArticles': len(draft['items']),
+        'totalEstime': float(draft['total_estime']),
+        'items': [{
+            'articleId': item['article_id'],
+            'codeArticle': item['code_article'],
+            'designation': item['designation'],
+            'stockActuel': item['stock_actuel'],
+            'quantiteDemandee': item['quantite_demandee'],
+            'prixUnitaireEstime': float(item['prix_unitaire_estime']) if item['prix_unitaire_estime'] is not None else None,
+            'sousTotal': float(item['sous_total']) if item['sous_total'] is not None else None
+        } for item in draft['items']]
+    }
+
+
+def summary_message(drafts, dry_run=False):
+    count = sum(draft['totalArticles'] for draft in drafts)
+    verb = 'à créer' if dry_run else 'créée(s)'
+    return f'{len(drafts)} demande(s) d\'achat {verb} pour {count} article(s)'
+
+
+def job(handle, requestor_id, categorie=None):
+    """Background body of a replenishment run"""
+    handle.update_progress(0, message='Recherche des articles en stock bas')
+    drafts = plan_replenishment(requestor_id, categorie)
+    return {'message': summary_message(drafts), 'requests': drafts}
+
+
+def init_app(app):
+    """Register the replenishment CLI commands"""
+
+    @app.cli.group('replenishment')
+    def replenishment_cli():
+        """Purchase-request drafts for low-stock articles"""
+
+    @replenishment_cli.command('run')
+    @click.option('--requestor', 'requestor_id', required=True, help='Id of the requestor the drafts are filed under')
+    @click.option('--category', 'categorie', default=None, help='Only articles of this category')
+    @click.option('--dry-run', is_flag=True, help='Show the drafts without creating them')
+    def run_command(requestor_id, categorie, dry_run):
+        """Draft one purchase request per supplier (schedule it, e.g. weekly)"""
+        drafts = plan_replenishment(requestor_id, categorie, dry_run)
+        for draft in drafts:
+            click.echo(f"{draft['numeroDemande'] or '-'} {draft['supplierName'] or 'Sans fournisseur'}: "
+                       f"{draft['totalArticles']} article(s), {draft['totalEstime']:.2f} MAD")
+        click.echo(summary_message(drafts, dry_run))
@@ -1,24 +1,48 @@
-from flask import jsonify, request, send_file, make_response
-from datetime import datetime
+from flask import jsonify, request, send_file, make_response, Response, stream_with_context
+from datetime import date, datetime
 import uuid
 import time
 from sqlalchemy import or_, func, desc, and_
+from sqlalchemy.orm import joinedload
 import pandas as pd
 import io
 import csv
+import os
+import tempfile
 from werkzeug.utils import secure_filename
 
 def register_routes(app, db):
-    from flask_models import Article, Supplier, Requestor, PurchaseRequest, PurchaseRequestItem, Reception, Outbound, ActivityLog, User, UserSession
+    from flask_models import Article, Supplier, Requestor, PurchaseRequest, PurchaseRequestItem, Reception, Outbound, ActivityLog, User, UserSession, ReorderPoint
+    from dashboard_stats import compute_dashboard_stats
+    from purchase_follow import DEFAULT_COLUMN_LIMIT, follow_board
+    from stock_movements import apply_stock_deltas, SOURCE_RECEPTION, SOURCE_OUTBOUND
+    from stock_ledger import stock_levels_at
+    from consumption_rollup import InvalidRange, consumption_series
+    import reorder_points
+    import replenishment
+    from document_numbers import document_numbers, PURCHASE_REQUEST_PREFIX, OUTBOUND_PREFIX
+    from stock_summary import BUCKETS, article_bucket, bucket_expression, bucket_priority_expression, get_summary_rows
+    from pagination import InvalidCursor, keyset_page, parse_limit, cursor_requested, cursor_page_response
+    from search_index import apply_search
+    from normalized_columns import prefix_condition, search_condition
+    from autocomplete_index import autocomplete_index, search_result
+    from session_cache import session_cache
+    from activity_log_writer import activity_log_writer
+    from count_cache import count_cache
+    from article_import import import_dataframe, import_file_streaming, missing_columns as missing_import_columns
+    from job_runner import job_runner, SUCCEEDED
+    import article_export
+    from xlsx_export import XLSX_MIMETYPE, write_xlsx, xlsx_tempfile
+    from pdf_export import write_pdf
     import logging
     import json
     logger = logging.getLogger(__name__)
     
     # Activity logging helper functions
     def log_activity(action, entity_type, entity_id=None, entity_name=None, old_values=None, new_values=None):
-        """Log user activity to the database"""
+        """Queue a user activity entry for the batched activity log writer"""
         try:
-            activity_log = ActivityLog(
+            activity_log_writer.enqueue(
                 action=action,
                 entity_type=entity_type,
                 entity_id=entity_id,
@@ -28,8 +52,6 @@ def register_routes(app, db):
                 ip_address=request.remote_addr if request else None,
                 user_agent=request.headers.get('User-Agent') if request else None
             )
-            db.session.add(activity_log)
-            db.session.commit()
         except Exception as e:
             logger.error(f"Failed to log activity: {str(e)}")
             # Don't fail the main operation if logging fails
@@ -47,6 +69,28 @@ def register_routes(app, db):
             return entity_data.get('designation', 'Article inconnu')
         return str(entity_data.get('id', 'Inconnu'))
     
+    # Background job helpers
+    def wants_background_job():
+        """True when the caller asked for the operation to run as a background job"""
+        flag = request.args.get('async') or request.form.get('async') or ''
+        return flag.lower() in ('1', 'true', 'yes')
+    
+    def save_upload(file, file_ext):
+        """Keep an uploaded file on disk for a background job"""
+        upload_dir = os.path.join(app.instance_path, 'uploads')
+        os.makedirs(upload_dir, exist_ok=True)
+        upload_path = os.path.join(upload_dir, f"{uuid.uuid4()}.{file_ext}")
+        file.save(upload_path)
+        return upload_path
+    
+    def job_accepted(job, message):
+        return jsonify({
+            'message': message,
+            'jobId': job.id,
+            'statusUrl': f'/api/jobs/{job.id}',
+            'resultUrl': f'/api/jobs/{job.id}/result'
+        }), 202
+    
     # Load settings at startup  
     def load_system_settings():
         try:
@@ -113,6 +157,7 @@ def register_routes(app, db):
                 token = auth_header.split(' ')[1]
                 session = UserSession.query.filter_by(session_token=token).first()
                 
+                session_cache.invalidate(token)
                 if session:
                     # Log logout activity
                     log_activity('LOGOUT', 'users', session.user_id, session.user.username)
@@ -135,18 +180,15 @@ def register_routes(app, db):
                 return jsonify({'message': 'Token manquant'}), 401
             
             token = auth_header.split(' ')[1]
-            session = UserSession.query.filter_by(session_token=token).first()
             
-            if not session or not session.is_valid():
+            # Cached validation; last activity is written in periodic batches
+            session = session_cache.validate(token)
+            if not session:
                 return jsonify({'message': 'Session expirée'}), 401
             
-            # Update last activity
-            session.user.last_login = datetime.utcnow()
-            db.session.commit()
-            
             return jsonify({
                 'valid': True,
-                'user': session.user.to_dict(),
+                'user': session.user,
                 'expiresAt': session.expires_at.isoformat()
             })
             
@@ -251,6 +293,9 @@ def register_routes(app, db):
             entity_type = request.args.get('entity_type')
             action = request.args.get('action')
             
+            # Make queued entries visible before reading
+            activity_log_writer.flush()
+            
             # Build query
             query = ActivityLog.query
             
@@ -259,16 +304,23 @@ def register_routes(app, db):
             if action:
                 query = query.filter(ActivityLog.action == action)
             
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(query, ActivityLog, request.args))
+            
             # Paginate and order by newest first
             logs = query.order_by(ActivityLog.created_at.desc()).limit(limit).offset((page - 1) * limit).all()
-            total_count = query.count()
+            total_count, total_exact = count_cache.count(query, ActivityLog.__tablename__,
+                                                         exact=request.args.get('exact') == 'true')
             
             return jsonify({
                 'logs': [log.to_dict() for log in logs],
                 'totalCount': total_count,
+                'totalExact': total_exact,
                 'page': page,
                 'limit': limit
             })
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             logger.error(f"Activity logs error: {str(e)}")
             return jsonify({'message': f'Erreur lors de la récupération des logs: {str(e)}'}), 500
@@ -303,21 +355,20 @@ def register_routes(app, db):
             search = request.args.get('search', '', type=str)
             category = request.args.get('category', 'all', type=str)
             stock_filter = request.args.get('stock_filter', 'all', type=str)
+            ids = request.args.get('ids', '', type=str)
             
             # Build query with filters
             query = Article.query
+            use_cursor = cursor_requested(request.args)
             
-            # Apply search filter
+            # Articles referenced by rows a page has loaded (comma-separated ids)
+            if ids:
+                query = query.filter(Article.id.in_(ids.split(',')))
+            
+            # Apply search filter (cursor pages keep their own sort order, so filter without ranking)
             if search:
-                search_term = f"%{search}%"
-                query = query.filter(
-                    or_(
-                        Article.designation.ilike(search_term),
-                        Article.code_article.ilike(search_term),
-                        Article.reference.ilike(search_term),
-                        Article.marque.ilike(search_term)
-                    )
-                )
+                query = query.filter(search_condition(Article, search)) if use_cursor \
+                    else apply_search(query, 'articles', search)
             
             # Apply category filter
             if category != 'all':
@@ -336,28 +387,38 @@ def register_routes(app, db):
             elif stock_filter == 'high':
                 query = query.filter(Article.stock_actuel > Article.seuil_minimum * 3)
             
-            # Get paginated results
+            if use_cursor:
+                return jsonify(cursor_page_response(query, Article, request.args))
+            
+            # Get paginated results; the total comes from the count cache instead of a COUNT(*) per page
             pagination = query.paginate(
                 page=page,
                 per_page=per_page,
-                error_out=False
+                error_out=False,
+                count=False
             )
+            total, total_exact = count_cache.count(query, Article.__tablename__,
+                                                   exact=request.args.get('exact') == 'true')
+            pages = -(-total // pagination.per_page) if total else 0
             
             articles = [article.to_dict() for article in pagination.items]
             
             return jsonify({
                 'articles': articles,
                 'pagination': {
-                    'page': page,
-                    'per_page': per_page,
-                    'total': pagination.total,
-                    'pages': pagination.pages,
-                    'has_prev': pagination.has_prev,
-                    'has_next': pagination.has_next,
-                    'prev_num': pagination.prev_num,
-                    'next_num': pagination.next_num
+                    'page': pagination.page,
+                    'per_page': pagination.per_page,
+                    'total': total,
+                    'totalExact': total_exact,
+                    'pages': pages,
+                    'has_prev': pagination.page > 1,
+                    'has_next': pagination.page < pages,
+                    'prev_num': pagination.page - 1 if pagination.page > 1 else None,
+                    'next_num': pagination.page + 1 if pagination.page < pages else None
                 }
             })
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             logger.error(f"Error getting articles: {str(e)}")
             return jsonify({'message': 'Erreur lors de la récupération des articles'}), 500
@@ -369,15 +430,13 @@ def register_routes(app, db):
             if not query or len(query) < 3:
                 return jsonify([])
             
-            search_term = f'%{query.lower()}%'
-            articles = Article.query.filter(
-                or_(
-                    func.lower(Article.designation).like(search_term),
-                    func.lower(Article.code_article).like(search_term),
-                    func.lower(Article.reference).like(search_term),
-                    func.lower(Article.categorie).like(search_term)
-                )
-            ).limit(10).all()
+            # Code and name prefixes first (B-tree range scans), then full-text matches
+            articles = Article.query.filter(prefix_condition(Article, query)) \
+                .order_by(Article.code_article_norm).limit(10).all()
+            if len(articles) < 10:
+                found = [article.id for article in articles]
+                articles += apply_search(Article.query.filter(Article.id.notin_(found)), 'articles', query) \
+                    .limit(10 - len(articles)).all()
             
             return jsonify([article.to_dict() for article in articles])
         except Exception as e:
@@ -390,68 +449,14 @@ def register_routes(app, db):
             if not query or len(query) < 2:
                 return jsonify({'results': [], 'totalCount': 0})
             
-            search_term = f'%{query.lower()}%'
-            results = []
-            
-            # Search Articles
-            articles = Article.query.filter(
-                or_(
-                    func.lower(Article.designation).like(search_term),
-                    func.lower(Article.code_article).like(search_term),
-                    func.lower(Article.reference).like(search_term),
-                    func.lower(Article.categorie).like(search_term)
-                )
-            ).limit(5).all()
-            
-            for article in articles:
-                results.append({
-                    'type': 'article',
-                    'id': article.id,
-                    'title': article.designation,
-                    'subtitle': f'{article.code_article} - {article.categorie}',
-                    'extra': f'Stock: {article.stock_actuel}',
-                    'path': '/articles',
-                    'data': article.to_dict()
-                })
-            
-            # Search Suppliers
-            suppliers = Supplier.query.filter(
-                or_(
-                    func.lower(Supplier.nom).like(search_term),
-                    func.lower(Supplier.contact).like(search_term)
-                )
-            ).limit(5).all()
-            
-            for supplier in suppliers:
-                results.append({
-                    'type': 'supplier',
-                    'id': supplier.id,
-                    'title': supplier.nom,
-                    'subtitle': supplier.contact or 'Pas de contact',
-                    'extra': supplier.adresse or '',
-                    'path': '/suppliers',
-                    'data': supplier.to_dict()
-                })
-            
-            # Search Requestors
-            requestors = Requestor.query.filter(
-                or_(
-                    func.lower(func.concat(Requestor.prenom, ' ', Requestor.nom)).like(search_term),
-                    func.lower(Requestor.departement).like(search_term),
-                    func.lower(Requestor.poste).like(search_term)
-                )
-            ).limit(5).all()
-            
-            for requestor in requestors:
-                results.append({
-                    'type': 'requestor',
-                    'id': requestor.id,
-                    'title': f'{requestor.prenom} {requestor.nom}',
-                    'subtitle': requestor.departement,
-                    'extra': requestor.poste or '',
-                    'path': '/requestors',
-                    'data': requestor.to_dict()
-                })
+            # Answered from the in-memory index when it is ready
+            results = autocomplete_index.search(query, per_type=5)
+            if results is None:
+                results = [
+                    search_result(instance)
+                    for model, table in ((Article, 'articles'), (Supplier, 'suppliers'), (Requestor, 'requestors'))
+                    for instance in apply_search(model.query, table, query).limit(5).all()
+                ]
             
             return jsonify({
                 'results': results[:15],
@@ -614,8 +619,12 @@ def register_routes(app, db):
     @app.route("/api/suppliers", methods=['GET'])
     def get_suppliers():
         try:
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(Supplier.query, Supplier, request.args))
             suppliers = Supplier.query.all()
             return jsonify([supplier.to_dict() for supplier in suppliers])
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération des fournisseurs'}), 500
 
@@ -752,8 +761,12 @@ def register_routes(app, db):
     @app.route("/api/requestors", methods=['GET'])
     def get_requestors():
         try:
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(Requestor.query, Requestor, request.args))
             requestors = Requestor.query.all()
             return jsonify([requestor.to_dict() for requestor in requestors])
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération des demandeurs'}), 500
 
@@ -888,41 +901,93 @@ def register_routes(app, db):
     @app.route("/api/suppliers/export", methods=['GET'])
     def export_suppliers():
         try:
-            suppliers = Supplier.query.all()
-            
-            # Create DataFrame with supplier data
-            data = []
-            for supplier in suppliers:
-                data.append({
-                    'Nom': supplier.nom,
-                    'Contact': supplier.contact or '',
-                    'Téléphone': supplier.telephone or '',
-                    'Email': supplier.email or '',
-                    'Adresse': supplier.adresse or '',
-                    'Conditions de paiement': supplier.conditions_paiement or '',
-                    'Délai de livraison (jours)': supplier.delai_livraison or ''
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Create Excel file in memory
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Fournisseurs', index=False)
+            headers = ['Nom', 'Contact', 'Téléphone', 'Email', 'Adresse', 'Conditions de paiement', 'Délai de livraison (jours)']
+            rows = (
+                [
+                    supplier.nom,
+                    supplier.contact or '',
+                    supplier.telephone or '',
+                    supplier.email or '',
+                    supplier.adresse or '',
+                    supplier.conditions_paiement or '',
+                    supplier.delai_livraison or ''
+                ]
+                for supplier in Supplier.query.order_by(Supplier.nom).yield_per(500)
+            )
             
-            output.seek(0)
+            # Rows are written to a temporary file as they are fetched
+            output = xlsx_tempfile('Fournisseurs', headers, rows)
             
-            # Create response
             filename = f"fournisseurs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-            return response
+            return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
             
         except Exception as e:
             logger.error(f"Suppliers export error: {str(e)}")
             return jsonify({'message': f'Erreur lors de l\'export: {str(e)}'}), 500
 
+    def import_suppliers_frame(df):
+        """Create suppliers from an uploaded frame; returns (imported_count, errors)"""
+        imported_count = 0
+        errors = []
+        
+        for index, row in df.iterrows():
+            try:
+                # Check if supplier name is provided
+                if pd.isna(row.get('Nom')) or str(row.get('Nom')).strip() == '':
+                    errors.append(f"Ligne {index + 2}: Nom requis")
+                    continue
+                
+                # Check if supplier already exists
+                existing = Supplier.query.filter_by(nom=str(row['Nom']).strip()).first()
+                if existing:
+                    errors.append(f"Ligne {index + 2}: Fournisseur '{row['Nom']}' existe déjà")
+                    continue
+                
+                # Create new supplier
+                supplier = Supplier(
+                    nom=str(row['Nom']).strip(),
+                    contact=str(row.get('Contact', '')).strip() if not pd.isna(row.get('Contact')) else None,
+                    telephone=str(row.get('Téléphone', '')).strip() if not pd.isna(row.get('Téléphone')) else None,
+                    email=str(row.get('Email', '')).strip() if not pd.isna(row.get('Email')) else None,
+                    adresse=str(row.get('Adresse', '')).strip() if not pd.isna(row.get('Adresse')) else None,
+                    conditions_paiement=str(row.get('Conditions de paiement', '')).strip() if not pd.isna(row.get('Conditions de paiement')) else None,
+                    delai_livraison=int(row.get('Délai de livraison (jours)', 0)) if not pd.isna(row.get('Délai de livraison (jours)')) and str(row.get('Délai de livraison (jours)')).strip() != '' else None
+                )
+                
+                db.session.add(supplier)
+                imported_count += 1
+                
+            except Exception as e:
+                errors.append(f"Ligne {index + 2}: {str(e)}")
+        
+        db.session.commit()
+        
+        # Log activity
+        if imported_count > 0:
+            log_activity(
+                action='IMPORT',
+                entity_type='suppliers',
+                entity_name=f'{imported_count} fournisseurs'
+            )
+        return imported_count, errors
+    
+    def run_suppliers_import(job, upload_path):
+        """Background body of a supplier import"""
+        try:
+            df = pd.read_excel(upload_path)
+        finally:
+            os.remove(upload_path)
+        if 'Nom' not in df.columns:
+            raise ValueError('Colonne "Nom" requise dans le fichier Excel')
+        
+        job.update_progress(0, total=len(df), message=f'{len(df)} lignes à importer')
+        imported_count, errors = import_suppliers_frame(df)
+        return {
+            'message': f'{imported_count} fournisseur(s) importé(s) avec succès',
+            'imported': imported_count,
+            'errors': errors
+        }
+
     @app.route("/api/suppliers/import", methods=['POST'])
     def import_suppliers():
         try:
@@ -933,58 +998,19 @@ def register_routes(app, db):
             if file.filename == '' or not file.filename.endswith(('.xlsx', '.xls')):
                 return jsonify({'message': 'Fichier Excel requis (.xlsx ou .xls)'}), 400
             
+            if wants_background_job():
+                upload_path = save_upload(file, file.filename.rsplit('.', 1)[1].lower())
+                job = job_runner.submit('suppliers_import', run_suppliers_import, upload_path)
+                return job_accepted(job, 'Import démarré')
+            
             # Read Excel file
             df = pd.read_excel(file)
             
-            # Expected columns
-            expected_columns = ['Nom', 'Contact', 'Téléphone', 'Email', 'Adresse', 'Conditions de paiement', 'Délai de livraison (jours)']
-            
             # Check if required column exists
             if 'Nom' not in df.columns:
                 return jsonify({'message': 'Colonne "Nom" requise dans le fichier Excel'}), 400
             
-            imported_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Check if supplier name is provided
-                    if pd.isna(row.get('Nom')) or str(row.get('Nom')).strip() == '':
-                        errors.append(f"Ligne {index + 2}: Nom requis")
-                        continue
-                    
-                    # Check if supplier already exists
-                    existing = Supplier.query.filter_by(nom=str(row['Nom']).strip()).first()
-                    if existing:
-                        errors.append(f"Ligne {index + 2}: Fournisseur '{row['Nom']}' existe déjà")
-                        continue
-                    
-                    # Create new supplier
-                    supplier = Supplier(
-                        nom=str(row['Nom']).strip(),
-                        contact=str(row.get('Contact', '')).strip() if not pd.isna(row.get('Contact')) else None,
-                        telephone=str(row.get('Téléphone', '')).strip() if not pd.isna(row.get('Téléphone')) else None,
-                        email=str(row.get('Email', '')).strip() if not pd.isna(row.get('Email')) else None,
-                        adresse=str(row.get('Adresse', '')).strip() if not pd.isna(row.get('Adresse')) else None,
-                        conditions_paiement=str(row.get('Conditions de paiement', '')).strip() if not pd.isna(row.get('Conditions de paiement')) else None,
-                        delai_livraison=int(row.get('Délai de livraison (jours)', 0)) if not pd.isna(row.get('Délai de livraison (jours)')) and str(row.get('Délai de livraison (jours)')).strip() != '' else None
-                    )
-                    
-                    db.session.add(supplier)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Ligne {index + 2}: {str(e)}")
-            
-            db.session.commit()
-            
-            # Log activity
-            if imported_count > 0:
-                log_activity(
-                    action='IMPORT',
-                    entity_type='suppliers',
-                    entity_name=f'{imported_count} fournisseurs'
-                )
+            imported_count, errors = import_suppliers_frame(df)
             
             return jsonify({
                 'message': f'{imported_count} fournisseur(s) importé(s) avec succès',
@@ -1001,47 +1027,106 @@ def register_routes(app, db):
     @app.route("/api/requestors/export", methods=['GET'])
     def export_requestors():
         try:
-            requestors = Requestor.query.all()
-            
-            # Create DataFrame with requestor data
-            data = []
-            for requestor in requestors:
-                data.append({
-                    'Prénom': requestor.prenom,
-                    'Nom': requestor.nom,
-                    'Département': requestor.departement,
-                    'Poste': requestor.poste or '',
-                    'Email': requestor.email or '',
-                    'Téléphone': requestor.telephone or ''
-                })
-            
-            df = pd.DataFrame(data)
-            
-            # Create Excel file in memory
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Demandeurs', index=False)
+            headers = ['Prénom', 'Nom', 'Département', 'Poste', 'Email', 'Téléphone']
+            rows = (
+                [
+                    requestor.prenom,
+                    requestor.nom,
+                    requestor.departement,
+                    requestor.poste or '',
+                    requestor.email or '',
+                    requestor.telephone or ''
+                ]
+                for requestor in Requestor.query.order_by(Requestor.nom, Requestor.prenom).yield_per(500)
+            )
             
-            output.seek(0)
+            # Rows are written to a temporary file as they are fetched
+            output = xlsx_tempfile('Demandeurs', headers, rows)
+            exported_count = db.session.query(func.count(Requestor.id)).scalar()
             
             # Log activity
             log_activity(
                 action='EXPORT',
                 entity_type='requestors',
-                entity_name=f'{len(requestors)} demandeurs'
+                entity_name=f'{exported_count} demandeurs'
             )
             
-            # Create response
             filename = f"demandeurs_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-            return response
+            return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
             
         except Exception as e:
             logger.error(f"Requestors export error: {str(e)}")
             return jsonify({'message': f'Erreur lors de l\'export: {str(e)}'}), 500
 
+    REQUESTOR_REQUIRED_COLUMNS = ['Prénom', 'Nom', 'Département']
+    
+    def import_requestors_frame(df):
+        """Create requestors from an uploaded frame; returns (imported_count, errors)"""
+        imported_count = 0
+        errors = []
+        
+        for index, row in df.iterrows():
+            try:
+                # Check required fields
+                prenom = str(row.get('Prénom', '')).strip() if not pd.isna(row.get('Prénom')) else ''
+                nom = str(row.get('Nom', '')).strip() if not pd.isna(row.get('Nom')) else ''
+                departement = str(row.get('Département', '')).strip() if not pd.isna(row.get('Département')) else ''
+                
+                if not prenom or not nom or not departement:
+                    errors.append(f"Ligne {index + 2}: Prénom, Nom et Département requis")
+                    continue
+                
+                # Check if requestor already exists
+                existing = Requestor.query.filter_by(nom=nom, prenom=prenom, departement=departement).first()
+                if existing:
+                    errors.append(f"Ligne {index + 2}: Demandeur '{prenom} {nom}' du département '{departement}' existe déjà")
+                    continue
+                
+                # Create new requestor
+                requestor = Requestor(
+                    prenom=prenom,
+                    nom=nom,
+                    departement=departement,
+                    poste=str(row.get('Poste', '')).strip() if not pd.isna(row.get('Poste')) else None,
+                    email=str(row.get('Email', '')).strip() if not pd.isna(row.get('Email')) else None,
+                    telephone=str(row.get('Téléphone', '')).strip() if not pd.isna(row.get('Téléphone')) else None
+                )
+                
+                db.session.add(requestor)
+                imported_count += 1
+                
+            except Exception as e:
+                errors.append(f"Ligne {index + 2}: {str(e)}")
+        
+        db.session.commit()
+        
+        # Log activity
+        if imported_count > 0:
+            log_activity(
+                action='IMPORT',
+                entity_type='requestors',
+                entity_name=f'{imported_count} demandeurs'
+            )
+        return imported_count, errors
+    
+    def run_requestors_import(job, upload_path):
+        """Background body of a requestor import"""
+        try:
+            df = pd.read_excel(upload_path)
+        finally:
+            os.remove(upload_path)
+        missing_columns = [col for col in REQUESTOR_REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            raise ValueError(f'Colonnes requises manquantes: {", ".join(missing_columns)}')
+        
+        job.update_progress(0, total=len(df), message=f'{len(df)} lignes à importer')
+        imported_count, errors = import_requestors_frame(df)
+        return {
+            'message': f'{imported_count} demandeur(s) importé(s) avec succès',
+            'imported': imported_count,
+            'errors': errors
+        }
+
     @app.route("/api/requestors/import", methods=['POST'])
     def import_requestors():
         try:
@@ -1052,61 +1137,21 @@ def register_routes(app, db):
             if file.filename == '' or not file.filename.endswith(('.xlsx', '.xls')):
                 return jsonify({'message': 'Fichier Excel requis (.xlsx ou .xls)'}), 400
             
+            if wants_background_job():
+                upload_path = save_upload(file, file.filename.rsplit('.', 1)[1].lower())
+                job = job_runner.submit('requestors_import', run_requestors_import, upload_path)
+                return job_accepted(job, 'Import démarré')
+            
             # Read Excel file
             df = pd.read_excel(file)
             
             # Check required columns
-            required_columns = ['Prénom', 'Nom', 'Département']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = [col for col in REQUESTOR_REQUIRED_COLUMNS if col not in df.columns]
             
             if missing_columns:
                 return jsonify({'message': f'Colonnes requises manquantes: {", ".join(missing_columns)}'}), 400
             
-            imported_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Check required fields
-                    prenom = str(row.get('Prénom', '')).strip() if not pd.isna(row.get('Prénom')) else ''
-                    nom = str(row.get('Nom', '')).strip() if not pd.isna(row.get('Nom')) else ''
-                    departement = str(row.get('Département', '')).strip() if not pd.isna(row.get('Département')) else ''
-                    
-                    if not prenom or not nom or not departement:
-                        errors.append(f"Ligne {index + 2}: Prénom, Nom et Département requis")
-                        continue
-                    
-                    # Check if requestor already exists
-                    existing = Requestor.query.filter_by(nom=nom, prenom=prenom, departement=departement).first()
-                    if existing:
-                        errors.append(f"Ligne {index + 2}: Demandeur '{prenom} {nom}' du département '{departement}' existe déjà")
-                        continue
-                    
-                    # Create new requestor
-                    requestor = Requestor(
-                        prenom=prenom,
-                        nom=nom,
-                        departement=departement,
-                        poste=str(row.get('Poste', '')).strip() if not pd.isna(row.get('Poste')) else None,
-                        email=str(row.get('Email', '')).strip() if not pd.isna(row.get('Email')) else None,
-                        telephone=str(row.get('Téléphone', '')).strip() if not pd.isna(row.get('Téléphone')) else None
-                    )
-                    
-                    db.session.add(requestor)
-                    imported_count += 1
-                    
-                except Exception as e:
-                    errors.append(f"Ligne {index + 2}: {str(e)}")
-            
-            db.session.commit()
-            
-            # Log activity
-            if imported_count > 0:
-                log_activity(
-                    action='IMPORT',
-                    entity_type='requestors',
-                    entity_name=f'{imported_count} demandeurs'
-                )
+            imported_count, errors = import_requestors_frame(df)
             
             return jsonify({
                 'message': f'{imported_count} demandeur(s) importé(s) avec succès',
@@ -1123,8 +1168,12 @@ def register_routes(app, db):
     @app.route("/api/purchase-requests", methods=['GET'])
     def get_purchase_requests():
         try:
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(PurchaseRequest.query, PurchaseRequest, request.args))
             requests = PurchaseRequest.query.all()
             return jsonify([request.to_dict() for request in requests])
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             print(f"Purchase requests error: {str(e)}")
             return jsonify({'message': f'Erreur lors de la récupération des demandes d\'achat: {str(e)}'}), 500
@@ -1134,9 +1183,8 @@ def register_routes(app, db):
         try:
             data = request.get_json()
             
-            # Generate request number
-            count = PurchaseRequest.query.count() + 1
-            numero_demande = f"DA-{datetime.utcnow().strftime('%Y')}-{count:04d}"
+            # Next request number of the year, taken atomically in this transaction
+            numero_demande = document_numbers.next_number(PURCHASE_REQUEST_PREFIX)
             
             # Calculate total
             total_estime = sum(item['quantiteDemandee'] * item['prixUnitaireEstime'] 
@@ -1266,7 +1314,8 @@ def register_routes(app, db):
     @app.route("/api/purchase-requests/<request_id>/items", methods=['GET'])
     def get_purchase_request_items(request_id):
         try:
-            items = PurchaseRequestItem.query.filter_by(purchase_request_id=request_id).all()
+            items = PurchaseRequestItem.query.filter_by(purchase_request_id=request_id) \
+                .options(joinedload(PurchaseRequestItem.article), joinedload(PurchaseRequestItem.supplier)).all()
             return jsonify([item.to_dict() for item in items])
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération des éléments'}), 500
@@ -1279,7 +1328,8 @@ def register_routes(app, db):
             
             # Get purchase request and items
             purchase_request = PurchaseRequest.query.get_or_404(request_id)
-            items = PurchaseRequestItem.query.filter_by(purchase_request_id=request_id).all()
+            items = PurchaseRequestItem.query.filter_by(purchase_request_id=request_id) \
+                .options(joinedload(PurchaseRequestItem.article)).all()
             
             # Create reception records for each article
             receptions_created = []
@@ -1294,7 +1344,7 @@ def register_routes(app, db):
                 supplier_id = reception_article.get('supplierId') or item.supplier_id
                 if not supplier_id:
                     # Fallback: get from article's default supplier
-                    article = Article.query.get(item.article_id)
+                    article = item.article
                     if article and article.fournisseur_id:
                         supplier_id = article.fournisseur_id
                 
@@ -1319,18 +1369,20 @@ def register_routes(app, db):
                 )
                 db.session.add(reception)
                 
-                # Update article stock
-                article = Article.query.get(item.article_id)
-                if article:
-                    article.stock_actuel += reception_article['quantiteRecue']
-                
                 receptions_created.append(reception)
             
+            # Update article stocks in one statement (the flush assigns the ids recorded in the ledger)
+            db.session.flush()
+            stock_levels = apply_stock_deltas(
+                [(r.article_id, r.quantite_recue, SOURCE_RECEPTION, r.id) for r in receptions_created], clamp=False
+            )
+            
             db.session.commit()
             
             return jsonify({
                 'message': f'{len(receptions_created)} réceptions créées avec succès',
-                'receptions': [r.to_dict() for r in receptions_created]
+                'receptions': [r.to_dict() for r in receptions_created],
+                'stockLevels': stock_levels
             }), 201
         except Exception as e:
             db.session.rollback()
@@ -1344,6 +1396,7 @@ def register_routes(app, db):
             
             # Create purchase request header
             purchase_request = PurchaseRequest(
+                numero_demande=document_numbers.next_number(PURCHASE_REQUEST_PREFIX),
                 date_demande=datetime.fromisoformat(data['dateDemande'].replace('Z', '+00:00')) if 'dateDemande' in data else datetime.utcnow(),
                 requestor_id=data['requestorId'],
                 observations=data.get('observations'),
@@ -1367,22 +1420,59 @@ def register_routes(app, db):
                 db.session.add(item)
                 items.append(item)
             
+            # Serialise before the commit expires the new rows
+            db.session.flush()
+            response = {
+                **purchase_request.to_dict(),
+                'items': PurchaseRequestItem.to_dict_many(items)
+            }
             db.session.commit()
             
-            return jsonify({
-                **purchase_request.to_dict(),
-                'items': [item.to_dict() for item in items]
-            }), 201
+            return jsonify(response), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'message': 'Données invalides', 'error': str(e)}), 400
 
+    # Draft one purchase request per supplier for every low-stock article
+    @app.route("/api/purchase-requests/replenishment", methods=['POST'])
+    def create_replenishment_requests():
+        try:
+            data = request.get_json(silent=True) or {}
+            requestor_id = data.get('requestorId')
+            if not requestor_id:
+                return jsonify({'message': 'Demandeur requis'}), 400
+            if db.session.get(Requestor, requestor_id) is None:
+                return jsonify({'message': f'Demandeur introuvable: {requestor_id}'}), 400
+            categorie = data.get('categorie') or None
+            dry_run = bool(data.get('dryRun'))
+            
+            if wants_background_job() and not dry_run:
+                job = job_runner.submit('replenishment', replenishment.job, requestor_id, categorie)
+                return job_accepted(job, 'Réapprovisionnement démarré')
+            
+            drafts = replenishment.plan_replenishment(requestor_id, categorie, dry_run)
+            return jsonify({
+                'message': replenishment.summary_message(drafts, dry_run),
+                'dryRun': dry_run,
+                'requests': drafts
+            }), 200 if dry_run else 201
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Replenishment error: {str(e)}")
+            return jsonify({'message': 'Erreur lors de la génération des demandes d\'achat'}), 500
+
     # Reception routes
     @app.route("/api/receptions", methods=['GET'])
     def get_receptions():
         try:
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(Reception.query, Reception, request.args))
             receptions = Reception.query.all()
             return jsonify([reception.to_dict() for reception in receptions])
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération des réceptions'}), 500
 
@@ -1402,12 +1492,13 @@ def register_routes(app, db):
             db.session.add(reception)
             
             # Update article stock
-            article = Article.query.get(data['articleId'])
-            if article:
-                article.stock_actuel += data['quantiteRecue']
+            db.session.flush()
+            stock_levels = apply_stock_deltas(
+                [(reception.article_id, reception.quantite_recue, SOURCE_RECEPTION, reception.id)], clamp=False
+            )
             
             db.session.commit()
-            return jsonify(reception.to_dict()), 201
+            return jsonify({**reception.to_dict(), 'stockActuel': stock_levels.get(data['articleId'])}), 201
         except Exception as e:
             db.session.rollback()
             return jsonify({'message': 'Données invalides', 'error': str(e)}), 400
@@ -1416,8 +1507,12 @@ def register_routes(app, db):
     @app.route("/api/outbounds", methods=['GET'])
     def get_outbounds():
         try:
+            if cursor_requested(request.args):
+                return jsonify(cursor_page_response(Outbound.query, Outbound, request.args))
             outbounds = Outbound.query.all()
             return jsonify([outbound.to_dict() for outbound in outbounds])
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération des sorties'}), 500
 
@@ -1426,14 +1521,14 @@ def register_routes(app, db):
         try:
             data = request.get_json()
             
-            # Generate a unique transaction number
-            numero_sortie = f"OUT-{datetime.now().strftime('%Y%m%d')}-{str(int(time.time()))[-6:]}"
-            
             # Handle multi-article outbound transaction
             articles_data = data.get('articles', [])
             if not articles_data:
                 return jsonify({'message': 'Aucun article spécifié'}), 400
             
+            # Unique transaction number, taken atomically in this transaction
+            numero_sortie = document_numbers.next_number(OUTBOUND_PREFIX, at=datetime.now())
+            
             created_outbounds = []
             
             for article_item in articles_data:
@@ -1449,19 +1544,20 @@ def register_routes(app, db):
                 
                 db.session.add(outbound)
                 created_outbounds.append(outbound)
-                
-                # Update article stock
-                article = Article.query.get(article_item['articleId'])
-                if article:
-                    article.stock_actuel -= article_item['quantiteSortie']
-                    if article.stock_actuel < 0:
-                        article.stock_actuel = 0
+            
+            # Update article stocks in one statement, never below zero
+            db.session.flush()
+            stock_levels = apply_stock_deltas(
+                [(outbound.article_id, -outbound.quantite_sortie, SOURCE_OUTBOUND, outbound.id)
+                 for outbound in created_outbounds]
+            )
             
             db.session.commit()
             return jsonify({
                 'message': 'Sortie créée avec succès',
                 'numeroSortie': numero_sortie,
-                'outbounds': [outbound.to_dict() for outbound in created_outbounds]
+                'outbounds': [outbound.to_dict() for outbound in created_outbounds],
+                'stockLevels': stock_levels
             }), 201
             
         except Exception as e:
@@ -1490,51 +1586,15 @@ def register_routes(app, db):
     @app.route("/api/dashboard/stats", methods=['GET'])
     def get_dashboard_stats():
         try:
-            # Basic counts
-            total_articles = Article.query.count()
-            total_suppliers = Supplier.query.count()
-            total_requestors = Requestor.query.count()
-            total_requests = PurchaseRequest.query.count()
-            total_receptions = Reception.query.count()
-            total_outbounds = Outbound.query.count()
-            
-            # Low stock count (articles at or below minimum threshold)
-            low_stock_count = Article.query.filter(Article.stock_actuel <= Article.seuil_minimum).count()
-            
-            # Pending purchase requests
-            pending_requests = PurchaseRequest.query.filter(PurchaseRequest.statut == 'en_attente').count()
-            
-            # Calculate total stock value
-            articles = Article.query.all()
-            stock_value = 0
-            for article in articles:
-                if article.stock_actuel > 0 and article.prix_unitaire:
-                    stock_value += article.stock_actuel * article.prix_unitaire
-            
-            # Get purchase request status distribution for charts
-            status_counts = {
-                'en_attente': PurchaseRequest.query.filter(PurchaseRequest.statut == 'en_attente').count(),
-                'approuve': PurchaseRequest.query.filter(PurchaseRequest.statut == 'approuve').count(),
-                'refuse': PurchaseRequest.query.filter(PurchaseRequest.statut == 'refuse').count(),
-                'commande': PurchaseRequest.query.filter(PurchaseRequest.statut == 'commande').count(),
-                'recu': PurchaseRequest.query.filter(PurchaseRequest.statut == 'recu').count()
-            }
-            
+            # Counts, low stock, stock value and status distribution in grouped aggregates
+            stats = compute_dashboard_stats()
+
             # Get recent activity
             recent_receptions = Reception.query.order_by(desc(Reception.date_reception)).limit(5).all()
             recent_outbounds = Outbound.query.order_by(desc(Outbound.date_sortie)).limit(5).all()
-            
+
             return jsonify({
-                'totalArticles': total_articles,
-                'totalSuppliers': total_suppliers,
-                'totalRequestors': total_requestors,
-                'totalRequests': total_requests,
-                'totalReceptions': total_receptions,
-                'totalOutbounds': total_outbounds,
-                'lowStock': low_stock_count,
-                'pendingRequests': pending_requests,
-                'stockValue': stock_value,
-                'statusCounts': status_counts,
+                **stats,
                 'recentReceptions': [reception.to_dict() for reception in recent_receptions],
                 'recentOutbounds': [outbound.to_dict() for outbound in recent_outbounds]
             })
@@ -1546,56 +1606,197 @@ def register_routes(app, db):
     @app.route("/api/stock-status/analytics", methods=['GET'])
     def get_stock_status_analytics():
         try:
-            articles = Article.query.all()
+            bucket = request.args.get('bucket', 'all', type=str)
+            category = request.args.get('category', 'all', type=str)
+            search = request.args.get('search', '', type=str)
+            sort = request.args.get('sort', 'priority', type=str)
+            cursor = request.args.get('cursor')
+            limit = parse_limit(request.args.get('limit'))
+            
+            if bucket not in ('all',) + BUCKETS:
+                return jsonify({'message': f'Statut de stock inconnu: {bucket}'}), 400
+            
+            # Counts come from the materialized stock summary
+            summary, categories = get_summary_rows()
+            if category != 'all':
+                summary = next((row for row in categories if row.categorie == category), None)
             
-            # Categorize by stock levels
-            critical = []  # 0 stock
-            low = []       # below minimum
-            medium = []    # 1-2x minimum
-            good = []      # above 2x minimum
+            # Bucket membership is computed in SQL, one page at a time
+            bucket_column = bucket_expression()
+            query = Article.query
+            if bucket != 'all':
+                query = query.filter(bucket_column == bucket)
+            if category != 'all':
+                query = query.filter(Article.categorie == category)
+            if search:
+                # Filter only: the page order must stay the keyset sort order
+                query = query.filter(search_condition(Article, search))
             
+            sort_keys = {
+                'name': [(Article.designation, False)],
+                'stock': [(Article.stock_actuel, True)],
+                'value': [(func.coalesce(Article.prix_unitaire, 0) * Article.stock_actuel, True)],
+                'priority': [(bucket_priority_expression(), False), (Article.designation, False)]
+            }.get(sort, [(Article.designation, False)]) + [(Article.id, False)]
+            
+            articles, next_cursor = keyset_page(query, sort_keys, cursor, limit)
+            
+            items = []
             for article in articles:
-                seuil = article.seuil_minimum or 10
-                if article.stock_actuel == 0:
-                    critical.append(article.to_dict())
-                elif article.stock_actuel <= seuil:
-                    low.append(article.to_dict())
-                elif article.stock_actuel <= seuil * 2:
-                    medium.append(article.to_dict())
-                else:
-                    good.append(article.to_dict())
+                article_data = article.to_dict()
+                article_data['bucket'] = article_bucket(article.stock_actuel, article.seuil_minimum)
+                items.append(article_data)
             
             return jsonify({
-                'critical': critical,
-                'low': low,
-                'medium': medium,
-                'good': good,
+                'bucket': bucket,
+                'items': items,
+                'nextCursor': next_cursor,
+                'hasMore': next_cursor is not None,
                 'summary': {
-                    'critical_count': len(critical),
-                    'low_count': len(low),
-                    'medium_count': len(medium),
-                    'good_count': len(good),
-                    'total_count': len(articles)
+                    'critical_count': summary.critical_count if summary else 0,
+                    'low_count': summary.low_count if summary else 0,
+                    'medium_count': summary.medium_count if summary else 0,
+                    'good_count': summary.good_count if summary else 0,
+                    'total_count': summary.article_count if summary else 0
                 }
             })
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
         except Exception as e:
+            logger.error(f"Stock status analytics error: {str(e)}")
             return jsonify({'message': 'Erreur lors de la récupération du statut stock'}), 500
 
-    # Purchase follow-up analytics
-    @app.route("/api/purchase-follow/status", methods=['GET'])
-    def get_purchase_follow_status():
+    # Materialized stock summary (global and per category)
+    @app.route("/api/stock-summary", methods=['GET'])
+    def get_stock_summary():
         try:
-            pending = PurchaseRequest.query.filter_by(statut='en_attente').all()
-            approved = PurchaseRequest.query.filter_by(statut='approuve').all()
-            ordered = PurchaseRequest.query.filter_by(statut='commande').all()
-            refused = PurchaseRequest.query.filter_by(statut='refuse').all()
+            summary, categories = get_summary_rows()
+            return jsonify({
+                'global': summary.to_dict(),
+                'categories': [row.to_dict() for row in categories]
+            })
+        except Exception as e:
+            logger.error(f"Stock summary error: {str(e)}")
+            return jsonify({'message': 'Erreur lors de la récupération du résumé de stock'}), 500
+
+    # Stock levels at a past date, replayed from the ledger
+    @app.route("/api/stock/at", methods=['GET'])
+    def get_stock_at():
+        try:
+            raw_date = request.args.get('date')
+            if not raw_date:
+                return jsonify({'message': 'Paramètre date requis'}), 400
+            try:
+                at = datetime.fromisoformat(raw_date)
+            except ValueError:
+                return jsonify({'message': f'Date invalide: {raw_date}'}), 400
+            if len(raw_date) == 10:
+                # A bare date means the end of that day
+                at = at.replace(hour=23, minute=59, second=59, microsecond=999999)
+            
+            category = request.args.get('category')
+            items = stock_levels_at(at, None if category in (None, '', 'all') else category)
+            return jsonify({
+                'at': at.isoformat(),
+                'items': items,
+                'totalStock': sum(item['stock'] for item in items)
+            })
+        except Exception as e:
+            logger.error(f"Stock at date error: {str(e)}")
+            return jsonify({'message': 'Erreur lors du calcul du stock à date'}), 500
+
+    # Received / issued series per day, week or month, read from the consumption rollups
+    @app.route("/api/analytics/consumption", methods=['GET'])
+    def get_consumption_analytics():
+        try:
+            granularity = request.args.get('granularity', 'day', type=str)
+            try:
+                end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+                start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+            except ValueError:
+                return jsonify({'message': 'Date invalide (format attendu: AAAA-MM-JJ)'}), 400
+            
+            category = request.args.get('category')
+            return jsonify(consumption_series(
+                granularity, start, end,
+                category=None if category in (None, '', 'all') else category,
+                article_id=request.args.get('articleId') or None,
+                group_by=request.args.get('groupBy'),
+                limit=parse_limit(request.args.get('limit'), default=10)
+            ))
+        except InvalidRange as e:
+            return jsonify({'message': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Consumption analytics error: {str(e)}")
+            return jsonify({'message': 'Erreur lors de la récupération des consommations'}), 500
+
+    # Suggested reorder points and days of cover, served from the reorder_points cache
+    @app.route("/api/analytics/reorder-points", methods=['GET'])
+    def get_reorder_points():
+        try:
+            status = request.args.get('status', 'all', type=str)
+            category = request.args.get('category', 'all', type=str)
+            sort = request.args.get('sort', 'cover', type=str)
+            cursor = request.args.get('cursor')
+            limit = parse_limit(request.args.get('limit'))
+            
+            reorder_points.ensure_computed()
+            
+            query = ReorderPoint.query.join(Article, Article.id == ReorderPoint.article_id)
+            if status == 'reorder':
+                query = query.filter(reorder_points.needs_reorder_condition())
+            if category != 'all':
+                query = query.filter(Article.categorie == category)
+            
+            sort_keys = {
+                'consumption': [(ReorderPoint.average_daily, True)],
+                'gap': [(Article.stock_actuel - ReorderPoint.reorder_point, False)],
+            }.get(sort, [(reorder_points.days_of_cover_expression(), False)]) + [(ReorderPoint.article_id, False)]
+            
+            rows, next_cursor = keyset_page(query, sort_keys, cursor, limit)
+            article_ids = [row.article_id for row in rows]
+            articles = {article.id: article for article in Article.query.filter(Article.id.in_(article_ids))} \
+                if article_ids else {}
             
             return jsonify({
-                'pending': [req.to_dict() for req in pending],
-                'approved': [req.to_dict() for req in approved],
-                'ordered': [req.to_dict() for req in ordered],
-                'refused': [req.to_dict() for req in refused]
+                'items': [reorder_points.serialize(row, articles.get(row.article_id)) for row in rows],
+                'nextCursor': next_cursor,
+                'hasMore': next_cursor is not None,
+                'computedAt': rows[0].computed_at.isoformat() if rows else None
             })
+        except InvalidCursor as e:
+            return jsonify({'message': str(e)}), 400
+        except Exception as e:
+            logger.error(f"Reorder points error: {str(e)}")
+            return jsonify({'message': 'Erreur lors de la récupération des points de commande'}), 500
+
+    @app.route("/api/analytics/reorder-points/refresh", methods=['POST'])
+    def refresh_reorder_points():
+        try:
+            options = request.get_json(silent=True) or {}
+            history_days = int(options.get('historyDays') or reorder_points.DEFAULT_HISTORY_DAYS)
+            if history_days < 1:
+                return jsonify({'message': 'historyDays doit être positif'}), 400
+            
+            if wants_background_job():
+                job = job_runner.submit('reorder_points', reorder_points.job, history_days)
+                return job_accepted(job, 'Calcul démarré')
+            
+            count = reorder_points.compute_reorder_points(history_days)
+            return jsonify({'message': f'Points de commande calculés pour {count} article(s)', 'articles': count})
+        except (TypeError, ValueError):
+            return jsonify({'message': 'historyDays invalide'}), 400
+        except Exception as e:
+            logger.error(f"Reorder points refresh error: {str(e)}")
+            return jsonify({'message': 'Erreur lors du calcul des points de commande'}), 500
+
+    # Purchase follow-up analytics
+    @app.route("/api/purchase-follow/status", methods=['GET'])
+    def get_purchase_follow_status():
+        try:
+            # Newest requests of each column, with requestor names and item totals, in one query
+            limit = parse_limit(request.args.get('limit'), default=DEFAULT_COLUMN_LIMIT)
+            return jsonify(follow_board(limit))
         except Exception as e:
             return jsonify({'message': 'Erreur lors de la récupération du suivi'}), 500
 
@@ -1604,13 +1805,15 @@ def register_routes(app, db):
     def generate_stock_report():
         try:
             articles = Article.query.all()
+            summary, categories = get_summary_rows()
             report_data = {
                 'timestamp': datetime.utcnow().isoformat(),
-                'total_articles': len(articles),
+                'total_articles': summary.article_count,
                 'articles': [article.to_dict() for article in articles],
                 'summary': {
-                    'total_value': sum(article.prix_unitaire * article.stock_actuel for article in articles if article.prix_unitaire),
-                    'low_stock_count': len([a for a in articles if a.stock_actuel <= (a.seuil_minimum or 10)])
+                    'total_value': float(summary.stock_value),
+                    'low_stock_count': summary.critical_count + summary.low_count,
+                    'categories': [row.to_dict() for row in categories]
                 }
             }
             return jsonify(report_data)
@@ -1794,6 +1997,8 @@ def register_routes(app, db):
                     'suppliers': Supplier.query.count(),
                     'requests': PurchaseRequest.query.count()
                 },
+                'activityLog': activity_log_writer.stats(),
+                'autocompleteIndex': autocomplete_index.stats(),
                 'uptime': datetime.now().isoformat(),
                 'version': '1.0.0'
             }
@@ -1808,6 +2013,8 @@ def register_routes(app, db):
                     'suppliers': Supplier.query.count(),
                     'requests': PurchaseRequest.query.count()
                 },
+                'activityLog': activity_log_writer.stats(),
+                'autocompleteIndex': autocomplete_index.stats(),
                 'version': '1.0.0'
             })
         except Exception as e:
@@ -1921,298 +2128,104 @@ def register_routes(app, db):
         try:
             # Get export format from query parameters
             format_type = request.args.get('format', 'csv')
-            
-            # Get all articles
-            articles = Article.query.all()
-            
-            # Convert to list of dictionaries
-            data = []
-            for article in articles:
-                data.append({
-                    'Code Article': article.code_article,
-                    'Désignation': article.designation,
-                    'Catégorie': article.categorie,
-                    'Marque': article.marque or '',
-                    'Référence': article.reference or '',
-                    'Stock Initial': article.stock_initial,
-                    'Stock Actuel': article.stock_actuel,
-                    'Unité': article.unite,
-                    'Prix Unitaire': float(article.prix_unitaire) if article.prix_unitaire else 0,
-                    'Seuil Minimum': article.seuil_minimum,
-                    'Fournisseur ID': article.fournisseur_id or '',
-                    'Date Création': article.created_at.strftime('%Y-%m-%d %H:%M:%S') if article.created_at else ''
-                })
-            
-            # Create dataframe
-            df = pd.DataFrame(data)
+            columns = article_export.FULL_EXPORT_COLUMNS
             
             if format_type == 'excel':
-                # Export to Excel
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                    df.to_excel(writer, sheet_name='Articles', index=False)
-                output.seek(0)
-                
-                response = make_response(output.getvalue())
-                response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                response.headers['Content-Disposition'] = f'attachment; filename=articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-                return response
+                # Export to Excel, rows written to a temporary file as they are fetched
+                output = xlsx_tempfile('Articles', [header for header, _ in columns], article_export.iter_rows(columns))
+                filename = f'articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+                return send_file(output, mimetype=XLSX_MIMETYPE, as_attachment=True, download_name=filename)
             else:
-                # Export to CSV
-                output = io.StringIO()
-                df.to_csv(output, index=False, encoding='utf-8')
-                output.seek(0)
-                
-                response = make_response(output.getvalue())
-                response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-                response.headers['Content-Disposition'] = f'attachment; filename=articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-                return response
+                # Export to CSV, streamed as rows are fetched
+                return stream_csv_response(columns, f'articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv')
                 
         except Exception as e:
             return jsonify({'message': f'Erreur lors de l\'export: {str(e)}'}), 500
 
     # Modern export endpoints with options
-    @app.route("/api/articles/export/pdf", methods=['POST'])
-    def export_articles_pdf():
+    def write_articles_pdf(options, target, progress=None):
+        """Render the articles PDF to a path or binary file object, in batches of rows"""
+        columns = article_export.export_columns(options, price_as_text=True, date_format='%Y-%m-%d')
+        write_pdf(target, 'Export Articles', [header for header, _ in columns], article_export.iter_rows(columns), progress=progress)
+    
+    def write_articles_excel(options, target):
+        """Write the styled articles workbook to a path or binary file object"""
+        columns = article_export.export_columns(options)
+        write_xlsx(target, 'Articles', [header for header, _ in columns], article_export.iter_rows(columns), styled_header=True)
+    
+    def write_articles_csv(options, target):
+        """Write the articles CSV to a file path"""
+        article_export.write_csv(article_export.export_columns(options), target)
+    
+    def stream_csv_response(columns, filename):
+        """CSV download encoded row by row while articles are fetched"""
+        return Response(
+            stream_with_context(article_export.iter_csv(columns, article_export.iter_rows(columns))),
+            mimetype='text/csv',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    
+    # format -> (writer, mimetype, extension)
+    ARTICLE_EXPORT_FORMATS = {
+        'pdf': (write_articles_pdf, 'application/pdf', 'pdf'),
+        'excel': (write_articles_excel, XLSX_MIMETYPE, 'xlsx'),
+        'csv': (write_articles_csv, 'text/csv; charset=utf-8', 'csv')
+    }
+    
+    def article_export_filename(extension):
+        return f'articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    
+    def run_article_export(job, export_format, options):
+        """Background body of an article export; the file is kept as the job result"""
+        writer, mimetype, extension = ARTICLE_EXPORT_FORMATS[export_format]
+        filename = article_export_filename(extension)
+        job.update_progress(0, message='Génération du fichier')
+        if export_format == 'pdf':
+            total = db.session.query(func.count(Article.id)).scalar()
+            report = lambda done: job.update_progress(done, total=total, message=f'{done}/{total} articles mis en page')
+            write_articles_pdf(options, job.output_file(filename, mimetype), progress=report)
+        else:
+            writer(options, job.output_file(filename, mimetype))
+        return {'message': f'Export {export_format.upper()} terminé', 'filename': filename}
+    
+    def export_articles_response(export_format, error_label):
+        """Shared body of the POST export endpoints"""
         try:
             # Get export options from request body
-            options = request.get_json() or {}
-            include_stock = options.get('includeStock', True)
-            include_prices = options.get('includePrices', True)
-            include_suppliers = options.get('includeSuppliers', True)
+            options = request.get_json(silent=True) or {}
             
-            # Get all articles
-            articles = Article.query.all()
+            if wants_background_job():
+                job = job_runner.submit(f'articles_export_{export_format}', run_article_export, export_format, options)
+                return job_accepted(job, 'Export démarré')
             
-            # Prepare data based on options
-            data = []
-            for article in articles:
-                row = {
-                    'Code Article': article.code_article,
-                    'Désignation': article.designation,
-                    'Catégorie': article.categorie,
-                    'Marque': article.marque or '',
-                    'Référence': article.reference or '',
-                    'Unité': article.unite,
-                }
-                
-                if include_stock:
-                    row.update({
-                        'Stock Initial': article.stock_initial,
-                        'Stock Actuel': article.stock_actuel,
-                        'Seuil Minimum': article.seuil_minimum,
-                    })
-                
-                if include_prices:
-                    row['Prix Unitaire'] = f"{float(article.prix_unitaire):.2f} MAD" if article.prix_unitaire else "0.00 MAD"
-                
-                if include_suppliers:
-                    row['Fournisseur ID'] = article.fournisseur_id or ''
-                
-                row['Date Création'] = article.created_at.strftime('%Y-%m-%d') if article.created_at else ''
-                data.append(row)
-            
-            # Create HTML content for PDF
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <title>Export Articles - StockCéramique</title>
-                <style>
-                    body {{ font-family: Arial, sans-serif; margin: 20px; }}
-                    .header {{ text-align: center; margin-bottom: 30px; }}
-                    .company {{ color: #003d9d; font-size: 24px; font-weight: bold; }}
-                    .title {{ color: #666; font-size: 18px; margin-top: 10px; }}
-                    .date {{ color: #999; font-size: 12px; margin-top: 5px; }}
-                    table {{ width: 100%; border-collapse: collapse; margin-top: 20px; }}
-                    th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; font-size: 10px; }}
-                    th {{ background-color: #003d9d; color: white; font-weight: bold; }}
-                    tr:nth-child(even) {{ background-color: #f9f9f9; }}
-                    .footer {{ margin-top: 30px; text-align: center; font-size: 10px; color: #666; }}
-                </style>
-            </head>
-            <body>
-                <div class="header">
-                    <div class="company">StockCéramique</div>
-                    <div class="title">Export Articles</div>
-                    <div class="date">Généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}</div>
-                </div>
-                
-                <table>
-                    <thead>
-                        <tr>
-                            {''.join(f'<th>{col}</th>' for col in data[0].keys() if data)}
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {''.join('<tr>' + ''.join(f'<td>{value}</td>' for value in row.values()) + '</tr>' for row in data)}
-                    </tbody>
-                </table>
-                
-                <div class="footer">
-                    <p>Total: {len(data)} articles</p>
-                    <p>StockCéramique - Système de Gestion d'Inventaire</p>
-                </div>
-            </body>
-            </html>
-            """
-            
-            # Generate actual PDF using weasyprint
-            from weasyprint import HTML
-            pdf_buffer = io.BytesIO()
-            HTML(string=html_content).write_pdf(pdf_buffer)
-            pdf_buffer.seek(0)
-            
-            response = make_response(pdf_buffer.getvalue())
-            response.headers['Content-Type'] = 'application/pdf'
-            response.headers['Content-Disposition'] = f'attachment; filename=articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf'
-            return response
+            writer, mimetype, extension = ARTICLE_EXPORT_FORMATS[export_format]
+            if export_format == 'csv':
+                return stream_csv_response(article_export.export_columns(options), article_export_filename(extension))
+            
+            # Written to a temporary file that is streamed back and removed once sent
+            output = tempfile.TemporaryFile()
+            try:
+                writer(options, output)
+            except Exception:
+                output.close()
+                raise
+            output.seek(0)
+            return send_file(output, mimetype=mimetype, as_attachment=True, download_name=article_export_filename(extension))
             
         except Exception as e:
-            return jsonify({'message': f'Erreur lors de l\'export PDF: {str(e)}'}), 500
+            return jsonify({'message': f'Erreur lors de l\'export {error_label}: {str(e)}'}), 500
+
+    @app.route("/api/articles/export/pdf", methods=['POST'])
+    def export_articles_pdf():
+        return export_articles_response('pdf', 'PDF')
 
     @app.route("/api/articles/export/excel", methods=['POST'])
     def export_articles_excel():
-        try:
-            # Get export options from request body
-            options = request.get_json() or {}
-            include_stock = options.get('includeStock', True)
-            include_prices = options.get('includePrices', True)
-            include_suppliers = options.get('includeSuppliers', True)
-            
-            # Get all articles
-            articles = Article.query.all()
-            
-            # Prepare data based on options
-            data = []
-            for article in articles:
-                row = {
-                    'Code Article': article.code_article,
-                    'Désignation': article.designation,
-                    'Catégorie': article.categorie,
-                    'Marque': article.marque or '',
-                    'Référence': article.reference or '',
-                    'Unité': article.unite,
-                }
-                
-                if include_stock:
-                    row.update({
-                        'Stock Initial': article.stock_initial,
-                        'Stock Actuel': article.stock_actuel,
-                        'Seuil Minimum': article.seuil_minimum,
-                    })
-                
-                if include_prices:
-                    row['Prix Unitaire'] = float(article.prix_unitaire) if article.prix_unitaire else 0
-                
-                if include_suppliers:
-                    row['Fournisseur ID'] = article.fournisseur_id or ''
-                
-                row['Date Création'] = article.created_at.strftime('%Y-%m-%d %H:%M:%S') if article.created_at else ''
-                data.append(row)
-            
-            # Create dataframe
-            df = pd.DataFrame(data)
-            
-            # Export to Excel with styling
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Articles', index=False)
-                
-                # Get the workbook and worksheet for styling
-                workbook = writer.book
-                worksheet = writer.sheets['Articles']
-                
-                # Style the header row
-                from openpyxl.styles import Font, PatternFill, Alignment
-                header_font = Font(bold=True, color='FFFFFF')
-                header_fill = PatternFill(start_color='003d9d', end_color='003d9d', fill_type='solid')
-                
-                for col_num, column_title in enumerate(df.columns, 1):
-                    cell = worksheet.cell(row=1, column=col_num)
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = Alignment(horizontal='center')
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
-            
-            output.seek(0)
-            
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            response.headers['Content-Disposition'] = f'attachment; filename=articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-            return response
-            
-        except Exception as e:
-            return jsonify({'message': f'Erreur lors de l\'export Excel: {str(e)}'}), 500
+        return export_articles_response('excel', 'Excel')
 
     @app.route("/api/articles/export/csv", methods=['POST'])
     def export_articles_csv():
-        try:
-            # Get export options from request body
-            options = request.get_json() or {}
-            include_stock = options.get('includeStock', True)
-            include_prices = options.get('includePrices', True)
-            include_suppliers = options.get('includeSuppliers', True)
-            
-            # Get all articles
-            articles = Article.query.all()
-            
-            # Prepare data based on options
-            data = []
-            for article in articles:
-                row = {
-                    'Code Article': article.code_article,
-                    'Désignation': article.designation,
-                    'Catégorie': article.categorie,
-                    'Marque': article.marque or '',
-                    'Référence': article.reference or '',
-                    'Unité': article.unite,
-                }
-                
-                if include_stock:
-                    row.update({
-                        'Stock Initial': article.stock_initial,
-                        'Stock Actuel': article.stock_actuel,
-                        'Seuil Minimum': article.seuil_minimum,
-                    })
-                
-                if include_prices:
-                    row['Prix Unitaire'] = float(article.prix_unitaire) if article.prix_unitaire else 0
-                
-                if include_suppliers:
-                    row['Fournisseur ID'] = article.fournisseur_id or ''
-                
-                row['Date Création'] = article.created_at.strftime('%Y-%m-%d %H:%M:%S') if article.created_at else ''
-                data.append(row)
-            
-            # Create dataframe
-            df = pd.DataFrame(data)
-            
-            # Export to CSV
-            output = io.StringIO()
-            df.to_csv(output, index=False, encoding='utf-8')
-            output.seek(0)
-            
-            response = make_response(output.getvalue())
-            response.headers['Content-Type'] = 'text/csv; charset=utf-8'
-            response.headers['Content-Disposition'] = f'attachment; filename=articles_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-            return response
-            
-        except Exception as e:
-            return jsonify({'message': f'Erreur lors de l\'export CSV: {str(e)}'}), 500
+        return export_articles_response('csv', 'CSV')
 
     @app.route("/api/articles/import", methods=['POST'])
     def import_articles():
@@ -2231,6 +2244,12 @@ def register_routes(app, db):
             if file_ext not in ['csv', 'xlsx', 'xls']:
                 return jsonify({'message': 'Format de fichier non supporté. Utilisez CSV ou Excel.'}), 400
             
+            # Streaming mode: process the file in committed chunks in the background
+            if (request.args.get('mode') or request.form.get('mode')) == 'stream' or wants_background_job():
+                upload_path = save_upload(file, file_ext)
+                job = job_runner.submit('articles_import', run_streaming_article_import, upload_path, file_ext)
+                return job_accepted(job, 'Import démarré')
+            
             # Read file content
             try:
                 if file_ext == 'csv':
@@ -2240,88 +2259,18 @@ def register_routes(app, db):
             except Exception as e:
                 return jsonify({'message': f'Erreur lors de la lecture du fichier: {str(e)}'}), 400
             
-            # Expected columns (mapping from display names to database fields)
-            expected_columns = {
-                'Code Article': 'code_article',
-                'Désignation': 'designation', 
-                'Catégorie': 'categorie',
-                'Marque': 'marque',
-                'Référence': 'reference',
-                'Stock Initial': 'stock_initial',
-                'Stock Actuel': 'stock_actuel',
-                'Unité': 'unite',
-                'Prix Unitaire': 'prix_unitaire',
-                'Seuil Minimum': 'seuil_minimum',
-                'Fournisseur ID': 'fournisseur_id'
-            }
-            
             # Check required columns
-            required_columns = ['Code Article', 'Désignation', 'Catégorie']
-            missing_columns = [col for col in required_columns if col not in df.columns]
+            missing_columns = missing_import_columns(df.columns)
             if missing_columns:
                 return jsonify({'message': f'Colonnes manquantes: {", ".join(missing_columns)}'}), 400
             
-            # Process rows
-            created_count = 0
-            updated_count = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # Check if article exists
-                    existing_article = Article.query.filter_by(code_article=row['Code Article']).first()
-                    
-                    if existing_article:
-                        # Update existing article
-                        for display_name, db_field in expected_columns.items():
-                            if display_name in df.columns and pd.notna(row[display_name]):
-                                value = row[display_name]
-                                if db_field in ['stock_initial', 'stock_actuel', 'seuil_minimum']:
-                                    value = int(value) if pd.notna(value) else 0
-                                elif db_field == 'prix_unitaire':
-                                    value = float(value) if pd.notna(value) else None
-                                elif db_field in ['marque', 'reference', 'fournisseur_id']:
-                                    value = str(value) if pd.notna(value) else None
-                                else:
-                                    value = str(value) if pd.notna(value) else ''
-                                setattr(existing_article, db_field, value)
-                        updated_count += 1
-                    else:
-                        # Create new article
-                        article_data = {}
-                        for display_name, db_field in expected_columns.items():
-                            if display_name in df.columns:
-                                value = row[display_name]
-                                if db_field in ['stock_initial', 'stock_actuel', 'seuil_minimum']:
-                                    article_data[db_field] = int(value) if pd.notna(value) else (10 if db_field == 'seuil_minimum' else 0)
-                                elif db_field == 'prix_unitaire':
-                                    article_data[db_field] = float(value) if pd.notna(value) else None
-                                elif db_field in ['marque', 'reference', 'fournisseur_id']:
-                                    article_data[db_field] = str(value) if pd.notna(value) else None
-                                else:
-                                    article_data[db_field] = str(value) if pd.notna(value) else ('pcs' if db_field == 'unite' else '')
-                        
-                        # Set defaults for required fields
-                        if 'unite' not in article_data or not article_data['unite']:
-                            article_data['unite'] = 'pcs'
-                        if 'seuil_minimum' not in article_data:
-                            article_data['seuil_minimum'] = 10
-                        if 'stock_initial' not in article_data:
-                            article_data['stock_initial'] = 0
-                        if 'stock_actuel' not in article_data:
-                            article_data['stock_actuel'] = article_data['stock_initial']
-                        
-                        article = Article(**article_data)
-                        db.session.add(article)
-                        created_count += 1
-                        
-                except Exception as e:
-                    errors.append(f'Ligne {index + 2}: {str(e)}')
-                    continue
-            
-            # Commit changes
+            # Coerce, match and apply all rows in bulk
             try:
+                result = import_dataframe(df)
                 db.session.commit()
+                created_count = result['created']
+                updated_count = result['updated']
+                errors = result['errors']
                 message = f'Import terminé: {created_count} articles créés, {updated_count} articles mis à jour'
                 if errors:
                     message += f'. Erreurs: {len(errors)} lignes ignorées'
@@ -2338,6 +2287,68 @@ def register_routes(app, db):
         except Exception as e:
             return jsonify({'message': f'Erreur lors de l\'import: {str(e)}'}), 500
 
+    def run_streaming_article_import(job, upload_path, file_ext):
+        """Background body of a streaming article import"""
+        def report(rows_done, totals):
+            job.update_progress(rows_done, message=f"{rows_done} lignes traitées")
+        
+        try:
+            totals = import_file_streaming(upload_path, file_ext, progress=report)
+        finally:
+            os.remove(upload_path)
+        
+        message = f"Import terminé: {totals['created']} articles créés, {totals['updated']} articles mis à jour"
+        if totals['errors']:
+            message += f". Erreurs: {len(totals['errors'])} lignes ignorées"
+        return {
+            'message': message,
+            'created': totals['created'],
+            'updated': totals['updated'],
+            'rows': totals['rows'],
+            'errorCount': len(totals['errors']),
+            'errors': totals['errors'][:5]
+        }
+
+    # Background jobs
+    @app.route("/api/jobs", methods=['GET'])
+    def get_jobs():
+        try:
+            jobs = job_runner.list(kind=request.args.get('kind'), limit=parse_limit(request.args.get('limit')))
+            return jsonify([job.to_dict() for job in jobs])
+        except Exception as e:
+            logger.error(f"Get jobs error: {str(e)}")
+            return jsonify({'message': 'Erreur lors de la récupération des tâches'}), 500
+
+    @app.route("/api/jobs/<job_id>", methods=['GET'])
+    def get_job(job_id):
+        job = job_runner.get(job_id)
+        if not job:
+            return jsonify({'message': 'Tâche non trouvée'}), 404
+        return jsonify(job.to_dict())
+
+    @app.route("/api/jobs/<job_id>/result", methods=['GET'])
+    def get_job_result(job_id):
+        job = job_runner.get(job_id)
+        if not job:
+            return jsonify({'message': 'Tâche non trouvée'}), 404
+        if job.status != SUCCEEDED:
+            return jsonify({'message': job.error or 'Tâche non terminée', 'status': job.status}), 409
+        
+        if job.result_path:
+            if not os.path.exists(job.result_path):
+                return jsonify({'message': 'Fichier résultat expiré'}), 410
+            return send_file(job.result_path, mimetype=job.result_mimetype, as_attachment=True, download_name=job.result_filename)
+        return jsonify(job.to_dict()['result'])
+
+    @app.route("/api/jobs/<job_id>/cancel", methods=['POST'])
+    def cancel_job(job_id):
+        if not job_runner.get(job_id):
+            return jsonify({'message': 'Tâche non trouvée'}), 404
+        if not job_runner.cancel(job_id):
+            return jsonify({'message': 'La tâche est déjà terminée'}), 409
+        db.session.expire_all()
+        return jsonify(job_runner.get(job_id).to_dict())
+
     @app.route("/api/articles/template", methods=['GET'])
     def get_import_template():
         try:
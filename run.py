@@ -13,7 +13,9 @@ if __name__ == '__main__':
     # Create database tables
     with app.app_context():
         from flask_models import db
+        from schema_upgrade import upgrade_schema
         db.create_all()
+        upgrade_schema()
         print("Database tables created successfully")
     
     # Get port from environment or default to 5000
@@ -0,0 +1,122 @@
+"""
+In-place schema upgrades for StockCeramique
+db.create_all() only creates missing tables; this adds the columns and
+indexes that newer models declare to tables of an existing database
+(desktop SQLite files and the Replit PostgreSQL database alike)
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import inspect, text, update
+
+from flask_models import db
+
+logger = logging.getLogger(__name__)
+
+
+def add_missing_columns(connection):
+    """ALTER TABLE ... ADD COLUMN for model columns absent from the database"""
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    added = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            if not column.nullable and column.server_default is None:
+                logger.warning(f"Cannot add NOT NULL column {table.name}.{column.name} without a server default")
+                continue
+            column_type = column.type.compile(dialect=connection.dialect)
+            default = ''
+            if column.server_default is not None:
+                default = f' DEFAULT {column.server_default.arg}'
+            connection.execute(text(
+                f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}{default}'
+            ))
+            added.append(f'{table.name}.{column.name}')
+    return added
+
+
+def create_missing_indexes(connection):
+    """Create model-declared indexes that the database does not have yet"""
+    inspector = inspect(connection)
+    created = []
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(connection)
+                created.append(index.name)
+    return created
+
+
+# Creation date given to rows that predate created_at; they sort as the oldest
+MISSING_CREATION_DATE = datetime(1970, 1, 1)
+
+
+def backfill_creation_dates(connection):
+    """Fill NULL created_at where the model declares it NOT NULL, and enforce it on PostgreSQL
+
+    Cursor pages order on (created_at, id), and a NULL never compares true
+    in their WHERE clause. SQLite cannot alter the column, so there the
+    backfill runs at every start and the ORM default covers new rows.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    filled = []
+    for table in db.metadata.sorted_tables:
+        column = table.columns.get('created_at')
+        if column is None or column.nullable or not inspector.has_table(table.name):
+            continue
+        result = connection.execute(
+            update(table).where(column.is_(None)).values({column: MISSING_CREATION_DATE})
+        )
+        if result.rowcount:
+            filled.append(f'{table.name}: {result.rowcount}')
+        if connection.dialect.name == 'postgresql':
+            nullable = {c['name']: c['nullable'] for c in inspector.get_columns(table.name)}
+            if nullable.get(column.name):
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {preparer.format_column(column)} SET NOT NULL'
+                ))
+    return filled
+
+
+def upgrade_schema():
+    """Bring an existing database up to the current models; call after db.create_all()"""
+    with db.engine.begin() as connection:
+        added = add_missing_columns(connection)
+        created = create_missing_indexes(connection)
+        filled = backfill_creation_dates(connection)
+    for column in added:
+        logger.info(f'Schema upgrade: added column {column}')
+    for index in created:
+        logger.info(f'Schema upgrade: created index {index}')
+    for rows in filled:
+        logger.info(f'Schema upgrade: backfilled created_at of {rows} row(s)')
+
+    # Rows written before the normalised search columns existed
+    from normalized_columns import backfill_all
+    backfill_all()
+
+    # Baseline checkpoint for stock levels that predate the ledger
+    from stock_ledger import has_snapshots, take_snapshot
+    if not has_snapshots():
+        take_snapshot(full=True)
+
+    # Consumption rollups for movements recorded before they existed
+    from consumption_rollup import needs_rebuild, rebuild
+    if needs_rebuild():
+        rebuild(db.session.connection())
+        db.session.commit()
+
+    # Global search index, loaded once the tables are up to date
+    from autocomplete_index import autocomplete_index
+    autocomplete_index.start()
+    return added, created
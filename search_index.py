@@ -0,0 +1,195 @@
+"""
+Full-text search index for StockCeramique
+Articles, suppliers and requestors are indexed with FTS5 external-content
+tables on SQLite and with GIN expression indexes over to_tsvector() on
+PostgreSQL. The SQLite tables are kept in sync by triggers, so bulk
+imports are indexed too; PostgreSQL maintains expression indexes itself.
+Words are matched as prefixes; terms with digits (article codes,
+references) are matched anywhere in a word by a scan of the normalised
+*_norm columns, as are all searches when no index is available
+"""
+
+import logging
+import re
+import threading
+
+import click
+from sqlalchemy import text, func, literal_column, false, Integer, Float
+
+from flask_models import db, Article, Supplier, Requestor
+from normalized_columns import search_condition
+
+logger = logging.getLogger(__name__)
+
+# Table -> (model, indexed columns)
+INDEXED_TABLES = {
+    'articles': (Article, ('designation', 'code_article', 'reference', 'marque', 'categorie')),
+    'suppliers': (Supplier, ('nom', 'contact')),
+    'requestors': (Requestor, ('prenom', 'nom', 'departement', 'poste'))
+}
+
+SQLITE_TOKENIZER = 'unicode61 remove_diacritics 2'
+PG_TEXT_CONFIG = 'simple'
+
+# Word characters as understood by the unicode61 tokenizer
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+# Tokens searched with LIKE: "123" must find "CER-0123", which a prefix match cannot
+CODE_TOKEN_PATTERN = re.compile(r'\d')
+
+_ready = {}
+_lock = threading.Lock()
+
+
+def _fts_table(table):
+    return f'{table}_fts'
+
+
+def _pg_document(table, columns):
+    """tsvector expression shared by the GIN index and the queries"""
+    concatenated = " || ' ' || ".join(f"coalesce({table}.{column}, '')" for column in columns)
+    return f"to_tsvector('{PG_TEXT_CONFIG}', {concatenated})"
+
+
+def _sqlite_statements(table, columns):
+    fts = _fts_table(table)
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({column_list}, content='{table}', content_rowid='rowid', "
+        f"tokenize='{SQLITE_TOKENIZER}')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); END",
+        _sqlite_update_trigger(table, columns),
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"
+    ]
+
+
+def _sqlite_update_trigger(table, columns):
+    """Reindex a row only when an indexed column changes, not on every stock update"""
+    fts = _fts_table(table)
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return (
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {column_list} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {column_list}) VALUES ('delete', old.rowid, {old_values}); "
+        f"INSERT INTO {fts}(rowid, {column_list}) VALUES (new.rowid, {new_values}); END"
+    )
+
+
+def create_index(connection, table, rebuild=False):
+    """Create the index of one table if missing; returns True when it is usable"""
+    _, columns = INDEXED_TABLES[table]
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        fts = _fts_table(table)
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': fts}
+        ).first()
+        if exists and rebuild:
+            for trigger in ('ai', 'ad', 'au'):
+                connection.execute(text(f'DROP TRIGGER IF EXISTS {fts}_{trigger}'))
+            connection.execute(text(f'DROP TABLE {fts}'))
+            exists = None
+        if not exists:
+            for statement in _sqlite_statements(table, columns):
+                connection.execute(text(statement))
+            return True
+        # Indexes created before the update trigger was restricted to the indexed columns
+        trigger = _sqlite_update_trigger(table, columns)
+        current = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"), {'name': f'{fts}_au'}
+        ).scalar()
+        if current != trigger:
+            connection.execute(text(f'DROP TRIGGER IF EXISTS {fts}_au'))
+            connection.execute(text(trigger))
+        return True
+
+    if dialect == 'postgresql':
+        if rebuild:
+            connection.execute(text(f'DROP INDEX IF EXISTS ix_{table}_search'))
+        connection.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN ({_pg_document(table, columns)})'
+        ))
+        return True
+
+    return False
+
+
+def ensure_index(table):
+    """Lazily create the index of a table once per process"""
+    engine = db.engine
+    key = (engine.url.render_as_string(hide_password=True), table)
+    if key in _ready:
+        return _ready[key]
+
+    with _lock:
+        if key not in _ready:
+            try:
+                with engine.begin() as connection:
+                    _ready[key] = create_index(connection, table)
+            except Exception as e:
+                # e.g. SQLite built without FTS5: keep serving scans of the *_norm columns
+                logger.warning(f"Full-text index unavailable for {table}: {str(e)}")
+                _ready[key] = False
+    return _ready[key]
+
+
+def search_tokens(term):
+    return TOKEN_PATTERN.findall(term or '')
+
+
+def _sqlite_match(tokens):
+    """FTS5 query matching every token as a prefix"""
+    return ' '.join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+def _pg_tsquery(tokens):
+    return ' & '.join(f"{token}:*" for token in tokens)
+
+
+def apply_search(query, table, term):
+    """Restrict `query` (over the table's model) to rows matching `term`, best matches first"""
+    model, columns = INDEXED_TABLES[table]
+    tokens = search_tokens(term)
+    if not tokens:
+        return query.filter(false())
+    if any(CODE_TOKEN_PATTERN.search(token) for token in tokens) or not ensure_index(table):
+        return query.filter(search_condition(model, term))
+
+    if db.engine.dialect.name == 'sqlite':
+        fts = _fts_table(table)
+        matches = text(
+            f'SELECT rowid AS match_rowid, bm25({fts}) AS match_rank FROM {fts} WHERE {fts} MATCH :match'
+        ).bindparams(match=_sqlite_match(tokens)).columns(match_rowid=Integer, match_rank=Float).subquery()
+        return query.join(matches, literal_column(f'{table}.rowid') == matches.c.match_rowid) \
+            .order_by(matches.c.match_rank)
+
+    document = literal_column(_pg_document(table, columns))
+    tsquery = func.to_tsquery(PG_TEXT_CONFIG, _pg_tsquery(tokens))
+    return query.filter(document.op('@@')(tsquery)) \
+        .order_by(func.ts_rank(document, tsquery).desc())
+
+
+def init_app(app):
+    """Register the search-index CLI commands"""
+
+    @app.cli.group('search-index')
+    def search_index_cli():
+        """Full-text search index maintenance"""
+
+    @search_index_cli.command('rebuild')
+    def rebuild_command():
+        """Drop and recreate the full-text indexes from the current rows"""
+        with db.engine.begin() as connection:
+            for table in INDEXED_TABLES:
+                if create_index(connection, table, rebuild=True):
+                    click.echo(f'Index {table} reconstruit')
+                else:
+                    click.echo(f'Index {table} non pris en charge par cette base')
+        _ready.clear()
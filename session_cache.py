@@ -0,0 +1,172 @@
+"""
+Bearer session cache for StockCeramique
+Keeps validated session tokens in an in-process TTL/LRU cache and
+coalesces last_login updates into periodic batched writes, so
+authenticated requests no longer cost a SELECT plus a commit each
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import update, bindparam
+
+from flask_models import db, User, UserSession
+
+logger = logging.getLogger(__name__)
+
+
+class CachedSession:
+    """Validated session data kept in memory"""
+
+    __slots__ = ('token', 'user_id', 'user', 'expires_at', 'cached_until')
+
+    def __init__(self, token, user_id, user, expires_at, cached_until):
+        self.token = token
+        self.user_id = user_id
+        self.user = user
+        self.expires_at = expires_at
+        self.cached_until = cached_until
+
+    def is_valid(self):
+        return datetime.utcnow() < self.expires_at
+
+
+class SessionCache:
+    """TTL/LRU cache of session tokens with batched last_login writes
+
+    Entries live at most `ttl` seconds (and never past the session's
+    expires_at), so a logout handled by another worker process is seen
+    within that delay. Pending last_login values are written by a daemon
+    thread every `flush_interval` seconds and once more at exit.
+    """
+
+    def __init__(self, max_entries=1024, ttl=60, flush_interval=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self._entries = OrderedDict()
+        self._pending_logins = {}
+        self._lock = threading.Lock()
+        self._app = None
+        self._flusher = None
+        self._stop = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.max_entries = app.config.get('SESSION_CACHE_SIZE', self.max_entries)
+        self.ttl = app.config.get('SESSION_CACHE_TTL', self.ttl)
+        self.flush_interval = app.config.get('LAST_LOGIN_FLUSH_INTERVAL', self.flush_interval)
+        self._app = app
+        atexit.register(self._flush_at_exit)
+
+    def get(self, token):
+        """Cached session for a token, or None if absent or stale"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry.cached_until <= now or not entry.is_valid():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return entry
+
+    def put(self, session):
+        """Cache a UserSession loaded from the database"""
+        entry = CachedSession(
+            token=session.session_token,
+            user_id=session.user_id,
+            user=session.user.to_dict(),
+            expires_at=session.expires_at,
+            cached_until=time.monotonic() + self.ttl
+        )
+        with self._lock:
+            self._entries[entry.token] = entry
+            self._entries.move_to_end(entry.token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, token):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def validate(self, token):
+        """Valid session for a token, hitting the database only on a cache miss"""
+        entry = self.get(token)
+        if entry is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            session = UserSession.query.filter_by(session_token=token).first()
+            if not session or not session.is_valid():
+                return None
+            entry = self.put(session)
+
+        self.touch(entry.user_id)
+        return entry
+
+    def touch(self, user_id):
+        """Record user activity; written to last_login on the next flush"""
+        with self._lock:
+            self._pending_logins[user_id] = datetime.utcnow()
+            if self._flusher is None and self._app is not None:
+                self._flusher = threading.Thread(target=self._run_flusher, name='last-login-flusher', daemon=True)
+                self._flusher.start()
+
+    def _run_flusher(self):
+        while not self._stop.wait(self.flush_interval):
+            with self._app.app_context():
+                self.flush()
+
+    def flush(self):
+        """Write pending last_login values in one batched UPDATE"""
+        with self._lock:
+            pending = self._pending_logins
+            self._pending_logins = {}
+        if not pending:
+            return 0
+
+        statement = (
+            update(User.__table__)
+            .where(User.__table__.c.id == bindparam('b_user_id'))
+            .values(last_login=bindparam('b_last_login'))
+        )
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(statement, [
+                    {'b_user_id': user_id, 'b_last_login': last_login}
+                    for user_id, last_login in pending.items()
+                ])
+        except Exception as e:
+            logger.error(f"Failed to flush last_login updates: {str(e)}")
+            with self._lock:
+                for user_id, last_login in pending.items():
+                    self._pending_logins.setdefault(user_id, last_login)
+            return 0
+        return len(pending)
+
+    def _flush_at_exit(self):
+        self._stop.set()
+        if self._app is None or not self._pending_logins:
+            return
+        with self._app.app_context():
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'pendingLastLogin': len(self._pending_logins)
+            }
+
+
+session_cache = SessionCache()
@@ -0,0 +1,140 @@
+"""
+Stock ledger queries for StockCeramique
+Snapshots checkpoint every article's stock so that "stock at date D"
+starts from the nearest checkpoint and replays only the ledger rows in
+between, and reconciliation compares the replayed ledger with
+stock_actuel, both in O(articles + recent movements)
+"""
+
+from datetime import datetime
+
+import click
+from sqlalchemy import select, insert, exists, or_, case, func, text, bindparam, DateTime
+from sqlalchemy.orm import aliased
+
+from flask_models import db, Article, StockMovement, StockSnapshot
+
+# Upper bound used to replay the ledger up to now
+END_OF_TIME = datetime(9999, 12, 31)
+
+
+def _block_stock_writes(connection):
+    """Wait for in-flight stock movements and hold new ones until the snapshot commits
+
+    Movements timestamp their ledger rows while holding their write locks,
+    so every movement is either in the snapshot or later than taken_at.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text('LOCK TABLE articles IN SHARE MODE'))
+    else:
+        # Any UPDATE takes SQLite's database write lock, even one that matches no row
+        connection.execute(text('UPDATE articles SET stock_actuel = stock_actuel WHERE 0 = 1'))
+
+
+def take_snapshot(full=False):
+    """Checkpoint the stock of articles that moved since their last snapshot (all articles with full)
+
+    Runs in its own transaction; returns (taken_at, number of rows written).
+    """
+    articles = Article.__table__
+    snapshots = StockSnapshot.__table__
+    movements = StockMovement.__table__
+    with db.engine.begin() as connection:
+        _block_stock_writes(connection)
+        taken_at = datetime.utcnow()
+        query = select(articles.c.id, bindparam('taken_at', taken_at, type_=DateTime), articles.c.stock_actuel)
+        if not full:
+            last_taken = select(func.max(snapshots.c.taken_at)) \
+                .where(snapshots.c.article_id == articles.c.id).scalar_subquery()
+            query = query.where(or_(
+                last_taken.is_(None),
+                exists().where(movements.c.article_id == articles.c.id, movements.c.created_at > last_taken)
+            ))
+        result = connection.execute(insert(snapshots).from_select(['article_id', 'taken_at', 'stock'], query))
+    return taken_at, result.rowcount
+
+
+def has_snapshots():
+    return db.session.execute(select(StockSnapshot.article_id).limit(1)).first() is not None
+
+
+def _moved(article_id, after, until):
+    """Net ledger quantity of an article in (after, until]"""
+    conditions = [StockMovement.article_id == article_id, StockMovement.created_at <= until]
+    if after is not None:
+        conditions.append(StockMovement.created_at > after)
+    return select(func.coalesce(func.sum(StockMovement.quantity), 0)).where(*conditions).scalar_subquery()
+
+
+def stock_levels_query(at, categorie=None):
+    """Per-article stock at `at`, replayed from the nearest snapshot
+
+    Forward from the last snapshot at or before `at`; otherwise backward
+    from the first snapshot after it; otherwise (articles created since the
+    ledger exists) from zero.
+    """
+    previous_at = select(func.max(StockSnapshot.taken_at)) \
+        .where(StockSnapshot.article_id == Article.id, StockSnapshot.taken_at <= at).scalar_subquery()
+    next_at = select(func.min(StockSnapshot.taken_at)) \
+        .where(StockSnapshot.article_id == Article.id, StockSnapshot.taken_at > at).scalar_subquery()
+    base = select(Article.id, Article.code_article, Article.designation, Article.categorie, Article.stock_actuel,
+                  previous_at.label('previous_at'), next_at.label('next_at')) \
+        .where(or_(Article.created_at.is_(None), Article.created_at <= at))
+    if categorie:
+        base = base.where(Article.categorie == categorie)
+    base = base.subquery()
+
+    previous = aliased(StockSnapshot)
+    following = aliased(StockSnapshot)
+    level = case(
+        (base.c.previous_at.isnot(None), previous.stock + _moved(base.c.id, base.c.previous_at, at)),
+        (base.c.next_at.isnot(None), following.stock - _moved(base.c.id, at, base.c.next_at)),
+        else_=_moved(base.c.id, None, at)
+    )
+    return select(base.c.id, base.c.code_article, base.c.designation, base.c.categorie, base.c.stock_actuel,
+                  level.label('stock')) \
+        .outerjoin(previous, (previous.article_id == base.c.id) & (previous.taken_at == base.c.previous_at)) \
+        .outerjoin(following, (following.article_id == base.c.id) & (following.taken_at == base.c.next_at)) \
+        .order_by(base.c.code_article)
+
+
+def stock_levels_at(at, categorie=None):
+    return [
+        {'articleId': row.id, 'codeArticle': row.code_article, 'designation': row.designation,
+         'categorie': row.categorie, 'stock': int(row.stock)}
+        for row in db.session.execute(stock_levels_query(at, categorie))
+    ]
+
+
+def reconcile():
+    """Articles whose stock_actuel differs from the replayed ledger"""
+    levels = stock_levels_query(END_OF_TIME).subquery()
+    rows = db.session.execute(select(levels).where(levels.c.stock != levels.c.stock_actuel))
+    return [
+        {'articleId': row.id, 'codeArticle': row.code_article, 'stockActuel': row.stock_actuel,
+         'ledger': int(row.stock)}
+        for row in rows
+    ]
+
+
+def init_app(app):
+    """Register the stock-ledger CLI commands"""
+
+    @app.cli.group('stock-ledger')
+    def stock_ledger_cli():
+        """Stock ledger snapshots and reconciliation"""
+
+    @stock_ledger_cli.command('snapshot')
+    @click.option('--all', 'full', is_flag=True, help='Checkpoint every article, not only those that moved')
+    def snapshot_command(full):
+        """Checkpoint article stocks (run periodically, e.g. nightly)"""
+        taken_at, written = take_snapshot(full)
+        click.echo(f'Instantané du {taken_at.isoformat()}: {written} article(s)')
+
+    @stock_ledger_cli.command('reconcile')
+    def reconcile_command():
+        """Compare stock_actuel with the ledger replayed from the last snapshots"""
+        mismatches = reconcile()
+        for mismatch in mismatches:
+            click.echo(f"{mismatch['codeArticle']}: stock={mismatch['stockActuel']} journal={mismatch['ledger']}")
+        click.echo(f'{len(mismatches)} écart(s)')
@@ -0,0 +1,151 @@
+"""
+Stock movement service for StockCeramique
+Applies the stock deltas of a reception or outbound transaction with one
+set-based relative UPDATE (stock_actuel = stock_actuel + delta) inside the
+caller's transaction, so concurrent workers cannot lose each other's
+updates, and returns the new levels from the same statement. Every stock
+change is also appended to the stock_movements ledger: movements by this
+service, ORM edits of stock_actuel by a flush listener, and bulk imports
+by the import engine
+"""
+
+from datetime import datetime
+
+from sqlalchemy import event, inspect, insert, select, update, case, bindparam
+from sqlalchemy.orm import Session
+
+from flask_models import db, Article, StockMovement, generate_uuid
+import stock_summary
+from count_cache import invalidate_on_commit as invalidate_counts_on_commit
+from autocomplete_index import patch_stock_on_commit
+
+# Ledger source types
+SOURCE_RECEPTION = 'reception'
+SOURCE_OUTBOUND = 'sortie'
+SOURCE_INITIAL = 'initial'
+SOURCE_ADJUSTMENT = 'ajustement'
+SOURCE_IMPORT = 'import'
+
+# Columns returned by the UPDATE; they are the article state the stock summary tracks
+STATE_COLUMNS = ('id',) + stock_summary.TRACKED_ATTRIBUTES
+
+
+def _lock_rows(connection, article_ids):
+    """Row-lock the articles in id order on PostgreSQL, so multi-line transactions cannot deadlock
+
+    SQLite gets no BEGIN IMMEDIATE, and needs none: it has no row locks,
+    and the database write lock taken by a transaction's first write is
+    held until commit. pysqlite only opens a transaction right before the
+    first INSERT/UPDATE (earlier SELECTs run outside it), so a stock-moving
+    transaction never upgrades a read snapshot to a write. Its first write
+    waits on the busy timeout for the lock and then reads current rows;
+    the relative UPDATE cannot lose a concurrent change under WAL.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            select(Article.id).where(Article.id.in_(article_ids)).order_by(Article.id).with_for_update()
+        )
+
+
+def _update_returning(connection, statement, table, article_ids):
+    if connection.dialect.update_returning:
+        return connection.execute(statement.returning(*[table.c[column] for column in STATE_COLUMNS])).all()
+    connection.execute(statement)
+    return connection.execute(
+        select(*[table.c[column] for column in STATE_COLUMNS]).where(table.c.id.in_(article_ids))
+    ).all()
+
+
+def record_movements(connection, movements, at=None):
+    """Append (article_id, quantity, source_type, source_id) rows to the ledger"""
+    at = at or datetime.utcnow()
+    rows = [
+        {'id': generate_uuid(), 'article_id': article_id, 'quantity': int(quantity),
+         'source_type': source_type, 'source_id': source_id, 'created_at': at}
+        for article_id, quantity, source_type, source_id in movements
+        if quantity
+    ]
+    if rows:
+        connection.execute(insert(StockMovement.__table__), rows)
+    return len(rows)
+
+
+def apply_stock_deltas(movements, clamp=True):
+    """Add signed quantities to article stocks in the session's transaction
+
+    `movements` is an iterable of (article_id, quantity, source_type,
+    source_id) lines; lines for the same article are summed into one delta
+    and each line is written to the ledger. With `clamp`, stocks that would
+    go negative are set to 0, as outbounds always did, and the ledger gets
+    the matching adjustment. Unknown article ids are ignored. Returns
+    {article_id: new stock_actuel}.
+    """
+    movements = [movement for movement in movements if movement[0] and movement[1]]
+    totals = {}
+    for article_id, quantity, _, _ in movements:
+        totals[article_id] = totals.get(article_id, 0) + int(quantity)
+    if not totals:
+        return {}
+
+    connection = db.session.connection()
+    table = Article.__table__
+    article_ids = sorted(totals)
+    _lock_rows(connection, article_ids)
+
+    delta = case(
+        {article_id: bindparam(f'delta_{index}', quantity) for index, (article_id, quantity)
+         in enumerate(sorted(totals.items()))},
+        value=table.c.id,
+        else_=0
+    )
+    rows = _update_returning(
+        connection,
+        update(table).where(table.c.id.in_(article_ids)).values(stock_actuel=table.c.stock_actuel + delta),
+        table, article_ids
+    )
+
+    # Timestamped after the UPDATE, i.e. once the rows are locked (see stock_ledger.take_snapshot)
+    recorded_at = datetime.utcnow()
+    changes = []
+    levels = {}
+    negative = []
+    adjustments = []
+    for row in rows:
+        after = dict(row._mapping)
+        article_id = after.pop('id')
+        before = {**after, 'stock_actuel': after['stock_actuel'] - totals[article_id]}
+        if clamp and after['stock_actuel'] < 0:
+            negative.append(article_id)
+            adjustments.append((article_id, -after['stock_actuel'], SOURCE_ADJUSTMENT, None))
+            after['stock_actuel'] = 0
+        levels[article_id] = after['stock_actuel']
+        changes.append((before, after))
+    if negative:
+        connection.execute(update(table).where(table.c.id.in_(negative)).values(stock_actuel=0))
+    record_movements(connection, [movement for movement in movements if movement[0] in levels] + adjustments,
+                     at=recorded_at)
+
+    # The UPDATE bypasses ORM events: maintain the summary here and refresh loaded articles
+    stock_summary.apply_article_changes(connection, changes)
+    invalidate_counts_on_commit(db.session, Article.__tablename__)
+    patch_stock_on_commit(db.session, levels)
+    for instance in list(db.session.identity_map.values()):
+        if isinstance(instance, Article) and instance.id in levels:
+            db.session.expire(instance, ['stock_actuel'])
+    return levels
+
+
+@event.listens_for(Session, 'after_flush')
+def _record_orm_stock_changes(session, flush_context):
+    """Ledger rows for stock set through the ORM: article creation and manual edits"""
+    movements = []
+    for obj in session.new:
+        if isinstance(obj, Article) and obj.stock_actuel:
+            movements.append((obj.id, obj.stock_actuel, SOURCE_INITIAL, None))
+    for obj in session.dirty:
+        if isinstance(obj, Article):
+            history = inspect(obj).attrs.stock_actuel.history
+            if history.added and history.deleted:
+                movements.append((obj.id, (history.added[0] or 0) - (history.deleted[0] or 0), SOURCE_ADJUSTMENT, None))
+    if movements:
+        record_movements(session.connection(), movements)
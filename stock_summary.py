@@ -0,0 +1,309 @@
+"""
+Materialized stock summary for StockCeramique
+Keeps per-category and global stock value and stock-level bucket counts
+in the stock_summary table, updated incrementally whenever an article's
+stock, price, threshold or category changes
+"""
+
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from sqlalchemy import event, inspect, select, func, case, literal, delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from flask_models import db, Article, StockSummary
+
+GLOBAL_SCOPE = 'global'
+CATEGORY_SCOPE = 'categorie'
+
+# Columns of an article that feed the summary
+TRACKED_ATTRIBUTES = ('categorie', 'stock_actuel', 'prix_unitaire', 'seuil_minimum')
+
+COUNTER_COLUMNS = ('article_count', 'stock_value', 'low_stock_count',
+                   'critical_count', 'low_count', 'medium_count', 'good_count')
+
+BUCKETS = ('critical', 'low', 'medium', 'good')
+
+DEFAULT_THRESHOLD = 10
+
+
+def effective_threshold_expression():
+    """SQL equivalent of `seuil_minimum or 10`"""
+    return func.coalesce(func.nullif(Article.seuil_minimum, 0), DEFAULT_THRESHOLD)
+
+
+def bucket_expression():
+    """CASE expression classifying an article as critical, low, medium or good"""
+    seuil = effective_threshold_expression()
+    return case(
+        (Article.stock_actuel == 0, literal('critical')),
+        (Article.stock_actuel <= seuil, literal('low')),
+        (Article.stock_actuel <= seuil * 2, literal('medium')),
+        else_=literal('good')
+    )
+
+
+def bucket_priority_expression():
+    """Sort key putting critical articles first and good ones last"""
+    return case(
+        {name: index for index, name in enumerate(BUCKETS)},
+        value=bucket_expression(),
+        else_=len(BUCKETS)
+    )
+
+
+def article_bucket(stock_actuel, seuil_minimum):
+    """Python counterpart of bucket_expression() for a single article"""
+    seuil = seuil_minimum or DEFAULT_THRESHOLD
+    if stock_actuel == 0:
+        return 'critical'
+    if stock_actuel <= seuil:
+        return 'low'
+    if stock_actuel <= seuil * 2:
+        return 'medium'
+    return 'good'
+
+
+def _contribution(state):
+    """Counter values one article adds to its summary rows"""
+    stock = state['stock_actuel'] or 0
+    prix = state['prix_unitaire']
+    seuil = state['seuil_minimum']
+    value = Decimal(str(prix)) * stock if prix is not None and stock > 0 else Decimal('0')
+    contribution = {
+        'article_count': 1,
+        'stock_value': value,
+        'low_stock_count': 1 if seuil is not None and stock <= seuil else 0
+    }
+    bucket = article_bucket(stock, seuil)
+    for name in BUCKETS:
+        contribution[f'{name}_count'] = 1 if name == bucket else 0
+    return contribution
+
+
+def _accumulate(deltas, categorie, contribution, sign):
+    for key in ((GLOBAL_SCOPE, ''), (CATEGORY_SCOPE, categorie or '')):
+        row = deltas.setdefault(key, {column: 0 for column in COUNTER_COLUMNS})
+        for column, value in contribution.items():
+            row[column] += sign * value
+
+
+def compute_deltas(changes):
+    """Sum counter deltas per summary row for (before, after) article states"""
+    deltas = {}
+    for before, after in changes:
+        if before is not None:
+            _accumulate(deltas, before['categorie'], _contribution(before), -1)
+        if after is not None:
+            _accumulate(deltas, after['categorie'], _contribution(after), 1)
+    return {
+        key: row for key, row in deltas.items()
+        if any(value != 0 for value in row.values())
+    }
+
+
+def _upsert(connection, rows, additive):
+    """Write {(scope, categorie): counters} rows with one INSERT ... ON CONFLICT DO UPDATE
+
+    With `additive` the counters are added to an existing row, otherwise
+    they replace it. Concurrent writers of a new row therefore never fail on
+    its key. Rows go in key order to keep PostgreSQL row locks deadlock-free.
+    """
+    if not rows:
+        return
+    table = StockSummary.__table__
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(table)
+    counters = {
+        column: table.c[column] + statement.excluded[column] if additive else statement.excluded[column]
+        for column in COUNTER_COLUMNS
+    }
+    statement = statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key.columns],
+        set_={**counters, 'updated_at': statement.excluded.updated_at}
+    )
+    now = datetime.utcnow()
+    connection.execute(statement, [
+        {'scope': scope, 'categorie': categorie, **row, 'updated_at': now}
+        for (scope, categorie), row in sorted(rows.items())
+    ])
+
+
+def apply_article_changes(connection, changes):
+    """Apply (before, after) article state pairs to the summary table"""
+    if not is_seeded(connection):
+        rebuild(connection)
+        return
+    _upsert(connection, compute_deltas(changes), additive=True)
+
+
+def is_seeded(connection):
+    """The global row only exists once the table has been built from a full scan"""
+    table = StockSummary.__table__
+    return connection.execute(
+        select(table.c.scope).where(table.c.scope == GLOBAL_SCOPE)
+    ).first() is not None
+
+
+def scan_articles(connection):
+    """Compute summary rows from a full grouped scan of the articles table"""
+    bucket = bucket_expression()
+    seuil_raw = Article.seuil_minimum
+    stock_value = case(
+        ((Article.stock_actuel > 0) & Article.prix_unitaire.isnot(None),
+         Article.stock_actuel * Article.prix_unitaire),
+        else_=literal(0)
+    )
+    columns = [
+        func.count(Article.id).label('article_count'),
+        func.coalesce(func.sum(stock_value), 0).label('stock_value'),
+        func.coalesce(func.sum(case((Article.stock_actuel <= seuil_raw, 1), else_=0)), 0).label('low_stock_count'),
+    ] + [
+        func.coalesce(func.sum(case((bucket == name, 1), else_=0)), 0).label(f'{name}_count')
+        for name in BUCKETS
+    ]
+
+    rows = {}
+    for row in connection.execute(select(Article.categorie, *columns).group_by(Article.categorie)):
+        rows[(CATEGORY_SCOPE, row.categorie or '')] = {column: row._mapping[column] for column in COUNTER_COLUMNS}
+
+    global_row = {column: 0 for column in COUNTER_COLUMNS}
+    for row in rows.values():
+        for column in COUNTER_COLUMNS:
+            global_row[column] += row[column]
+    rows[(GLOBAL_SCOPE, '')] = global_row
+    return rows
+
+
+def _normalize(row):
+    return {
+        column: (Decimal(str(row[column])).quantize(Decimal('0.01')) if column == 'stock_value' else int(row[column]))
+        for column in COUNTER_COLUMNS
+    }
+
+
+def check(connection):
+    """Compare the stored summary with a full scan and return the mismatches"""
+    expected = {key: _normalize(row) for key, row in scan_articles(connection).items()}
+    table = StockSummary.__table__
+    stored = {
+        (row.scope, row.categorie): _normalize(row._mapping)
+        for row in connection.execute(select(table))
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        if expected.get(key) != stored.get(key):
+            mismatches.append({
+                'scope': key[0],
+                'categorie': key[1] or None,
+                'expected': expected.get(key),
+                'stored': stored.get(key)
+            })
+    return mismatches
+
+
+def rebuild(connection):
+    """Replace the summary table with the result of a full scan
+
+    Idempotent: workers that find the table unseeded at the same time each
+    overwrite the rows instead of inserting duplicates.
+    """
+    rows = scan_articles(connection)
+    table = StockSummary.__table__
+    connection.execute(delete(table))
+    _upsert(connection, rows, additive=False)
+    return rows
+
+
+def ensure_seeded():
+    """Build the summary table from a full scan the first time it is read (safe to race, see rebuild)"""
+    connection = db.session.connection()
+    if not is_seeded(connection):
+        rebuild(connection)
+        db.session.commit()
+
+
+def get_global_summary():
+    """Global summary row"""
+    ensure_seeded()
+    return StockSummary.query.get((GLOBAL_SCOPE, ''))
+
+
+def get_summary_rows():
+    """Global row and per-category rows"""
+    ensure_seeded()
+    rows = StockSummary.query.order_by(StockSummary.scope, StockSummary.categorie).all()
+    global_row = next((row for row in rows if row.scope == GLOBAL_SCOPE), None)
+    categories = [row for row in rows if row.scope == CATEGORY_SCOPE and row.article_count]
+    return global_row, categories
+
+
+def _article_state(article, use_history):
+    """Snapshot of the tracked attributes, optionally as they were before the flush"""
+    state = {}
+    attrs = inspect(article).attrs
+    for name in TRACKED_ATTRIBUTES:
+        if use_history:
+            history = attrs[name].history
+            if history.deleted:
+                state[name] = history.deleted[0]
+                continue
+        state[name] = getattr(article, name)
+    return state
+
+
+def _has_tracked_changes(article):
+    attrs = inspect(article).attrs
+    return any(attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES)
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_summary_after_flush(session, flush_context):
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Article):
+            changes.append((None, _article_state(obj, use_history=False)))
+    for obj in session.dirty:
+        if isinstance(obj, Article) and _has_tracked_changes(obj):
+            changes.append((_article_state(obj, use_history=True), _article_state(obj, use_history=False)))
+    for obj in session.deleted:
+        if isinstance(obj, Article):
+            changes.append((_article_state(obj, use_history=True), None))
+    if changes:
+        apply_article_changes(session.connection(), changes)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+# Load the previous value on assignment so flush history always carries it
+for _name in TRACKED_ATTRIBUTES:
+    event.listen(getattr(Article, _name), 'set', _keep_previous_value, active_history=True)
+
+
+def init_app(app):
+    """Register the stock-summary CLI commands"""
+
+    @app.cli.group('stock-summary')
+    def stock_summary_cli():
+        """Materialized stock summary maintenance"""
+
+    @stock_summary_cli.command('rebuild')
+    @click.option('--check-only', is_flag=True, help='Report drift without rewriting the table')
+    def rebuild_command(check_only):
+        """Check the summary against a full scan and rebuild it"""
+        connection = db.session.connection()
+        mismatches = check(connection)
+        for mismatch in mismatches:
+            click.echo(f"Drift {mismatch['scope']} {mismatch['categorie'] or ''}: "
+                       f"stored={mismatch['stored']} expected={mismatch['expected']}")
+        click.echo(f'{len(mismatches)} summary row(s) out of date')
+        if check_only:
+            return
+        rows = rebuild(connection)
+        db.session.commit()
+        click.echo(f'Stock summary rebuilt: {len(rows) - 1} categories')
@@ -0,0 +1,48 @@
+"""
+Shared fixtures: a Flask app bound to a throwaway SQLite database per test
+"""
+
+import pytest
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'test.db'}")
+    from flask_app import create_app
+    from flask_models import db
+
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_catalog(app):
+    """Create a supplier, a requestor and `count` articles; returns their ids"""
+    from flask_models import db, Article, Supplier, Requestor
+
+    def make(count=3, stock=0):
+        supplier = Supplier(nom='Fournisseur Test', delai_livraison=5)
+        requestor = Requestor(nom='Alami', prenom='Sara', departement='Maintenance')
+        db.session.add_all([supplier, requestor])
+        db.session.flush()
+        articles = [
+            Article(code_article=f'T{index:04d}', designation=f'Article test {index}',
+                    categorie=['Électrique', 'Mécanique'][index % 2], stock_initial=stock, stock_actuel=stock,
+                    prix_unitaire=10 + index, seuil_minimum=5, fournisseur_id=supplier.id)
+            for index in range(count)
+        ]
+        db.session.add_all(articles)
+        db.session.commit()
+        return supplier.id, requestor.id, [article.id for article in articles]
+
+    return make
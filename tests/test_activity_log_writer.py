@@ -0,0 +1,33 @@
+"""
+Write-behind activity log: flush() must see every entry queued before it
+"""
+
+import threading
+
+from sqlalchemy import func, select
+
+from flask_models import db, ActivityLog
+from activity_log_writer import ActivityLogWriter
+
+THREADS = 4
+ENTRIES_PER_THREAD = 150
+
+
+def test_flush_includes_batches_in_flight(app):
+    writer = ActivityLogWriter(batch_size=10, flush_interval=0.01)
+    writer.init_app(app)
+
+    def produce(thread):
+        for index in range(ENTRIES_PER_THREAD):
+            writer.enqueue(action='create', entity_type='article', entity_id=f'{thread}-{index}')
+
+    threads = [threading.Thread(target=produce, args=(thread,)) for thread in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.flush()
+
+    assert db.session.execute(select(func.count()).select_from(ActivityLog)).scalar() == THREADS * ENTRIES_PER_THREAD
+    assert writer.stats()['written'] == THREADS * ENTRIES_PER_THREAD
+    writer.shutdown()
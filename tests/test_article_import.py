@@ -0,0 +1,30 @@
+"""
+Coercion of uploaded article sheets
+"""
+
+import numpy as np
+import pandas as pd
+
+from article_import import coerce_frame, import_dataframe
+
+
+def test_empty_code_column_is_reported_per_line():
+    df = pd.DataFrame({
+        'Code Article': [np.nan, np.nan],
+        'Désignation': ['Robinet', 'Vanne'],
+        'Catégorie': [np.nan, np.nan]
+    })
+    frame, errors = coerce_frame(df)
+    assert frame.empty
+    assert errors == ['Ligne 2: Code Article requis', 'Ligne 3: Code Article requis']
+
+
+def test_numeric_codes_are_imported_as_text(app):
+    df = pd.DataFrame({
+        'Code Article': [123, 456],
+        'Désignation': ['Robinet', 'Vanne'],
+        'Catégorie': [np.nan, np.nan]
+    })
+    result = import_dataframe(df)
+    assert result['created'] == 2
+    assert result['errors'] == []
@@ -0,0 +1,27 @@
+"""
+Stock shown by the in-memory autocomplete index
+"""
+
+from flask_models import db
+from autocomplete_index import autocomplete_index
+from stock_movements import apply_stock_deltas, SOURCE_OUTBOUND
+
+
+def shown_stock(article_id):
+    results = autocomplete_index.search('article test', per_type=10)
+    return {result['id']: result['extra'] for result in results}[article_id]
+
+
+def test_stock_movements_patch_the_index(app, make_catalog):
+    _, _, article_ids = make_catalog(3, stock=20)
+    autocomplete_index.build()
+    assert shown_stock(article_ids[1]) == 'Stock: 20'
+
+    apply_stock_deltas([(article_ids[1], -7, SOURCE_OUTBOUND, None)])
+    assert shown_stock(article_ids[1]) == 'Stock: 20'
+    db.session.commit()
+    assert shown_stock(article_ids[1]) == 'Stock: 13'
+
+    apply_stock_deltas([(article_ids[1], -3, SOURCE_OUTBOUND, None)])
+    db.session.rollback()
+    assert shown_stock(article_ids[1]) == 'Stock: 13'
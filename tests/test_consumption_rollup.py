@@ -0,0 +1,34 @@
+"""
+Incremental consumption rollups
+"""
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from flask_models import db, ConsumptionRollup, Reception, Outbound
+from consumption_rollup import rebuild
+
+
+def rollup_rows():
+    return sorted(tuple(row) for row in db.session.execute(select(ConsumptionRollup.__table__)))
+
+
+def test_flushed_movements_match_a_rebuild(app, make_catalog):
+    supplier_id, requestor_id, article_ids = make_catalog(2)
+    day = datetime(2026, 5, 4, 9)
+    # Separate commits: the second movement of each period adds to the row the first one created
+    for quantity in (5, 7):
+        db.session.add(Reception(supplier_id=supplier_id, article_id=article_ids[0], quantite_recue=quantity,
+                                 prix_unitaire=12, date_reception=day))
+        db.session.add(Outbound(numero_sortie=f'OUT-{quantity}', article_id=article_ids[1], quantite_sortie=quantity,
+                                requestor_id=requestor_id, motif_sortie='Maintenance', date_sortie=day))
+        db.session.commit()
+
+    incremental = rollup_rows()
+    day_total = db.session.get(ConsumptionRollup, ('day', day.date(), 'global', ''))
+    assert (day_total.received_qty, day_total.issued_qty, day_total.received_count) == (12, 12, 2)
+
+    rebuild(db.session.connection())
+    db.session.commit()
+    assert rollup_rows() == incremental
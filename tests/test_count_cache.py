@@ -0,0 +1,23 @@
+"""
+Bounded cache of filtered listing totals
+"""
+
+from flask_models import Article
+from count_cache import CountCache
+
+
+def test_entries_are_bounded_and_expire(app, make_catalog):
+    make_catalog(5)
+    cache = CountCache(max_entries=3, ttl=60)
+    for index in range(5):
+        assert cache.count(Article.query.filter(Article.prix_unitaire > 10 + index), 'articles') == (5 - index - 1, True)
+    assert len(cache._entries) == 3
+
+    # The most recently used entries are kept
+    assert cache.count(Article.query.filter(Article.prix_unitaire > 14), 'articles') == (0, False)
+
+    # Expired entries are purged when a new total is stored
+    cache = CountCache(ttl=0)
+    cache.count(Article.query.filter(Article.prix_unitaire > 100), 'articles')
+    cache.count(Article.query.filter(Article.prix_unitaire > 101), 'articles')
+    assert len(cache._entries) == 1
@@ -0,0 +1,20 @@
+"""
+Document counters start after the numbers issued before they existed
+"""
+
+from datetime import datetime
+
+from flask_models import db, Outbound
+from document_numbers import document_numbers, OUTBOUND_PREFIX
+
+
+def test_outbound_counter_is_seeded_from_todays_numbers(app, make_catalog):
+    _, requestor_id, article_ids = make_catalog(1)
+    today = datetime(2026, 3, 14, 10, 30)
+    for numero in ('OUT-20260314-512345', 'OUT-20260314-498211', 'OUT-20260313-999999'):
+        db.session.add(Outbound(numero_sortie=numero, article_id=article_ids[0], quantite_sortie=1,
+                                requestor_id=requestor_id, motif_sortie='Maintenance', date_sortie=today))
+    db.session.commit()
+
+    assert document_numbers.next_number(OUTBOUND_PREFIX, at=today) == 'OUT-20260314-512346'
+    assert document_numbers.next_number(OUTBOUND_PREFIX, at=datetime(2026, 3, 15)) == 'OUT-20260315-512347'
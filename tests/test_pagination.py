@@ -0,0 +1,65 @@
+"""
+Cursor pages of the list endpoints
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import MetaData, insert, update
+from sqlalchemy.exc import IntegrityError
+
+from flask_models import db, Article, ActivityLog
+from schema_upgrade import backfill_creation_dates
+
+
+def walk(client, url, limit):
+    ids, cursor = [], ''
+    while cursor is not None:
+        separator = '&' if '?' in url else '?'
+        page = client.get(f'{url}{separator}limit={limit}&cursor={cursor}').get_json()
+        ids += [item['id'] for item in page['items']]
+        cursor = page['nextCursor']
+    return ids
+
+
+def test_cursor_pages_cover_every_row_once(client, make_catalog):
+    _, _, article_ids = make_catalog(7)
+    # Ties on created_at are broken by id
+    db.session.execute(update(Article).where(Article.id.in_(article_ids[:4])).values(created_at=datetime(2026, 1, 1)))
+    db.session.commit()
+
+    ids = walk(client, '/api/articles', 2)
+    assert sorted(ids) == sorted(article_ids)
+    assert len(ids) == len(set(ids))
+
+
+def test_created_at_is_not_null(app, make_catalog):
+    _, _, article_ids = make_catalog(1)
+    with pytest.raises(IntegrityError):
+        db.session.execute(update(Article).where(Article.id == article_ids[0]).values(created_at=None))
+    db.session.rollback()
+
+
+def test_articles_by_ids(client, make_catalog):
+    _, _, article_ids = make_catalog(5)
+    wanted = article_ids[1:3]
+    assert sorted(walk(client, f"/api/articles?ids={','.join(wanted)}", 100)) == sorted(wanted)
+
+
+def test_legacy_rows_without_creation_date_stay_on_the_pages(client):
+    # activity_logs as created before created_at was declared NOT NULL
+    legacy = ActivityLog.__table__.to_metadata(MetaData())
+    legacy.c.created_at.nullable = True
+    db.session.commit()
+    with db.engine.begin() as connection:
+        ActivityLog.__table__.drop(connection)
+        legacy.create(connection)
+        connection.execute(insert(legacy), [
+            {'id': f'log-{index}', 'action': 'create', 'entity_type': 'article',
+             'created_at': None if index % 2 else datetime(2026, 1, index + 1)}
+            for index in range(6)
+        ])
+        backfill_creation_dates(connection)
+
+    ids = walk(client, '/api/activity-logs', 2)
+    assert sorted(ids) == [f'log-{index}' for index in range(6)]
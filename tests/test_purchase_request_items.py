@@ -0,0 +1,60 @@
+"""
+Purchase request items are serialised with a fixed number of queries
+"""
+
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from flask_models import db
+
+
+@contextmanager
+def count_statements():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+
+def _create(client, requestor_id, supplier_id, article_ids):
+    response = client.post('/api/purchase-requests/complete', json={
+        'requestorId': requestor_id,
+        'items': [{'articleId': article_id, 'supplierId': supplier_id, 'quantiteDemandee': 2,
+                   'prixUnitaireEstime': 12.5} for article_id in article_ids]
+    })
+    assert response.status_code == 201
+    return response.get_json()
+
+
+def test_query_count_does_not_depend_on_item_count(client, make_catalog):
+    supplier_id, requestor_id, article_ids = make_catalog(count=20)
+    # Warm up one-off work (document counter creation, count-cache setup)
+    _create(client, requestor_id, supplier_id, article_ids[:1])
+
+    created = {}
+    create_counts = {}
+    for size in (2, 20):
+        with count_statements() as statements:
+            created[size] = _create(client, requestor_id, supplier_id, article_ids[:size])
+        create_counts[size] = len(statements)
+        assert len(created[size]['items']) == size
+        assert all(item['article'] and item['supplier'] for item in created[size]['items'])
+
+    list_counts = {}
+    for size in (2, 20):
+        with count_statements() as statements:
+            response = client.get(f"/api/purchase-requests/{created[size]['id']}/items")
+        list_counts[size] = len(statements)
+        items = response.get_json()
+        assert len(items) == size
+        assert all(item['article'] and item['supplier'] for item in items)
+
+    assert create_counts[2] == create_counts[20]
+    assert list_counts[2] == list_counts[20]
@@ -0,0 +1,20 @@
+"""
+Replenishment drafts for low-stock articles
+"""
+
+from sqlalchemy import select
+
+from flask_models import db, Article, PurchaseRequestItem
+from replenishment import plan_replenishment
+
+
+def test_articles_of_deleted_suppliers_are_drafted_without_supplier(app, make_catalog):
+    supplier_id, requestor_id, article_ids = make_catalog(3, stock=0)
+    db.session.get(Article, article_ids[2]).fournisseur_id = 'deleted-supplier'
+    db.session.commit()
+
+    drafts = plan_replenishment(requestor_id)
+
+    assert [(draft['supplierId'], draft['totalArticles']) for draft in drafts] == [(supplier_id, 2), (None, 1)]
+    items = dict(db.session.execute(select(PurchaseRequestItem.article_id, PurchaseRequestItem.supplier_id)).all())
+    assert items == {article_ids[0]: supplier_id, article_ids[1]: supplier_id, article_ids[2]: None}
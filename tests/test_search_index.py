@@ -0,0 +1,35 @@
+"""
+Full-text search over the SQLite FTS5 index
+"""
+
+from sqlalchemy import text, update
+
+from flask_models import db, Article
+from search_index import apply_search, ensure_index
+
+
+def search(term):
+    return {article.code_article for article in apply_search(Article.query, 'articles', term).all()}
+
+
+def test_update_trigger_only_watches_indexed_columns(app, make_catalog):
+    make_catalog(3)
+    assert ensure_index('articles')
+    trigger = db.session.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'articles_fts_au'")
+    ).scalar()
+    assert 'AFTER UPDATE OF designation' in trigger
+
+
+def test_renamed_articles_are_reindexed(app, make_catalog):
+    _, _, article_ids = make_catalog(3)
+    assert search('Robinet') == set()
+    db.session.execute(update(Article).where(Article.id == article_ids[1]).values(designation='Robinet laiton'))
+    db.session.execute(update(Article).values(stock_actuel=Article.stock_actuel + 1))
+    db.session.commit()
+    assert search('Robin') == {'T0001'}
+
+
+def test_code_terms_match_inside_words(app, make_catalog):
+    make_catalog(3)
+    assert search('0002') == {'T0002'}
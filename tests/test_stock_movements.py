@@ -0,0 +1,59 @@
+"""
+Concurrent receptions and outbounds must not lose stock updates
+"""
+
+import random
+import threading
+
+from flask_models import db, Article
+from stock_summary import check as check_summary
+from stock_ledger import reconcile
+
+THREADS = 6
+REQUESTS_PER_THREAD = 15
+INITIAL_STOCK = 1000  # High enough that no outbound is clamped at zero
+
+
+def test_concurrent_movements_do_not_drift(app, make_catalog):
+    supplier_id, requestor_id, article_ids = make_catalog(count=3, stock=INITIAL_STOCK)
+    expected = {article_id: INITIAL_STOCK for article_id in article_ids}
+    expected_lock = threading.Lock()
+    failures = []
+
+    def worker(seed):
+        rng = random.Random(seed)
+        client = app.test_client()
+        for _ in range(REQUESTS_PER_THREAD):
+            if rng.random() < 0.5:
+                article_id = rng.choice(article_ids)
+                quantity = rng.randint(1, 9)
+                response = client.post('/api/receptions', json={
+                    'supplierId': supplier_id, 'articleId': article_id, 'quantiteRecue': quantity
+                })
+                deltas = [(article_id, quantity)]
+            else:
+                lines = [{'articleId': rng.choice(article_ids), 'quantiteSortie': rng.randint(1, 5)}
+                         for _ in range(rng.randint(1, 3))]
+                response = client.post('/api/outbounds', json={
+                    'requestorId': requestor_id, 'motifSortie': 'Test', 'articles': lines
+                })
+                deltas = [(line['articleId'], -line['quantiteSortie']) for line in lines]
+            if response.status_code != 201:
+                failures.append(response.get_json())
+                continue
+            with expected_lock:
+                for article_id, delta in deltas:
+                    expected[article_id] += delta
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+    db.session.expire_all()
+    actual = {article.id: article.stock_actuel for article in Article.query.filter(Article.id.in_(article_ids))}
+    assert actual == expected
+    assert check_summary(db.session.connection()) == []
+    assert reconcile() == []
@@ -0,0 +1,32 @@
+"""
+Stock summary rows written by concurrent transactions
+"""
+
+from sqlalchemy import insert
+
+from flask_models import db, Article, StockSummary
+import stock_summary
+
+
+def test_new_category_row_created_concurrently(app, make_catalog):
+    make_catalog(2, stock=8)
+    stock_summary.ensure_seeded()
+    # Another transaction opened the category first
+    db.session.execute(insert(StockSummary.__table__).values(scope=stock_summary.CATEGORY_SCOPE, categorie='Plomberie'))
+    db.session.add(Article(code_article='P0001', designation='Vanne', categorie='Plomberie',
+                           stock_initial=3, stock_actuel=3, prix_unitaire=4, seuil_minimum=5))
+    db.session.commit()
+
+    assert db.session.get(StockSummary, (stock_summary.CATEGORY_SCOPE, 'Plomberie')).article_count == 1
+    assert stock_summary.check(db.session.connection()) == []
+
+
+def test_seeding_twice_keeps_one_row_per_key(app, make_catalog):
+    make_catalog(4, stock=8)
+    connection = db.session.connection()
+    stock_summary.rebuild(connection)
+    # A second worker that also found the table unseeded writes the same keys
+    stock_summary._upsert(connection, stock_summary.scan_articles(connection), additive=False)
+    db.session.commit()
+
+    assert stock_summary.check(db.session.connection()) == []
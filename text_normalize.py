@@ -0,0 +1,26 @@
+"""
+Text normalisation for StockCeramique searches
+Folds case, strips accents and reduces punctuation to single spaces, so
+"Céramique-Sud" and "ceramique sud" compare equal
+"""
+
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def strip_accents(value):
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize(value):
+    """Lower-case, accent-free form of a text with words separated by single spaces"""
+    if value is None:
+        return ''
+    return _NON_WORD.sub(' ', strip_accents(str(value)).casefold()).strip()
+
+
+def normalize_tokens(value):
+    return normalize(value).split()
@@ -0,0 +1,77 @@
+"""
+Streaming XLSX writer for StockCeramique
+Builds workbooks in openpyxl write-only mode, so rows go straight to the
+file instead of an in-memory sheet, and sizes columns from a sample of
+the first rows instead of a second pass over every cell
+"""
+
+import tempfile
+from itertools import chain, islice
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Rows inspected to size the columns
+WIDTH_SAMPLE_ROWS = 200
+MAX_COLUMN_WIDTH = 50
+
+HEADER_FONT = Font(bold=True, color='FFFFFF')
+HEADER_FILL = PatternFill(start_color='003d9d', end_color='003d9d', fill_type='solid')
+HEADER_ALIGNMENT = Alignment(horizontal='center')
+
+
+def column_widths(headers, sample):
+    """Width of each column from the header and the sampled rows"""
+    widths = [len(str(header)) for header in headers]
+    for row in sample:
+        for index, value in enumerate(row):
+            if value is not None:
+                widths[index] = max(widths[index], len(str(value)))
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def write_xlsx(target, sheet_name, headers, rows, styled_header=False, sample_rows=WIDTH_SAMPLE_ROWS):
+    """Write rows to a one-sheet workbook at a path or binary file object
+
+    `rows` may be any iterable (typically a generator over a batched
+    query); only the first `sample_rows` rows are held in memory.
+    """
+    rows = iter(rows)
+    sample = list(islice(rows, sample_rows))
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    for index, width in enumerate(column_widths(headers, sample), 1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+
+    if styled_header:
+        header_cells = []
+        for header in headers:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            header_cells.append(cell)
+        sheet.append(header_cells)
+    else:
+        sheet.append(list(headers))
+
+    for row in chain(sample, rows):
+        sheet.append(row)
+    workbook.save(target)
+
+
+def xlsx_tempfile(sheet_name, headers, rows, styled_header=False):
+    """Workbook written to a temporary file, rewound and ready to send"""
+    output = tempfile.TemporaryFile()
+    try:
+        write_xlsx(output, sheet_name, headers, rows, styled_header)
+    except Exception:
+        output.close()
+        raise
+    output.seek(0)
+    return output